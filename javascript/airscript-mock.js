@@ -0,0 +1,910 @@
+/**
+ * AirScript 对象模型的内存模拟（node）
+ * 用于在本地运行 wps-airsheet-api.js：benchmark-bundle.js 的冷启动基准，
+ * 以及 local-server.js（python/wps_emulator.py 中 NodeAirScriptServer 的离线测试）
+ *
+ * 只模拟脚本用到的数据相关成员：单元格值、A1 / R1C1 公式（公式按 R1C1 保存，相对引用随单元格位置解释，
+ * 计算支持数字、单元格引用、四则运算和 SUM）、Range.Sort、整行整列插入删除、工作表的增删和隐藏。
+ * 单元格格式只模拟数字格式、对齐、字体、填充和四边边框；与表格一致，通过 Value / Formula 写入的数字文本
+ * 会转换为数字，数字格式为文本（"@"）的单元格除外（日期等其他文本不做转换）。
+ */
+
+const MAX_ROWS = 1048576;
+const MAX_COLUMNS = 16384;
+
+// ==================== 地址 ====================
+
+function letterToNumber(letters) {
+  let result = 0;
+  for (let i = 0; i < letters.length; i++) {
+    result = result * 26 + letters.charCodeAt(i) - 64;
+  }
+  return result;
+}
+
+function numberToLetter(number) {
+  let letters = "";
+  while (number > 0) {
+    const mod = (number - 1) % 26;
+    letters = String.fromCharCode(65 + mod) + letters;
+    number = Math.floor((number - 1) / 26);
+  }
+  return letters;
+}
+
+/**
+ * 解析 A1 地址，支持 "B2"、"B2:D5"、整列 "B:D" 和整行 "2:5"
+ * @returns {Object} { r1, c1, r2, c2 }
+ */
+function parseAddress(address) {
+  const parts = String(address).replace(/\$/g, "").toUpperCase().split(":");
+  const cell = (text) => {
+    const match = text.match(/^([A-Z]*)(\d*)$/);
+    if (!match || (!match[1] && !match[2])) {
+      throw new Error("地址格式错误: " + address);
+    }
+    return { row: match[2] ? Number(match[2]) : null, column: match[1] ? letterToNumber(match[1]) : null };
+  };
+  const start = cell(parts[0]);
+  const end = cell(parts[1] || parts[0]);
+  return {
+    r1: start.row || 1,
+    c1: start.column || 1,
+    r2: end.row || MAX_ROWS,
+    c2: end.column || MAX_COLUMNS,
+  };
+}
+
+// ==================== 公式 ====================
+
+// 单元格引用前后不能是名称字符，避免匹配函数名（如 LOG10(）和工作表名
+const A1_REFERENCE = /(^|[^A-Za-z0-9_$.!])(\$?)([A-Za-z]{1,3})(\$?)(\d+)(?![A-Za-z0-9_(])/g;
+const R1C1_REFERENCE = /(^|[^A-Za-z0-9_$.!])R(\[-?\d+\]|\d+)?C(\[-?\d+\]|\d+)?(?![A-Za-z0-9_(])/g;
+
+/**
+ * 只转换公式中字符串常量以外的部分
+ */
+function mapFormulaCode(formula, fn) {
+  return formula
+    .split(/("[^"]*")/)
+    .map((part, i) => (i % 2 === 1 ? part : fn(part)))
+    .join("");
+}
+
+/**
+ * A1 公式转换为 R1C1（相对引用按公式所在单元格 row / column 计算偏移）
+ */
+function a1ToR1C1(formula, row, column) {
+  return mapFormulaCode(formula, (code) =>
+    code.replace(A1_REFERENCE, (m, before, columnAbsolute, letters, rowAbsolute, digits) => {
+      const r = Number(digits);
+      const c = letterToNumber(letters.toUpperCase());
+      const rowPart = rowAbsolute ? String(r) : r === row ? "" : "[" + (r - row) + "]";
+      const columnPart = columnAbsolute ? String(c) : c === column ? "" : "[" + (c - column) + "]";
+      return before + "R" + rowPart + "C" + columnPart;
+    })
+  );
+}
+
+/**
+ * R1C1 公式转换为 A1（相对引用按公式所在单元格 row / column 计算位置）
+ */
+function r1c1ToA1(formula, row, column) {
+  return mapFormulaCode(formula, (code) =>
+    code.replace(R1C1_REFERENCE, (m, before, rowPart, columnPart) => {
+      const r = resolveR1C1Part(rowPart, row);
+      const c = resolveR1C1Part(columnPart, column);
+      return (
+        before +
+        (columnPart && columnPart[0] !== "[" ? "$" : "") +
+        numberToLetter(c) +
+        (rowPart && rowPart[0] !== "[" ? "$" : "") +
+        r
+      );
+    })
+  );
+}
+
+function resolveR1C1Part(part, base) {
+  if (!part) {
+    return base;
+  }
+  return part[0] === "[" ? base + Number(part.slice(1, -1)) : Number(part);
+}
+
+class FormulaError extends Error {}
+
+/**
+ * 计算 R1C1 公式：数字、字符串、单元格引用、+ - * / &、括号和 SUM(区域, ...)
+ * 不支持的语法返回 "#NAME?"，非数字参与运算返回 "#VALUE!"
+ */
+function evaluateFormula(sheet, formula, row, column, depth) {
+  const tokens = [];
+  const pattern = /\s*(?:(\d+(?:\.\d+)?)|("[^"]*")|(R(?:\[-?\d+\]|\d+)?C(?:\[-?\d+\]|\d+)?)|([A-Za-z]+)\(|([-+*/&(),:]))/gy;
+  const code = formula.slice(1);
+  let match;
+  while (pattern.lastIndex < code.length && (match = pattern.exec(code))) {
+    tokens.push(match);
+  }
+  if (pattern.lastIndex < code.trimEnd().length) {
+    return "#NAME?";
+  }
+
+  let position = 0;
+  const peek = () => tokens[position];
+  const next = () => tokens[position++];
+  const expectOperator = (operator) => {
+    const token = next();
+    if (!token || token[5] !== operator) {
+      throw new FormulaError("#NAME?");
+    }
+  };
+  const reference = (text) => {
+    const parts = text.match(/^R(\[-?\d+\]|\d+)?C(\[-?\d+\]|\d+)?$/);
+    return { row: resolveR1C1Part(parts[1], row), column: resolveR1C1Part(parts[2], column) };
+  };
+  const cellValue = (ref) => {
+    if (depth > 100) {
+      throw new FormulaError("#REF!");
+    }
+    return sheet.valueAt(ref.row, ref.column, depth + 1);
+  };
+  const number = (value) => {
+    if (value === "" || value === null || value === undefined) {
+      return 0;
+    }
+    if (typeof value === "boolean") {
+      return value ? 1 : 0;
+    }
+    if (typeof value !== "number") {
+      throw new FormulaError("#VALUE!");
+    }
+    return value;
+  };
+
+  const primary = () => {
+    const token = next();
+    if (!token) {
+      throw new FormulaError("#NAME?");
+    }
+    if (token[1] !== undefined) {
+      return Number(token[1]);
+    }
+    if (token[2] !== undefined) {
+      return token[2].slice(1, -1);
+    }
+    if (token[3] !== undefined) {
+      return cellValue(reference(token[3]));
+    }
+    if (token[4] !== undefined) {
+      if (token[4].toUpperCase() !== "SUM") {
+        throw new FormulaError("#NAME?");
+      }
+      let total = 0;
+      for (;;) {
+        const start = next();
+        if (!start || start[3] === undefined) {
+          throw new FormulaError("#NAME?");
+        }
+        let end = start;
+        if (peek() && peek()[5] === ":") {
+          next();
+          end = next();
+          if (!end || end[3] === undefined) {
+            throw new FormulaError("#NAME?");
+          }
+        }
+        const a = reference(start[3]);
+        const b = reference(end[3]);
+        for (let r = Math.min(a.row, b.row); r <= Math.max(a.row, b.row); r++) {
+          for (let c = Math.min(a.column, b.column); c <= Math.max(a.column, b.column); c++) {
+            const value = cellValue({ row: r, column: c });
+            total += typeof value === "number" ? value : 0;
+          }
+        }
+        const separator = next();
+        if (separator && separator[5] === ")") {
+          return total;
+        }
+        if (!separator || separator[5] !== ",") {
+          throw new FormulaError("#NAME?");
+        }
+      }
+    }
+    if (token[5] === "(") {
+      const value = concat();
+      expectOperator(")");
+      return value;
+    }
+    if (token[5] === "-") {
+      return -number(primary());
+    }
+    if (token[5] === "+") {
+      return number(primary());
+    }
+    throw new FormulaError("#NAME?");
+  };
+  const term = () => {
+    let value = primary();
+    while (peek() && (peek()[5] === "*" || peek()[5] === "/")) {
+      const operator = next()[5];
+      const right = number(primary());
+      if (operator === "/" && right === 0) {
+        throw new FormulaError("#DIV/0!");
+      }
+      value = operator === "*" ? number(value) * right : number(value) / right;
+    }
+    return value;
+  };
+  const sum = () => {
+    let value = term();
+    while (peek() && (peek()[5] === "+" || peek()[5] === "-")) {
+      const operator = next()[5];
+      const right = number(term());
+      value = operator === "+" ? number(value) + right : number(value) - right;
+    }
+    return value;
+  };
+  const concat = () => {
+    let value = sum();
+    while (peek() && peek()[5] === "&") {
+      next();
+      value = String(value) + String(sum());
+    }
+    return value;
+  };
+
+  try {
+    const value = concat();
+    if (position !== tokens.length) {
+      return "#NAME?";
+    }
+    return value;
+  } catch (e) {
+    if (e instanceof FormulaError) {
+      return e.message;
+    }
+    throw e;
+  }
+}
+
+function isFormula(value) {
+  return typeof value === "string" && value.length > 1 && value.charAt(0) === "=";
+}
+
+const NUMBER_TEXT = /^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$/;
+
+// ==================== 格式 ====================
+
+const XL_NONE = -4142;
+// xlEdgeLeft、xlEdgeTop、xlEdgeBottom、xlEdgeRight
+const BORDER_EDGES = [7, 8, 9, 10];
+
+function defaultFormat() {
+  const borders = {};
+  BORDER_EDGES.forEach((index) => {
+    borders[index] = { LineStyle: XL_NONE, Weight: 2, Color: 0 };
+  });
+  return {
+    NumberFormat: "General",
+    HorizontalAlignment: 1,
+    VerticalAlignment: -4107,
+    WrapText: false,
+    Font: { Name: "宋体", Size: 11, Bold: false, Italic: false, Underline: XL_NONE, Color: 0 },
+    Interior: { Color: 16777215, ColorIndex: XL_NONE },
+    Borders: borders,
+  };
+}
+
+/**
+ * 格式属性对象（Font、Interior、单条边框）：读取区域左上角单元格，写入区域内所有单元格
+ * @param {Function} select - 从单元格格式中取出属性所在的对象
+ */
+function formatAccessor(range, keys, select) {
+  const accessor = {};
+  keys.forEach((key) => {
+    Object.defineProperty(accessor, key, {
+      get: () => select(range.sheet.formatAt(range.bounds.r1, range.bounds.c1))[key],
+      set: (value) => range.eachCell((r, c) => {
+        select(range.sheet.ownFormat(r, c))[key] = value;
+      }),
+    });
+  });
+  return accessor;
+}
+
+// ==================== 排序 ====================
+
+/**
+ * 表格排序顺序：数字 < 文本（不区分大小写）< 逻辑值，空单元格始终排在最后
+ */
+function compareForSort(a, b, descending) {
+  const blankA = a === "" || a === null || a === undefined;
+  const blankB = b === "" || b === null || b === undefined;
+  if (blankA || blankB) {
+    return blankA === blankB ? 0 : blankA ? 1 : -1;
+  }
+  const rank = (value) => (typeof value === "number" ? 0 : typeof value === "boolean" ? 2 : 1);
+  let result = rank(a) - rank(b);
+  if (result === 0) {
+    const x = rank(a) === 1 ? String(a).toLowerCase() : a;
+    const y = rank(b) === 1 ? String(b).toLowerCase() : b;
+    result = x < y ? -1 : x > y ? 1 : 0;
+  }
+  return descending ? -result : result;
+}
+
+// ==================== 对象模型 ====================
+
+class MockRange {
+  constructor(sheet, bounds) {
+    this.sheet = sheet;
+    this.bounds = bounds;
+  }
+
+  get Worksheet() {
+    return this.sheet;
+  }
+
+  get Row() {
+    return this.bounds.r1;
+  }
+
+  get Column() {
+    return this.bounds.c1;
+  }
+
+  get Rows() {
+    return { Count: this.bounds.r2 - this.bounds.r1 + 1 };
+  }
+
+  get Columns() {
+    return { Count: this.bounds.c2 - this.bounds.c1 + 1, AutoFit() {} };
+  }
+
+  get Address() {
+    const b = this.bounds;
+    const start = "$" + numberToLetter(b.c1) + "$" + b.r1;
+    if (b.r1 === b.r2 && b.c1 === b.c2) {
+      return start;
+    }
+    return start + ":$" + numberToLetter(b.c2) + "$" + b.r2;
+  }
+
+  get Count() {
+    return this.Rows.Count * this.Columns.Count;
+  }
+
+  matrix(read) {
+    const b = this.bounds;
+    if (b.r1 === b.r2 && b.c1 === b.c2) {
+      return read(b.r1, b.c1);
+    }
+    const rows = [];
+    for (let r = b.r1; r <= b.r2; r++) {
+      const row = [];
+      for (let c = b.c1; c <= b.c2; c++) {
+        row.push(read(r, c));
+      }
+      rows.push(row);
+    }
+    return rows;
+  }
+
+  eachCell(fn) {
+    const b = this.bounds;
+    for (let r = b.r1; r <= b.r2; r++) {
+      for (let c = b.c1; c <= b.c2; c++) {
+        fn(r, c);
+      }
+    }
+  }
+
+  assign(value, write) {
+    const b = this.bounds;
+    for (let r = b.r1; r <= b.r2; r++) {
+      for (let c = b.c1; c <= b.c2; c++) {
+        if (!Array.isArray(value)) {
+          write(r, c, value);
+        } else if (Array.isArray(value[r - b.r1])) {
+          write(r, c, value[r - b.r1][c - b.c1]);
+        } else {
+          // 一维数组按单行处理
+          write(r, c, value[c - b.c1]);
+        }
+      }
+    }
+  }
+
+  get Value() {
+    return this.matrix((r, c) => this.sheet.valueAt(r, c, 0));
+  }
+
+  set Value(value) {
+    // 与表格一致：以 "=" 开头的文本按 A1 公式写入
+    this.Formula = value;
+  }
+
+  get Value2() {
+    return this.Value;
+  }
+
+  set Value2(value) {
+    this.Value = value;
+  }
+
+  get Formula() {
+    return this.matrix((r, c) => this.sheet.formulaAt(r, c, false));
+  }
+
+  set Formula(value) {
+    // 单个 A1 公式填充区域时，相对引用以左上角单元格为准
+    const b = this.bounds;
+    this.assign(value, (r, c, item) =>
+      this.sheet.put(r, c, item, Array.isArray(value) ? r : b.r1, Array.isArray(value) ? c : b.c1)
+    );
+  }
+
+  get FormulaR1C1() {
+    return this.matrix((r, c) => this.sheet.formulaAt(r, c, true));
+  }
+
+  set FormulaR1C1(value) {
+    this.assign(value, (r, c, item) => this.sheet.putR1C1(r, c, item));
+  }
+
+  get NumberFormat() {
+    return this.sheet.formatAt(this.bounds.r1, this.bounds.c1).NumberFormat;
+  }
+
+  set NumberFormat(value) {
+    this.eachCell((r, c) => {
+      this.sheet.ownFormat(r, c).NumberFormat = value;
+    });
+  }
+
+  get HorizontalAlignment() {
+    return this.sheet.formatAt(this.bounds.r1, this.bounds.c1).HorizontalAlignment;
+  }
+
+  set HorizontalAlignment(value) {
+    this.eachCell((r, c) => {
+      this.sheet.ownFormat(r, c).HorizontalAlignment = value;
+    });
+  }
+
+  get VerticalAlignment() {
+    return this.sheet.formatAt(this.bounds.r1, this.bounds.c1).VerticalAlignment;
+  }
+
+  set VerticalAlignment(value) {
+    this.eachCell((r, c) => {
+      this.sheet.ownFormat(r, c).VerticalAlignment = value;
+    });
+  }
+
+  get WrapText() {
+    return this.sheet.formatAt(this.bounds.r1, this.bounds.c1).WrapText;
+  }
+
+  set WrapText(value) {
+    this.eachCell((r, c) => {
+      this.sheet.ownFormat(r, c).WrapText = value;
+    });
+  }
+
+  get Font() {
+    return formatAccessor(this, ["Name", "Size", "Bold", "Italic", "Underline", "Color"], (format) => format.Font);
+  }
+
+  get Interior() {
+    return formatAccessor(this, ["Color", "ColorIndex"], (format) => format.Interior);
+  }
+
+  get Borders() {
+    const item = (index) => formatAccessor(this, ["LineStyle", "Weight", "Color"], (format) => format.Borders[index]);
+    // 整个区域的 Borders 属性读取左边框，设置时设置四条边
+    const borders = { Item: item };
+    ["LineStyle", "Weight", "Color"].forEach((key) => {
+      Object.defineProperty(borders, key, {
+        get: () => item(BORDER_EDGES[0])[key],
+        set: (value) => BORDER_EDGES.forEach((index) => {
+          item(index)[key] = value;
+        }),
+      });
+    });
+    return borders;
+  }
+
+  get EntireRow() {
+    return new MockRange(this.sheet, { r1: this.bounds.r1, c1: 1, r2: this.bounds.r2, c2: MAX_COLUMNS });
+  }
+
+  get EntireColumn() {
+    return new MockRange(this.sheet, { r1: 1, c1: this.bounds.c1, r2: MAX_ROWS, c2: this.bounds.c2 });
+  }
+
+  Resize(rows, columns) {
+    const b = this.bounds;
+    return new MockRange(this.sheet, {
+      r1: b.r1,
+      c1: b.c1,
+      r2: b.r1 + (rows || b.r2 - b.r1 + 1) - 1,
+      c2: b.c1 + (columns || b.c2 - b.c1 + 1) - 1,
+    });
+  }
+
+  Cells(row, column) {
+    const b = this.bounds;
+    return new MockRange(this.sheet, {
+      r1: b.r1 + row - 1,
+      c1: b.c1 + column - 1,
+      r2: b.r1 + row - 1,
+      c2: b.c1 + column - 1,
+    });
+  }
+
+  Offset(rows, columns) {
+    const b = this.bounds;
+    const dr = rows || 0;
+    const dc = columns || 0;
+    return new MockRange(this.sheet, { r1: b.r1 + dr, c1: b.c1 + dc, r2: b.r2 + dr, c2: b.c2 + dc });
+  }
+
+  Clear() {
+    this.ClearContents();
+    this.eachCell((r, c) => this.sheet.formats.delete(r + "," + c));
+  }
+
+  ClearContents() {
+    this.assign("", (r, c) => this.sheet.remove(r, c));
+  }
+
+  Copy(destination) {
+    if (!destination) {
+      throw new Error("模拟对象不支持剪贴板复制");
+    }
+    const b = this.bounds;
+    const d = destination.bounds;
+    // 公式按 R1C1 复制，相对引用随目标位置调整；格式一并复制
+    const entries = [];
+    this.eachCell((r, c) => {
+      entries.push([r - b.r1, c - b.c1, this.sheet.entry(r, c), this.sheet.formats.get(r + "," + c)]);
+    });
+    entries.forEach(([dr, dc, entry, format]) => {
+      destination.sheet.setEntry(d.r1 + dr, d.c1 + dc, entry);
+      destination.sheet.setFormat(d.r1 + dr, d.c1 + dc, format);
+    });
+  }
+
+  Delete() {
+    this.shift(-1);
+  }
+
+  Insert() {
+    this.shift(1);
+  }
+
+  /**
+   * 整行或整列插入（direction=1）/ 删除（direction=-1）
+   */
+  shift(direction) {
+    const b = this.bounds;
+    const wholeRows = b.c1 === 1 && b.c2 === MAX_COLUMNS;
+    const wholeColumns = b.r1 === 1 && b.r2 === MAX_ROWS;
+    if (!wholeRows && !wholeColumns) {
+      throw new Error("模拟对象只支持整行或整列插入删除");
+    }
+    const first = wholeRows ? b.r1 : b.c1;
+    const count = wholeRows ? b.r2 - b.r1 + 1 : b.c2 - b.c1 + 1;
+    const shifted = (map) => {
+      const result = new Map();
+      for (const [key, item] of map) {
+        let [r, c] = key.split(",").map(Number);
+        let index = wholeRows ? r : c;
+        if (direction < 0 && index >= first && index < first + count) {
+          continue;
+        }
+        if (index >= first + (direction < 0 ? count : 0)) {
+          index += direction * count;
+        }
+        if (wholeRows) {
+          r = index;
+        } else {
+          c = index;
+        }
+        result.set(r + "," + c, item);
+      }
+      return result;
+    };
+    this.sheet.cells = shifted(this.sheet.cells);
+    this.sheet.formats = shifted(this.sheet.formats);
+  }
+
+  /**
+   * Range.Sort(Key1, Order1, Key2, Type, Order2, Key3, Order3, Header)
+   * Order: 1 升序、2 降序；Header: 1 第一行为标题行，2 没有标题行。稳定排序，整行移动（公式和格式随行移动）
+   */
+  Sort(key1, order1, key2, type, order2, key3, order3, header) {
+    const b = this.bounds;
+    const keys = [
+      [key1, order1],
+      [key2, order2],
+      [key3, order3],
+    ]
+      .filter((key) => key[0])
+      .map((key) => {
+        const column = key[0].Column;
+        if (column < b.c1 || column > b.c2) {
+          throw new Error("排序键不在区域内");
+        }
+        return { column: column, descending: key[1] === 2 };
+      });
+    if (keys.length === 0) {
+      throw new Error("至少需要一个排序键");
+    }
+    const start = header === 1 ? b.r1 + 1 : b.r1;
+    const rows = [];
+    for (let r = start; r <= b.r2; r++) {
+      const entries = [];
+      const formats = [];
+      for (let c = b.c1; c <= b.c2; c++) {
+        entries.push(this.sheet.entry(r, c));
+        formats.push(this.sheet.formats.get(r + "," + c));
+      }
+      rows.push({
+        entries: entries,
+        formats: formats,
+        keys: keys.map((key) => this.sheet.valueAt(r, key.column, 0)),
+      });
+    }
+    rows.sort((x, y) => {
+      for (let k = 0; k < keys.length; k++) {
+        const result = compareForSort(x.keys[k], y.keys[k], keys[k].descending);
+        if (result !== 0) {
+          return result;
+        }
+      }
+      return 0;
+    });
+    rows.forEach((row, i) => {
+      row.entries.forEach((entry, j) => this.sheet.setEntry(start + i, b.c1 + j, entry));
+      row.formats.forEach((format, j) => this.sheet.setFormat(start + i, b.c1 + j, format));
+    });
+  }
+}
+
+class MockSheet {
+  constructor(workbook, name) {
+    this.workbook = workbook;
+    this.Name = name;
+    this.Visible = -1;
+    // "行,列" -> 值；公式保存为 { r1c1: "=..." }
+    this.cells = new Map();
+    // "行,列" -> 格式，未设置格式的单元格使用 defaultFormat()
+    this.formats = new Map();
+  }
+
+  formatAt(row, column) {
+    return this.formats.get(row + "," + column) || defaultFormat();
+  }
+
+  /**
+   * 获取单元格自己的格式对象（用于修改），没有时创建
+   */
+  ownFormat(row, column) {
+    const key = row + "," + column;
+    if (!this.formats.has(key)) {
+      this.formats.set(key, defaultFormat());
+    }
+    return this.formats.get(key);
+  }
+
+  setFormat(row, column, format) {
+    if (format === undefined) {
+      this.formats.delete(row + "," + column);
+    } else {
+      this.formats.set(row + "," + column, JSON.parse(JSON.stringify(format)));
+    }
+  }
+
+  /**
+   * 按单元格的数字格式转换写入的文本：数字文本转换为数字，文本格式（"@"）的单元格保持原样
+   */
+  parseInput(row, column, value) {
+    if (typeof value === "string" && NUMBER_TEXT.test(value) && this.formatAt(row, column).NumberFormat !== "@") {
+      return Number(value);
+    }
+    return value;
+  }
+
+  entry(row, column) {
+    return this.cells.get(row + "," + column);
+  }
+
+  setEntry(row, column, entry) {
+    if (entry === undefined || entry === "" || entry === null) {
+      this.cells.delete(row + "," + column);
+    } else {
+      this.cells.set(row + "," + column, entry);
+    }
+  }
+
+  remove(row, column) {
+    this.cells.delete(row + "," + column);
+  }
+
+  /**
+   * 写入值或 A1 公式，公式的相对引用以 (anchorRow, anchorColumn) 为准
+   */
+  put(row, column, value, anchorRow, anchorColumn) {
+    if (isFormula(value)) {
+      this.setEntry(row, column, { r1c1: a1ToR1C1(value, anchorRow, anchorColumn) });
+    } else {
+      this.setEntry(row, column, this.parseInput(row, column, value));
+    }
+  }
+
+  putR1C1(row, column, value) {
+    this.setEntry(row, column, isFormula(value) ? { r1c1: value } : this.parseInput(row, column, value));
+  }
+
+  valueAt(row, column, depth) {
+    const entry = this.entry(row, column);
+    if (entry === undefined) {
+      return "";
+    }
+    if (typeof entry === "object") {
+      return evaluateFormula(this, entry.r1c1, row, column, depth);
+    }
+    return entry;
+  }
+
+  formulaAt(row, column, r1c1) {
+    const entry = this.entry(row, column);
+    if (entry === undefined) {
+      return "";
+    }
+    if (typeof entry === "object") {
+      return r1c1 ? entry.r1c1 : r1c1ToA1(entry.r1c1, row, column);
+    }
+    return entry;
+  }
+
+  Range(address) {
+    return new MockRange(this, parseAddress(address));
+  }
+
+  Cells(row, column) {
+    return new MockRange(this, { r1: row, c1: column, r2: row, c2: column });
+  }
+
+  get Rows() {
+    const rows = (index) => new MockRange(this, { r1: index, c1: 1, r2: index, c2: MAX_COLUMNS });
+    rows.Count = MAX_ROWS;
+    return rows;
+  }
+
+  get Columns() {
+    const columns = (index) => new MockRange(this, { r1: 1, c1: index, r2: MAX_ROWS, c2: index });
+    columns.Count = MAX_COLUMNS;
+    return columns;
+  }
+
+  get UsedRange() {
+    let r1 = Infinity;
+    let c1 = Infinity;
+    let r2 = 1;
+    let c2 = 1;
+    for (const key of this.cells.keys()) {
+      const [r, c] = key.split(",").map(Number);
+      r1 = Math.min(r1, r);
+      c1 = Math.min(c1, c);
+      r2 = Math.max(r2, r);
+      c2 = Math.max(c2, c);
+    }
+    if (r1 === Infinity) {
+      return new MockRange(this, { r1: 1, c1: 1, r2: 1, c2: 1 });
+    }
+    return new MockRange(this, { r1, c1, r2, c2 });
+  }
+
+  Activate() {
+    this.workbook.active = this;
+  }
+
+  Delete() {
+    this.workbook.remove(this);
+  }
+}
+
+class MockWorkbook {
+  constructor(names) {
+    this.list = [];
+    (names && names.length ? names : ["Sheet1"]).forEach((name) => this.list.push(new MockSheet(this, name)));
+    this.active = this.list[0];
+    const sheets = (key) => {
+      const sheet =
+        typeof key === "number" ? this.list[key - 1] : this.list.find((ws) => ws.Name === key);
+      if (!sheet) {
+        throw new Error("工作表不存在: " + key);
+      }
+      return sheet;
+    };
+    sheets.Item = sheets;
+    Object.defineProperty(sheets, "Count", { get: () => this.list.length });
+    // 与表格一致：不指定位置时新工作表插入到活动工作表之前，并成为活动工作表
+    sheets.Add = (before, after) => {
+      let name;
+      for (let i = this.list.length + 1; !name; i++) {
+        if (!this.list.some((ws) => ws.Name === "Sheet" + i)) {
+          name = "Sheet" + i;
+        }
+      }
+      const sheet = new MockSheet(this, name);
+      const index = after ? this.list.indexOf(after) + 1 : this.list.indexOf(before || this.active);
+      this.list.splice(index, 0, sheet);
+      this.active = sheet;
+      return sheet;
+    };
+    this.Sheets = sheets;
+    this.Worksheets = sheets;
+  }
+
+  get ActiveSheet() {
+    return this.active;
+  }
+
+  remove(sheet) {
+    if (this.list.length === 1) {
+      throw new Error("不能删除唯一的工作表");
+    }
+    this.list.splice(this.list.indexOf(sheet), 1);
+    if (this.active === sheet) {
+      this.active = this.list[0];
+    }
+  }
+
+  Save() {}
+}
+
+/**
+ * 创建模拟的 Application 对象
+ * @param {Array} sheetNames - 初始工作表名称，默认 ["Sheet1"]，第一个为活动工作表
+ */
+function createApplication(sheetNames) {
+  const workbook = new MockWorkbook(sheetNames);
+  return {
+    ActiveWorkbook: workbook,
+    get ActiveSheet() {
+      return workbook.ActiveSheet;
+    },
+    Calculation: -4105,
+    ScreenUpdating: true,
+    EnableEvents: true,
+    Calculate() {},
+  };
+}
+
+/**
+ * 编译脚本，返回 run(context)：设置全局 Context 后执行一次脚本，返回脚本的结果
+ * @param {string} source - 脚本源码
+ * @param {Object} application - createApplication 创建的对象，设置为全局 Application
+ */
+function compileScript(source, application) {
+  const script = new Function(source);
+  return function run(context) {
+    global.Application = application;
+    global.Context = context;
+    return script();
+  };
+}
+
+module.exports = {
+  a1ToR1C1,
+  compileScript,
+  createApplication,
+  numberToLetter,
+  parseAddress,
+  r1c1ToA1,
+};
@@ -0,0 +1,79 @@
+/**
+ * 精简包冷启动基准测试（node）
+ * 用内存模拟的 AirScript 对象（airscript-mock.js），对比完整脚本与精简包每次重新编译并执行的耗时
+ *
+ * 用法: node benchmark-bundle.js <完整脚本> <精简包> <函数名> [次数]
+ * 通常通过 python -m python.wps_bundle <函数名...> --benchmark <次数> 调用
+ */
+
+const fs = require("fs");
+const { compileScript, createApplication } = require("./airscript-mock");
+
+// ==================== 基准测试 ====================
+
+function runCold(source, argv, iteration, application) {
+  // 追加唯一注释，避免 V8 复用上一次的编译结果
+  return compileScript(source + "\n// run " + iteration, application)({ argv: argv });
+}
+
+function measure(source, argv, iterations) {
+  const application = createApplication();
+  const first = runCold(source, argv, -1, application);
+  if (!first || !first[0] || first[0].success !== true) {
+    throw new Error("脚本执行失败: " + JSON.stringify(first));
+  }
+  const times = [];
+  for (let i = 0; i < iterations; i++) {
+    const start = process.hrtime.bigint();
+    runCold(source, argv, i, application);
+    times.push(Number(process.hrtime.bigint() - start) / 1e6);
+  }
+  times.sort((a, b) => a - b);
+  const mean = times.reduce((sum, t) => sum + t, 0) / times.length;
+  return {
+    mean: mean,
+    p50: times[Math.floor(times.length * 0.5)],
+    p95: times[Math.min(times.length - 1, Math.floor(times.length * 0.95))],
+  };
+}
+
+function main() {
+  const [fullPath, bundlePath, functionName, count] = process.argv.slice(2);
+  const iterations = Number(count || 200);
+  const argv = {
+    function: functionName,
+    address: "A1:B2",
+    value: 1,
+    values: [
+      [1, 2],
+      [3, 4],
+    ],
+    rows: [[1, 2]],
+    items: [{ address: "A1", values: [[1]] }],
+  };
+
+  global.console = { log() {}, error() {} };
+
+  const full = fs.readFileSync(fullPath, "utf8");
+  const bundle = fs.readFileSync(bundlePath, "utf8");
+  const fullStats = measure(full, argv, iterations);
+  const bundleStats = measure(bundle, argv, iterations);
+
+  const line = (name, source, stats) =>
+    name.padEnd(8) +
+    String(Buffer.byteLength(source)).padStart(10) +
+    stats.mean.toFixed(3).padStart(10) +
+    stats.p50.toFixed(3).padStart(10) +
+    stats.p95.toFixed(3).padStart(10);
+  process.stdout.write(
+    `函数: ${functionName}，每个脚本冷启动执行 ${iterations} 次（毫秒）\n` +
+      "脚本          字节      平均       p50       p95\n" +
+      line("完整", full, fullStats) +
+      "\n" +
+      line("精简", bundle, bundleStats) +
+      "\n" +
+      `加速: ${(fullStats.mean / bundleStats.mean).toFixed(2)}x\n`
+  );
+}
+
+main();
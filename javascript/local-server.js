@@ -0,0 +1,36 @@
+/**
+ * 在 node 中运行 wps-airsheet-api.js（使用 airscript-mock.js 模拟的内存工作簿）
+ * 从标准输入逐行读取 {"argv": {...}, "active_sheet": "..."}，每个调用向标准输出写一行 JSON 结果，
+ * 脚本的 console 输出写到标准错误
+ *
+ * 用法: node local-server.js <脚本> [工作表名...]
+ * 通常由 python/wps_emulator.py 的 NodeAirScriptServer 启动
+ */
+
+const fs = require("fs");
+const readline = require("readline");
+const { compileScript, createApplication } = require("./airscript-mock");
+
+function main() {
+  const [scriptPath, ...sheetNames] = process.argv.slice(2);
+  const application = createApplication(sheetNames);
+  const run = compileScript(fs.readFileSync(scriptPath, "utf8"), application);
+  const log = (...args) => process.stderr.write(args.join(" ") + "\n");
+  global.console = { log: log, error: log, warn: log };
+
+  const input = readline.createInterface({ input: process.stdin, terminal: false });
+  input.on("line", (line) => {
+    if (!line.trim()) {
+      return;
+    }
+    let result;
+    try {
+      result = run(JSON.parse(line));
+    } catch (error) {
+      result = [{ success: false, error: error.message }];
+    }
+    process.stdout.write(JSON.stringify(result) + "\n");
+  });
+}
+
+main();
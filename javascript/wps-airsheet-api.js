@@ -19,13 +19,12 @@ var globalResult = [];
 if (typeof Context !== "undefined" && Context.argv) {
   try {
     console.log("接收到 HTTP API 调用");
-    console.log("Context:", JSON.stringify(Context));
 
     var argv = Context.argv;
     var sheetName = Context.active_sheet;
 
-    // 如果有 items 数据，使用 setRangeValues 批量写入
-    if (argv.items && Array.isArray(argv.items)) {
+    // 如果有 items 数据（且未指定函数），使用 setRangeValues 批量写入
+    if (!argv.function && argv.items && Array.isArray(argv.items)) {
       try {
         const data = argv.items;
         const rows = data.length;
@@ -49,7 +48,6 @@ if (typeof Context !== "undefined" && Context.argv) {
             message: "数据为空",
           });
         }
-        console.log("返回结果:", JSON.stringify(globalResult));
       } catch (error) {
         globalResult.push({
           success: false,
@@ -60,7 +58,8 @@ if (typeof Context !== "undefined" && Context.argv) {
     // 如果有 function 参数，执行指定函数
     else if (argv.function) {
       globalResult = executeFunction(argv.function, argv, sheetName);
-      console.log("返回结果:", JSON.stringify(globalResult));
+      // 只记录是否成功：结果可能很大，序列化记录会使脚本多做一次完整的序列化
+      console.log("执行完成:", argv.function, globalResult[0] && globalResult[0].success);
     }
     // 未指定操作
     else {
@@ -96,232 +95,14 @@ function executeFunction(functionName, params, sheetName) {
   console.log("目标工作表:", sheetName || "当前工作表");
 
   try {
-    switch (functionName) {
-      case "getCellValue":
-        result.push({
-          success: true,
-          value: getCellValue(params.address, sheetName),
-        });
-        break;
-
-      case "setCellValue":
-        setCellValue(params.address, params.value, sheetName);
-        result.push({ success: true, message: "设置成功" });
-        break;
-
-      case "getRangeValues":
-        result.push({
-          success: true,
-          values: getRangeValues(params.address, sheetName),
-        });
-        break;
-
-      case "setRangeValues":
-        setRangeValues(params.address, params.values, sheetName);
-        result.push({ success: true, message: "设置成功" });
-        break;
-
-      case "setCellFont":
-        setCellFont(params.address, params.fontOptions, sheetName);
-        result.push({ success: true, message: "字体设置成功" });
-        break;
-
-      case "setCellBackgroundColor":
-        setCellBackgroundColor(params.address, params.color, sheetName);
-        result.push({ success: true, message: "背景色设置成功" });
-        break;
-
-      case "setCellAlignment":
-        setCellAlignment(params.address, params.alignOptions, sheetName);
-        result.push({ success: true, message: "对齐方式设置成功" });
-        break;
-
-      case "setCellBorder":
-        setCellBorder(params.address, params.borderOptions, sheetName);
-        result.push({ success: true, message: "边框设置成功" });
-        break;
-
-      case "mergeCells":
-        mergeCells(params.address, sheetName);
-        result.push({ success: true, message: "合并成功" });
-        break;
-
-      case "autoFitColumns":
-        autoFitColumns(params.address, sheetName);
-        result.push({ success: true, message: "列宽调整成功" });
-        break;
-
-      case "insertRows":
-        insertRows(params.rowIndex, params.count, sheetName);
-        result.push({ success: true, message: "插入行成功" });
-        break;
-
-      case "setRowHeight":
-        setRowHeight(params.rowIndex, params.height, sheetName);
-        result.push({ success: true, message: "行高设置成功" });
-        break;
-
-      case "setColumnWidth":
-        setColumnWidth(params.columnIndex, params.width, sheetName);
-        result.push({ success: true, message: "列宽设置成功" });
-        break;
-
-      case "findCell":
-        const cells = findCell(
-          params.searchText,
-          params.searchRange,
-          sheetName
-        );
-        result.push({
-          success: true,
-          found: cells.length > 0,
-          cells: cells,
-        });
-        break;
-
-      case "replaceInRangeWithCount":
-        const count = replaceInRangeWithCount(
-          params.searchText,
-          params.replaceText,
-          params.searchRange,
-          sheetName
-        );
-        result.push({ success: true, count: count });
-        break;
-
-      case "sortRange":
-        sortRange(params.address, params.sortOptions, sheetName);
-        result.push({ success: true, message: "排序成功" });
-        break;
-
-      case "copyPasteRange":
-        copyPasteRange(
-          params.sourceAddress,
-          params.targetAddress,
-          sheetName,
-          sheetName
-        );
-        result.push({ success: true, message: "复制粘贴成功" });
-        break;
-
-      case "clearRange":
-        clearRange(params.address, sheetName);
-        result.push({ success: true, message: "清除成功" });
-        break;
-
-      case "clearRangeContents":
-        clearRangeContents(params.address, sheetName);
-        result.push({ success: true, message: "清除内容成功" });
-        break;
-
-      case "getCellFormula":
-        result.push({
-          success: true,
-          formula: getCellFormula(params.address, sheetName),
-        });
-        break;
-
-      case "setCellFormula":
-        setCellFormula(params.address, params.formula, sheetName);
-        result.push({ success: true, message: "设置公式成功" });
-        break;
-
-      case "setCellNumberFormat":
-        setCellNumberFormat(params.address, params.format, sheetName);
-        result.push({ success: true, message: "设置数字格式成功" });
-        break;
-
-      case "unmergeCells":
-        unmergeCells(params.address, sheetName);
-        result.push({ success: true, message: "取消合并成功" });
-        break;
-
-      case "deleteRows":
-        deleteRows(params.rowIndex, params.count, sheetName);
-        result.push({ success: true, message: "删除行成功" });
-        break;
-
-      case "insertColumns":
-        insertColumns(params.columnIndex, params.count, sheetName);
-        result.push({ success: true, message: "插入列成功" });
-        break;
-
-      case "deleteColumns":
-        deleteColumns(params.columnIndex, params.count, sheetName);
-        result.push({ success: true, message: "删除列成功" });
-        break;
-
-      case "findAllCells":
-        const allCells = findAllCells(
-          params.searchText,
-          params.searchRange,
-          sheetName
-        );
-        // 转换为标准格式
-        const cellsInfo = allCells.map((cell) => ({
-          address: cell.Address,
-          value: cell.Value,
-          row: cell.Row,
-          column: cell.Column,
-        }));
-        result.push({
-          success: true,
-          cells: cellsInfo,
-          count: cellsInfo.length,
-        });
-        break;
-
-      case "copyRange":
-        copyRange(params.sourceAddress, sheetName);
-        result.push({ success: true, message: "复制成功" });
-        break;
-
-      case "pasteToRange":
-        pasteToRange(params.targetAddress, sheetName);
-        result.push({ success: true, message: "粘贴成功" });
-        break;
-
-      case "getUsedRangeData":
-        result.push({
-          success: true,
-          data: getUsedRangeData(sheetName),
-        });
-        break;
-
-      case "addWorksheet":
-        const newSheet = addWorksheet(params.sheetName);
-        result.push({
-          success: true,
-          message: "添加工作表成功",
-          sheetName: newSheet.Name,
-        });
-        break;
-
-      case "deleteWorksheet":
-        deleteWorksheet(params.sheetIdentifier);
-        result.push({ success: true, message: "删除工作表成功" });
-        break;
-
-      case "worksheetExists":
-        result.push({
-          success: true,
-          exists: worksheetExists(params.sheetName),
-        });
-        break;
-
-      case "getWorksheetCount":
-        result.push({ success: true, count: getWorksheetCount() });
-        break;
-
-      case "getWorkbookName":
-        result.push({ success: true, sheets: getWorkbookName() });
-        break;
-
-      default:
-        result.push({
-          success: false,
-          message: "未知函数: " + functionName,
-        });
+    const handlers = getFunctionHandlers();
+    if (Object.prototype.hasOwnProperty.call(handlers, functionName)) {
+      result.push(handlers[functionName](params, sheetName));
+    } else {
+      result.push({
+        success: false,
+        message: "未知函数: " + functionName,
+      });
     }
   } catch (error) {
     result.push({
@@ -332,6 +113,403 @@ function executeFunction(functionName, params, sheetName) {
   return result;
 }
 
+/**
+ * 函数分发表：函数名 -> 处理函数 (params, sheetName)，返回结果对象
+ * @returns {Object} 分发表
+ */
+function getFunctionHandlers() {
+  return {
+    getCellValue: function (params, sheetName) {
+      return {
+        success: true,
+        value: getCellValue(params.address, sheetName),
+      };
+    },
+
+    setCellValue: function (params, sheetName) {
+      setCellValue(params.address, params.value, sheetName);
+      return { success: true, message: "设置成功" };
+    },
+
+    getRangeValues: function (params, sheetName) {
+      return {
+        success: true,
+        values: getRangeValues(params.address, sheetName),
+      };
+    },
+
+    setRangeValues: function (params, sheetName) {
+      setRangeValues(params.address, params.values, sheetName);
+      return { success: true, message: "设置成功" };
+    },
+
+    getRangeIfChanged: function (params, sheetName) {
+      return Object.assign(
+        { success: true },
+        getRangeIfChanged(params.address, params.fingerprint, sheetName)
+      );
+    },
+
+    getRangeSnapshot: function (params, sheetName) {
+      return Object.assign(
+        { success: true },
+        getRangeSnapshot(params.address, sheetName)
+      );
+    },
+
+    getChangesSince: function (params, sheetName) {
+      return Object.assign(
+        { success: true },
+        getChangesSince(params.cursor, sheetName)
+      );
+    },
+
+    compareAndSet: function (params, sheetName) {
+      return Object.assign(
+        { success: true },
+        compareAndSet(
+          params.address,
+          params.expectedFingerprint,
+          params.values,
+          sheetName
+        )
+      );
+    },
+
+    setCellFont: function (params, sheetName) {
+      setCellFont(params.address, params.fontOptions, sheetName);
+      return { success: true, message: "字体设置成功" };
+    },
+
+    setCellBackgroundColor: function (params, sheetName) {
+      setCellBackgroundColor(params.address, params.color, sheetName);
+      return { success: true, message: "背景色设置成功" };
+    },
+
+    setCellAlignment: function (params, sheetName) {
+      setCellAlignment(params.address, params.alignOptions, sheetName);
+      return { success: true, message: "对齐方式设置成功" };
+    },
+
+    setCellBorder: function (params, sheetName) {
+      setCellBorder(params.address, params.borderOptions, sheetName);
+      return { success: true, message: "边框设置成功" };
+    },
+
+    mergeCells: function (params, sheetName) {
+      mergeCells(params.address, sheetName);
+      return { success: true, message: "合并成功" };
+    },
+
+    autoFitColumns: function (params, sheetName) {
+      autoFitColumns(params.address, sheetName);
+      return { success: true, message: "列宽调整成功" };
+    },
+
+    insertRows: function (params, sheetName) {
+      insertRows(params.rowIndex, params.count, sheetName);
+      return { success: true, message: "插入行成功" };
+    },
+
+    setRowHeight: function (params, sheetName) {
+      setRowHeight(params.rowIndex, params.height, sheetName);
+      return { success: true, message: "行高设置成功" };
+    },
+
+    setColumnWidth: function (params, sheetName) {
+      setColumnWidth(params.columnIndex, params.width, sheetName);
+      return { success: true, message: "列宽设置成功" };
+    },
+
+    applyRowSpans: function (params, sheetName) {
+      return {
+        success: true,
+        count: applyStructuralSpans("rows", params.action, params.spans, sheetName),
+      };
+    },
+
+    applyColumnSpans: function (params, sheetName) {
+      return {
+        success: true,
+        count: applyStructuralSpans("columns", params.action, params.spans, sheetName),
+      };
+    },
+
+    findCell: function (params, sheetName) {
+      const cells = findCell(
+        params.searchText,
+        params.searchRange,
+        sheetName
+      );
+      return {
+        success: true,
+        found: cells.length > 0,
+        cells: cells,
+      };
+    },
+
+    replaceInRangeWithCount: function (params, sheetName) {
+      const count = replaceInRangeWithCount(
+        params.searchText,
+        params.replaceText,
+        params.searchRange,
+        sheetName
+      );
+      return { success: true, count: count };
+    },
+
+    sortRange: function (params, sheetName) {
+      sortRange(params.address, params.sortOptions, sheetName);
+      return { success: true, message: "排序成功" };
+    },
+
+    dedupeRows: function (params, sheetName) {
+      return Object.assign(
+        { success: true },
+        dedupeRows(params.address, params.keyColumns, params.options, sheetName)
+      );
+    },
+
+    normalizeRange: function (params, sheetName) {
+      return Object.assign(
+        { success: true },
+        normalizeRange(params.address, params.ops, sheetName)
+      );
+    },
+
+    sortRangeByKeys: function (params, sheetName) {
+      return Object.assign(
+        { success: true },
+        sortRangeByKeys(params.address, params.keys, params.options, sheetName)
+      );
+    },
+
+    copyPasteRange: function (params, sheetName) {
+      copyPasteRange(
+        params.sourceAddress,
+        params.targetAddress,
+        params.sourceSheet || sheetName,
+        params.targetSheet || sheetName
+      );
+      return { success: true, message: "复制粘贴成功" };
+    },
+
+    copyBlock: function (params, sheetName) {
+      return Object.assign(
+        { success: true },
+        copyBlock(
+          params.sourceSheet || sheetName,
+          params.sourceAddress,
+          params.targetSheet || sheetName,
+          params.targetCell,
+          params.mode
+        )
+      );
+    },
+
+    clearRange: function (params, sheetName) {
+      clearRange(params.address, sheetName);
+      return { success: true, message: "清除成功" };
+    },
+
+    clearRangeContents: function (params, sheetName) {
+      clearRangeContents(params.address, sheetName);
+      return { success: true, message: "清除内容成功" };
+    },
+
+    getCellFormula: function (params, sheetName) {
+      return {
+        success: true,
+        formula: getCellFormula(params.address, sheetName),
+      };
+    },
+
+    setCellFormula: function (params, sheetName) {
+      setCellFormula(params.address, params.formula, sheetName);
+      return { success: true, message: "设置公式成功" };
+    },
+
+    getRangeFormulas: function (params, sheetName) {
+      return {
+        success: true,
+        formulas: getRangeFormulas(params.address, sheetName),
+      };
+    },
+
+    setRangeFormulas: function (params, sheetName) {
+      setRangeFormulas(params.address, params.formulas, sheetName);
+      return { success: true, message: "设置公式成功" };
+    },
+
+    fillFormula: function (params, sheetName) {
+      fillFormula(params.address, params.formula, sheetName);
+      return { success: true, message: "填充公式成功" };
+    },
+
+    setCellNumberFormat: function (params, sheetName) {
+      setCellNumberFormat(params.address, params.format, sheetName);
+      return { success: true, message: "设置数字格式成功" };
+    },
+
+    unmergeCells: function (params, sheetName) {
+      unmergeCells(params.address, sheetName);
+      return { success: true, message: "取消合并成功" };
+    },
+
+    deleteRows: function (params, sheetName) {
+      deleteRows(params.rowIndex, params.count, sheetName);
+      return { success: true, message: "删除行成功" };
+    },
+
+    insertColumns: function (params, sheetName) {
+      insertColumns(params.columnIndex, params.count, sheetName);
+      return { success: true, message: "插入列成功" };
+    },
+
+    deleteColumns: function (params, sheetName) {
+      deleteColumns(params.columnIndex, params.count, sheetName);
+      return { success: true, message: "删除列成功" };
+    },
+
+    findAllCells: function (params, sheetName) {
+      const allCells = findAllCells(
+        params.searchText,
+        params.searchRange,
+        sheetName
+      );
+      // 转换为标准格式
+      const cellsInfo = allCells.map((cell) => ({
+        address: cell.Address,
+        value: cell.Value,
+        row: cell.Row,
+        column: cell.Column,
+      }));
+      return {
+        success: true,
+        cells: cellsInfo,
+        count: cellsInfo.length,
+      };
+    },
+
+    copyRange: function (params, sheetName) {
+      copyRange(params.sourceAddress, sheetName);
+      return { success: true, message: "复制成功" };
+    },
+
+    pasteToRange: function (params, sheetName) {
+      pasteToRange(params.targetAddress, sheetName);
+      return { success: true, message: "粘贴成功" };
+    },
+
+    getUsedRangeData: function (params, sheetName) {
+      return {
+        success: true,
+        data: getUsedRangeData(sheetName),
+      };
+    },
+
+    addWorksheet: function (params, sheetName) {
+      const newSheet = addWorksheet(params.sheetName);
+      return {
+        success: true,
+        message: "添加工作表成功",
+        sheetName: newSheet.Name,
+      };
+    },
+
+    deleteWorksheet: function (params, sheetName) {
+      deleteWorksheet(params.sheetIdentifier);
+      return { success: true, message: "删除工作表成功" };
+    },
+
+    worksheetExists: function (params, sheetName) {
+      return {
+        success: true,
+        exists: worksheetExists(params.sheetName),
+      };
+    },
+
+    getWorksheetCount: function (params, sheetName) {
+      return { success: true, count: getWorksheetCount() };
+    },
+
+    getWorkbookName: function (params, sheetName) {
+      return { success: true, sheets: getWorkbookName() };
+    },
+
+    describeWorkbook: function (params, sheetName) {
+      return Object.assign({ success: true }, describeWorkbook());
+    },
+
+    setRangeValuesBatch: function (params, sheetName) {
+      const batchRun = runInBulkMode(params.bulkMode, () =>
+        setRangeValuesBatch(params.items, sheetName)
+      );
+      return {
+        success: true,
+        count: batchRun.result,
+        timings: batchRun.timings,
+      };
+    },
+
+    runBatch: function (params, sheetName) {
+      return Object.assign(
+        { success: true },
+        runBatch(params.operations, params.bulkMode, sheetName)
+      );
+    },
+
+    queryRange: function (params, sheetName) {
+      return Object.assign({ success: true }, queryRange(params.spec, sheetName));
+    },
+
+    upsertRows: function (params, sheetName) {
+      return Object.assign(
+        { success: true },
+        upsertRows(
+          params.keyColumn,
+          params.rows,
+          params.hasHeader,
+          params.returnIndex,
+          sheetName
+        )
+      );
+    },
+
+    getKeyIndex: function (params, sheetName) {
+      return {
+        success: true,
+        index: getKeyIndex(params.keyColumn, params.hasHeader, sheetName),
+      };
+    },
+
+    getUsedRangeInfo: function (params, sheetName) {
+      const usedSheet = getWorksheetByName(sheetName);
+      if (!usedSheet) {
+        throw new Error("未找到工作表: " + sheetName);
+      }
+      return Object.assign(
+        { success: true },
+        getUsedRangeInfo(usedSheet, false)
+      );
+    },
+
+    getRangeFingerprints: function (params, sheetName) {
+      return Object.assign(
+        { success: true },
+        getRangeFingerprints(params.blockRows, sheetName)
+      );
+    },
+
+    appendRows: function (params, sheetName) {
+      return Object.assign(
+        { success: true },
+        appendRows(params.rows, params.column, sheetName)
+      );
+    },
+  };
+}
+
 // ==================== 工作簿 (Workbook) 相关操作 ====================
 
 /**
@@ -354,14 +532,9 @@ function getWorkbookName(workbook) {
     // WPS AirScript 可能不支持获取工作簿名称
     // 返回所有工作表名称作为替代
     if (wb && wb.Sheets) {
-      const sheets = wb.Sheets;
-      const sheetNames = [];
-
-      for (let i = 1; i <= sheets.Count; i++) {
-        sheetNames.push(sheets.Item(i).Name);
-      }
-
-      return sheetNames;
+      return getUserWorksheets(wb).map(function (sheet) {
+        return sheet.Name;
+      });
     }
 
     return [];
@@ -424,10 +597,10 @@ function getWorksheetByName(sheetName) {
     }
   }
 
-  // 模糊匹配（包含）
+  // 模糊匹配（包含），不匹配内部工作表
   for (let i = 1; i <= sheetCount; i++) {
     const sheet = workbook.Sheets(i);
-    if (sheet.Name.includes(sheetName)) {
+    if (!isInternalWorksheet(sheet) && sheet.Name.includes(sheetName)) {
       console.log("找到匹配的工作表:", sheet.Name);
       return sheet;
     }
@@ -438,15 +611,40 @@ function getWorksheetByName(sheetName) {
   return null;
 }
 
+/**
+ * 脚本内部使用的工作表（变更订阅的隐藏工作表），不出现在工作表列表、数量和模糊匹配中
+ * @param {Object} sheet - 工作表对象
+ * @returns {boolean}
+ */
+function isInternalWorksheet(sheet) {
+  return sheet.Name === getChangeLogSheetName();
+}
+
+/**
+ * 获取用户工作表（不含内部工作表），按工作簿中的顺序
+ * @param {Object} workbook - 工作簿对象，不传则使用当前活动工作簿
+ * @returns {Array} 工作表对象数组
+ */
+function getUserWorksheets(workbook) {
+  const wb = workbook || getActiveWorkbook();
+  const sheets = [];
+  for (let i = 1; i <= wb.Sheets.Count; i++) {
+    const sheet = wb.Sheets.Item(i);
+    if (!isInternalWorksheet(sheet)) {
+      sheets.push(sheet);
+    }
+  }
+  return sheets;
+}
+
 /**
  * 根据索引获取工作表
- * @param {number} index - 工作表索引（从1开始）
+ * @param {number} index - 工作表索引（从1开始，与 getWorkbookName 返回的顺序一致，不计内部工作表）
  * @param {Object} workbook - 工作簿对象，不传则使用当前活动工作簿
  * @returns {Object} 工作表对象
  */
 function getWorksheetByIndex(index, workbook) {
-  const wb = workbook || getActiveWorkbook();
-  return wb.Worksheets.Item(index);
+  return getUserWorksheets(workbook)[index - 1];
 }
 
 /**
@@ -467,10 +665,10 @@ function worksheetExists(sheetName, workbook) {
     }
   }
 
-  // 模糊匹配（包含）
+  // 模糊匹配（包含），不匹配内部工作表
   for (let i = 1; i <= sheetCount; i++) {
     const sheet = wb.Sheets(i);
-    if (sheet.Name.includes(sheetName)) {
+    if (!isInternalWorksheet(sheet) && sheet.Name.includes(sheetName)) {
       return true;
     }
   }
@@ -522,13 +720,12 @@ function deleteWorksheet(sheetIdentifier, workbook) {
 }
 
 /**
- * 获取工作表数量
+ * 获取工作表数量（不计内部工作表）
  * @param {Object} workbook - 工作簿对象，不传则使用当前活动工作簿
  * @returns {number} 工作表数量
  */
 function getWorksheetCount(workbook) {
-  const wb = workbook || getActiveWorkbook();
-  return wb.Worksheets.Count;
+  return getUserWorksheets(workbook).length;
 }
 
 // ==================== 单元格 (Range) 相关操作 ====================
@@ -603,6 +800,20 @@ function setRangeValues(address, values, sheetName) {
   range.Value = values;
 }
 
+/**
+ * 批量设置多个区域的值（一次脚本执行完成所有写入）
+ * @param {Array} items - 写入项数组 [{ address, values, sheet }]，sheet 可选
+ * @param {string} sheetName - 默认工作表名称，写入项未指定 sheet 时使用
+ * @returns {number} 写入的区域数量
+ */
+function setRangeValuesBatch(items, sheetName) {
+  for (let i = 0; i < items.length; i++) {
+    const item = items[i];
+    setRangeValues(item.address, item.values, item.sheet || sheetName);
+  }
+  return items.length;
+}
+
 /**
  * 清除单元格内容
  * @param {string} address - 单元格地址，如 "A1" 或 "A1:B10"
@@ -645,6 +856,39 @@ function setCellFormula(address, formula, sheetName) {
   range.Formula = formula;
 }
 
+/**
+ * 获取单元格区域的公式（二维数组，无公式的单元格返回其值）
+ * @param {string} address - 单元格区域地址，如 "A1:C10"
+ * @param {string} sheetName - 工作表名称，不传则使用当前活动工作表
+ * @returns {Array} 二维数组
+ */
+function getRangeFormulas(address, sheetName) {
+  const range = getRange(address, sheetName);
+  return toMatrix(range.Formula);
+}
+
+/**
+ * 设置单元格区域的公式（二维数组，一次赋值）
+ * @param {string} address - 单元格区域地址，如 "A1:C10"
+ * @param {Array} formulas - 二维数组，元素为公式字符串或常量
+ * @param {string} sheetName - 工作表名称，不传则使用当前活动工作表
+ */
+function setRangeFormulas(address, formulas, sheetName) {
+  const range = getRange(address, sheetName);
+  range.Formula = formulas;
+}
+
+/**
+ * 用同一个 R1C1 公式填充整个区域（相对引用按单元格位置自动调整）
+ * @param {string} address - 单元格区域地址，如 "D2:D10000"
+ * @param {string} formula - R1C1 格式公式，如 "=RC[-2]*RC[-1]"
+ * @param {string} sheetName - 工作表名称，不传则使用当前活动工作表
+ */
+function fillFormula(address, formula, sheetName) {
+  const range = getRange(address, sheetName);
+  range.FormulaR1C1 = formula;
+}
+
 // ==================== 单元格格式化操作 ====================
 
 /**
@@ -776,6 +1020,45 @@ function deleteColumns(columnIndex, count = 1, sheetName) {
   }
 }
 
+/**
+ * 批量插入或删除多段行/列（一次脚本执行完成）
+ * 各段按索引从大到小（自下而上、从右到左）处理，前面的索引不受后面操作的影响，
+ * 因此所有索引均指操作前的原始位置
+ * @param {string} axis - "rows" 或 "columns"
+ * @param {string} action - "insert" 或 "delete"
+ * @param {Array} spans - 连续段数组 [{ index, count }]，index 从1开始
+ * @param {string} sheetName - 工作表名称，不传则使用当前活动工作表
+ * @returns {number} 插入或删除的总行数/列数
+ */
+function applyStructuralSpans(axis, action, spans, sheetName) {
+  const ws = getWorksheetByName(sheetName);
+  if (!ws) {
+    throw new Error("未找到工作表: " + sheetName);
+  }
+
+  const sorted = spans.slice().sort((a, b) => b.index - a.index);
+  let total = 0;
+  for (let i = 0; i < sorted.length; i++) {
+    const start = sorted[i].index;
+    const end = start + sorted[i].count - 1;
+    const target =
+      axis === "rows"
+        ? ws.Range(`${start}:${end}`).EntireRow
+        : ws.Range(`${columnNumberToLetter(start)}:${columnNumberToLetter(end)}`)
+            .EntireColumn;
+
+    if (action === "delete") {
+      target.Delete();
+    } else if (action === "insert") {
+      target.Insert();
+    } else {
+      throw new Error("未知操作: " + action);
+    }
+    total += sorted[i].count;
+  }
+  return total;
+}
+
 /**
  * 设置行高
  * @param {number} rowIndex - 行索引（从1开始）
@@ -948,20 +1231,390 @@ function replaceInRangeWithCount(
  * 对区域进行排序
  * @param {string} address - 要排序的区域地址
  * @param {Object} sortOptions - 排序选项 { key, order, hasHeader }
- *   - key: 排序关键列地址，如 "A1"
- *   - order: 排序顺序，1=升序，2=降序
- *   - hasHeader: 是否包含标题行，默认 false
+ *   - key: 排序关键列，单元格地址如 "B1"、列字母如 "B"，或区域内的列序号（从 1 开始）
+ *   - order: 排序顺序，1 或 "asc" 升序，2 或 "desc" 降序
+ *   - hasHeader（或 hasHeaders）: 是否包含标题行，默认 false
  * @param {string} sheetName - 工作表名称，不传则使用当前活动工作表
  */
 function sortRange(address, sortOptions, sheetName) {
   const range = getRange(address, sheetName);
-  const key = getRange(sortOptions.key, sheetName);
-  const order = sortOptions.order || 1;
-  const header = sortOptions.hasHeader ? 1 : 2;
+  const column = sortKeyColumn(range, sortOptions.key);
+  const key = range.Cells(1, column);
+  const order = sortOrder(sortOptions.order);
+  const hasHeader = sortOptions.hasHeader !== undefined ? sortOptions.hasHeader : sortOptions.hasHeaders;
+  const header = hasHeader ? 1 : 2;
 
   range.Sort(key, order, null, null, null, null, null, header);
 }
 
+/**
+ * 将排序键转换为区域内的列序号（从 1 开始）
+ * @param {Object} range - 要排序的区域
+ * @param {number|string} key - 区域内的列序号、列字母（如 "C"）或单元格地址（如 "C1"）
+ * @returns {number} 区域内的列序号
+ */
+function sortKeyColumn(range, key) {
+  let column = key;
+  if (typeof key === "string") {
+    const letters = key.replace(/\$/g, "").match(/^([A-Za-z]+)\d*$/);
+    if (!letters) {
+      throw new Error("排序键格式错误: " + key);
+    }
+    column = columnLetterToNumber(letters[1].toUpperCase()) - range.Column + 1;
+  }
+  if (!(column >= 1 && column <= range.Columns.Count)) {
+    throw new Error("排序键不在区域内: " + key);
+  }
+  return column;
+}
+
+/**
+ * 排序顺序：1 或 "asc" 为升序（xlAscending），2 或 "desc" 为降序（xlDescending）
+ */
+function sortOrder(order) {
+  return order === 2 || order === "desc" ? 2 : 1;
+}
+
+/**
+ * 比较两个单元格值，顺序与表格排序一致：数字 < 文本（不区分大小写）< 逻辑值，空单元格始终排在最后
+ * @returns {number} 负数、0 或正数；空单元格的比较结果不受升降序影响，由调用方处理
+ */
+function compareCellValues(a, b) {
+  const rank = function (value) {
+    return typeof value === "number" ? 0 : typeof value === "boolean" ? 2 : 1;
+  };
+  const ra = rank(a);
+  const rb = rank(b);
+  if (ra !== rb) {
+    return ra - rb;
+  }
+  if (ra === 1) {
+    a = String(a).toLowerCase();
+    b = String(b).toLowerCase();
+  }
+  return a < b ? -1 : a > b ? 1 : 0;
+}
+
+/**
+ * 判断区域第一行是否为标题行：第一行全部为非空文本，且某个排序列的数据行中有非文本值
+ */
+function detectSortHeader(data, columns) {
+  if (data.length < 2 || !data[0].every(function (value) {
+    return typeof value === "string" && value !== "";
+  })) {
+    return false;
+  }
+  return columns.some(function (column) {
+    for (let i = 1; i < data.length; i++) {
+      const value = data[i][column - 1];
+      if (!isEmptyValue(value) && typeof value !== "string") {
+        return true;
+      }
+    }
+    return false;
+  });
+}
+
+/**
+ * 按多个键排序区域（稳定排序：键相同的行保持原有顺序）
+ * 不超过 3 个键时使用原生 Range.Sort（保留格式）；键更多、原生排序失败或指定 method="memory" 时，
+ * 在内存中排序后一次写回（只移动值和公式，不移动格式）
+ * @param {string} address - 要排序的区域地址
+ * @param {Array} keys - 排序键 [{ column, order }]，column 为区域内的列序号、列字母或单元格地址，
+ *   order 为 "asc"/"desc"（或 1/2），默认升序
+ * @param {Object} options - { header, method }
+ *   - header: true、false 或 "auto"（默认，自动判断第一行是否为标题行）
+ *   - method: "auto"（默认）、"native" 或 "memory"
+ * @param {string} sheetName - 工作表名称，不传则使用当前活动工作表
+ * @returns {Object} { method, header, rows, keys }，rows 为排序的数据行数
+ */
+function sortRangeByKeys(address, keys, options, sheetName) {
+  const opts = options || {};
+  const method = opts.method || "auto";
+  if (!keys || keys.length === 0) {
+    throw new Error("至少需要一个排序键");
+  }
+  const range = getRange(address, sheetName);
+  const sortKeys = keys.map(function (key) {
+    const spec = typeof key === "object" ? key : { column: key };
+    return { column: sortKeyColumn(range, spec.column), order: sortOrder(spec.order) };
+  });
+
+  const values = toMatrix(range.Value);
+  const keyColumns = sortKeys.map(function (key) {
+    return key.column;
+  });
+  const header =
+    opts.header === undefined || opts.header === "auto"
+      ? detectSortHeader(values, keyColumns)
+      : Boolean(opts.header);
+  const result = { header: header, rows: values.length - (header ? 1 : 0), keys: sortKeys };
+
+  if (method !== "memory" && sortKeys.length <= 3) {
+    try {
+      const k = sortKeys.concat([null, null]);
+      const cell = function (key) {
+        return key ? range.Cells(1, key.column) : null;
+      };
+      const order = function (key) {
+        return key ? key.order : null;
+      };
+      range.Sort(
+        cell(k[0]), order(k[0]),
+        cell(k[1]), null, order(k[1]),
+        cell(k[2]), order(k[2]),
+        header ? 1 : 2
+      );
+      result.method = "native";
+      return result;
+    } catch (e) {
+      if (method === "native") {
+        throw e;
+      }
+      console.log("原生排序失败，改为内存排序:", e.message);
+    }
+  } else if (method === "native") {
+    throw new Error("原生排序最多支持 3 个键");
+  }
+
+  // 内存排序：按值比较，含公式时移动公式
+  const start = header ? 1 : 0;
+  const content = readRangeContent(range, values).content;
+  const indices = [];
+  for (let i = start; i < values.length; i++) {
+    indices.push(i);
+  }
+  indices.sort(function (a, b) {
+    for (let k = 0; k < sortKeys.length; k++) {
+      const va = values[a][sortKeys[k].column - 1];
+      const vb = values[b][sortKeys[k].column - 1];
+      const ea = isEmptyValue(va);
+      const eb = isEmptyValue(vb);
+      let cmp;
+      if (ea || eb) {
+        cmp = ea === eb ? 0 : ea ? 1 : -1;
+      } else {
+        cmp = compareCellValues(va, vb);
+        if (sortKeys[k].order === 2) {
+          cmp = -cmp;
+        }
+      }
+      if (cmp !== 0) {
+        return cmp;
+      }
+    }
+    return a - b;
+  });
+
+  const sorted = indices.map(function (i) {
+    return content[i];
+  });
+  if (sorted.length > 0) {
+    writeRangeContent(range.Cells(start + 1, 1).Resize(sorted.length, content[0].length), sorted);
+  }
+  result.method = "memory";
+  return result;
+}
+
+// ==================== 数据清理 ====================
+
+/**
+ * 读取区域内容，用于在内存中整理后写回：公式单元格为 R1C1 公式文本（"=..."），其他单元格为值
+ * 公式使用 R1C1 格式，相对引用是相对于所在单元格的偏移，行被移动（排序、删除重复行）后
+ * 写回新位置时仍引用同一相对位置的单元格（如本行的 "=RC[-2]*RC[-1]"），与原生排序一致
+ * @param {Object} range - 区域对象
+ * @param {Array} values - 已读取的 toMatrix(range.Value)，不传则读取
+ * @returns {Object} { values, content, hasFormula }，不含公式时 content 与 values 相同
+ */
+function readRangeContent(range, values) {
+  const data = values || toMatrix(range.Value);
+  const formulas = toMatrix(range.FormulaR1C1);
+  const hasFormula = formulas.some(function (row) {
+    return row.some(isFormulaText);
+  });
+  const content = hasFormula
+    ? data.map(function (row, r) {
+      return row.map(function (value, c) {
+        return isFormulaText(formulas[r][c]) ? formulas[r][c] : value;
+      });
+    })
+    : data;
+  return { values: data, content: content, hasFormula: hasFormula };
+}
+
+/**
+ * 写回 readRangeContent 得到的内容：含公式时通过 FormulaR1C1 写入，保留公式
+ */
+function writeRangeContent(range, content) {
+  const hasFormula = content.some(function (row) {
+    return row.some(isFormulaText);
+  });
+  if (hasFormula) {
+    range.FormulaR1C1 = content;
+  } else {
+    range.Value = content;
+  }
+}
+
+function isFormulaText(value) {
+  return typeof value === "string" && value.charAt(0) === "=";
+}
+
+/**
+ * 删除重复行：键列的值都相同的行只保留一行，其余行上移，区域底部空出的行被清空（一次读取、一次写回）
+ * @param {string} address - 区域地址，如 "A1:F5000"
+ * @param {Array} keyColumns - 键列（区域内的列序号、列字母或单元格地址），为空时比较整行
+ * @param {Object} options - { header, keep, ignoreCase, trim }
+ *   - header: true、false 或 "auto"（默认，规则同 sortRangeByKeys）
+ *   - keep: "first"（默认）保留第一次出现的行，"last" 保留最后一次出现的行
+ *   - ignoreCase / trim: 比较文本键时是否忽略大小写 / 首尾空白，默认 false
+ * @param {string} sheetName - 工作表名称，不传则使用当前活动工作表
+ * @returns {Object} { header, rows, rowsKept, rowsRemoved }
+ */
+function dedupeRows(address, keyColumns, options, sheetName) {
+  const opts = options || {};
+  const range = getRange(address, sheetName);
+  const read = readRangeContent(range);
+  const values = read.values;
+  const width = range.Columns.Count;
+  let columns = (keyColumns || []).map(function (key) {
+    return sortKeyColumn(range, key);
+  });
+  if (columns.length === 0) {
+    columns = [];
+    for (let c = 1; c <= width; c++) {
+      columns.push(c);
+    }
+  }
+  const header =
+    opts.header === undefined || opts.header === "auto"
+      ? detectSortHeader(values, columns)
+      : Boolean(opts.header);
+  const start = header ? 1 : 0;
+
+  const keyOf = function (row) {
+    return JSON.stringify(
+      columns.map(function (column) {
+        let value = row[column - 1];
+        if (typeof value === "string") {
+          if (opts.trim) {
+            value = value.trim();
+          }
+          if (opts.ignoreCase) {
+            value = value.toLowerCase();
+          }
+        }
+        return isEmptyValue(value) ? "" : value;
+      })
+    );
+  };
+
+  // 键 -> 保留的行下标
+  const keep = {};
+  for (let i = start; i < values.length; i++) {
+    const key = keyOf(values[i]);
+    if (opts.keep === "last" || !Object.prototype.hasOwnProperty.call(keep, key)) {
+      keep[key] = i;
+    }
+  }
+  const kept = [];
+  for (let i = start; i < values.length; i++) {
+    if (keep[keyOf(values[i])] === i) {
+      kept.push(read.content[i]);
+    }
+  }
+
+  const rows = values.length - start;
+  const removed = rows - kept.length;
+  if (removed > 0) {
+    const blank = [];
+    for (let c = 0; c < width; c++) {
+      blank.push("");
+    }
+    while (kept.length < rows) {
+      kept.push(blank);
+    }
+    writeRangeContent(range.Cells(start + 1, 1).Resize(rows, width), kept);
+  }
+  return { header: header, rows: rows, rowsKept: rows - removed, rowsRemoved: removed };
+}
+
+/**
+ * 批量清理单元格值（一次读取、一次写回，公式单元格不处理）
+ * @param {string} address - 区域地址，如 "A1:F5000"
+ * @param {Array} ops - 按顺序执行的清理操作：
+ *   - "trim": 去除首尾空白（包括全角空格和不换行空格）
+ *   - "collapse_whitespace": 连续空白合并为一个空格
+ *   - "remove_nonprinting": 删除控制字符和零宽字符
+ *   - "empty_to_null": 只含空白的文本清空为空单元格
+ *   - "to_number": 数字文本转换为数字（如 "1,234.5"）
+ *   - "lower" / "upper": 转换为小写 / 大写
+ * @param {string} sheetName - 工作表名称，不传则使用当前活动工作表
+ * @returns {Object} { cells, cellsChanged }
+ */
+function normalizeRange(address, ops, sheetName) {
+  const transforms = {
+    trim: function (value) {
+      return typeof value === "string" ? value.replace(/^[\s\u3000\u00a0]+|[\s\u3000\u00a0]+$/g, "") : value;
+    },
+    collapse_whitespace: function (value) {
+      return typeof value === "string" ? value.replace(/[\s\u3000\u00a0]+/g, " ") : value;
+    },
+    remove_nonprinting: function (value) {
+      return typeof value === "string"
+        ? value.replace(/[\u0000-\u0008\u000b\u000c\u000e-\u001f\u007f\u200b-\u200d\ufeff]/g, "")
+        : value;
+    },
+    empty_to_null: function (value) {
+      return typeof value === "string" && /^[\s\u3000\u00a0]*$/.test(value) ? "" : value;
+    },
+    to_number: function (value) {
+      if (typeof value !== "string" || !/^\s*[-+]?(\d{1,3}(,\d{3})+|\d+)?(\.\d+)?([eE][-+]?\d+)?\s*$/.test(value)
+        || !/\d/.test(value)) {
+        return value;
+      }
+      return Number(value.replace(/,/g, ""));
+    },
+    lower: function (value) {
+      return typeof value === "string" ? value.toLowerCase() : value;
+    },
+    upper: function (value) {
+      return typeof value === "string" ? value.toUpperCase() : value;
+    },
+  };
+  const steps = (ops || []).map(function (op) {
+    if (!Object.prototype.hasOwnProperty.call(transforms, op)) {
+      throw new Error("不支持的清理操作: " + op);
+    }
+    return transforms[op];
+  });
+
+  const range = getRange(address, sheetName);
+  const read = readRangeContent(range);
+  let changed = 0;
+  let cells = 0;
+  const output = read.content.map(function (row) {
+    return row.map(function (value) {
+      cells++;
+      if (isFormulaText(value)) {
+        return value;
+      }
+      let result = value;
+      for (let i = 0; i < steps.length; i++) {
+        result = steps[i](result);
+      }
+      if (result !== value && !(isEmptyValue(result) && isEmptyValue(value))) {
+        changed++;
+      }
+      return result;
+    });
+  });
+  if (changed > 0) {
+    writeRangeContent(range, output);
+  }
+  return { cells: cells, cellsChanged: changed };
+}
+
 // ==================== 复制粘贴操作 ====================
 
 /**
@@ -990,8 +1643,8 @@ function pasteToRange(targetAddress, sheetName) {
  * 复制并粘贴单元格区域
  * @param {string} sourceAddress - 源区域地址
  * @param {string} targetAddress - 目标区域地址
- * @param {Object} sourceWorksheet - 源工作表对象
- * @param {Object} targetWorksheet - 目标工作表对象
+ * @param {string} sourceWorksheet - 源工作表名称
+ * @param {string} targetWorksheet - 目标工作表名称
  */
 function copyPasteRange(
   sourceAddress,
@@ -1004,6 +1657,77 @@ function copyPasteRange(
   sourceRange.Copy(targetRange);
 }
 
+/**
+ * 在工作表之间复制区域（不经过剪贴板，不改变选区）
+ * @param {string} sourceSheet - 源工作表名称
+ * @param {string} sourceAddress - 源区域地址，如 "A1:D20"
+ * @param {string} targetSheet - 目标工作表名称
+ * @param {string} targetCell - 目标区域左上角单元格，如 "B2"
+ * @param {string} mode - 复制内容："values" 仅值（公式转为计算结果）、"formats" 仅格式、"all" 全部（默认）
+ * @returns {Object} { address, rows, columns }，address 为目标区域地址
+ */
+function copyBlock(sourceSheet, sourceAddress, targetSheet, targetCell, mode) {
+  mode = mode || "all";
+  const source = getRange(sourceAddress, sourceSheet);
+  const rows = source.Rows.Count;
+  const cols = source.Columns.Count;
+  const target = getRange(targetCell, targetSheet).Resize(rows, cols);
+
+  if (mode === "values") {
+    target.Value = source.Value;
+  } else if (mode === "formats") {
+    // 带目标的 Copy 会同时复制内容，写回原内容又会按新的数字格式重新解析（如 "007" 变为 7），
+    // 因此逐个单元格复制格式属性，不触碰目标单元格的内容
+    for (let i = 1; i <= rows; i++) {
+      for (let j = 1; j <= cols; j++) {
+        copyCellFormat(source.Cells(i, j), target.Cells(i, j));
+      }
+    }
+  } else if (mode === "all") {
+    source.Copy(target);
+  } else {
+    throw new Error("不支持的复制模式: " + mode);
+  }
+
+  return { address: target.Address, rows: rows, columns: cols };
+}
+
+/**
+ * 复制单元格格式：数字格式、对齐、字体、填充和四边边框，不改变目标单元格的内容
+ * @param {Object} source - 源单元格
+ * @param {Object} target - 目标单元格
+ */
+function copyCellFormat(source, target) {
+  target.NumberFormat = source.NumberFormat;
+  target.HorizontalAlignment = source.HorizontalAlignment;
+  target.VerticalAlignment = source.VerticalAlignment;
+  target.WrapText = source.WrapText;
+
+  const font = source.Font;
+  const targetFont = target.Font;
+  ["Name", "Size", "Bold", "Italic", "Underline", "Color"].forEach((key) => {
+    targetFont[key] = font[key];
+  });
+
+  // 无填充时 Interior.Color 仍返回白色，需按 ColorIndex 判断（xlNone = -4142）
+  if (source.Interior.ColorIndex === -4142) {
+    target.Interior.ColorIndex = -4142;
+  } else {
+    target.Interior.Color = source.Interior.Color;
+  }
+
+  // xlEdgeLeft、xlEdgeTop、xlEdgeBottom、xlEdgeRight
+  [7, 8, 9, 10].forEach((index) => {
+    const border = source.Borders.Item(index);
+    const targetBorder = target.Borders.Item(index);
+    targetBorder.LineStyle = border.LineStyle;
+    if (border.LineStyle !== -4142) {
+      targetBorder.Weight = border.Weight;
+      targetBorder.Color = border.Color;
+    }
+  });
+}
+
 // ==================== 合并单元格操作 ====================
 
 /**
@@ -1039,8 +1763,876 @@ function getUsedRangeData(sheetName) {
   return usedRange.Value;
 }
 
+/**
+ * 获取工作表最后一个有数据的行号
+ * @param {Object} ws - 工作表对象
+ * @param {string} column - 列字母（可选），指定时返回该列最后一个非空单元格的行号
+ * @returns {number} 行号，工作表为空时返回 0
+ */
+function getLastRow(ws, column) {
+  const usedRange = ws.UsedRange;
+  const firstRow = usedRange.Row;
+  const lastRow = firstRow + usedRange.Rows.Count - 1;
+
+  if (!column) {
+    // 空工作表的 UsedRange 为 A1 单个空单元格
+    if (lastRow === 1 && usedRange.Columns.Count === 1 && isEmptyValue(usedRange.Value)) {
+      return 0;
+    }
+    return lastRow;
+  }
+
+  const values = toMatrix(ws.Range(`${column}${firstRow}:${column}${lastRow}`).Value);
+  for (let i = values.length - 1; i >= 0; i--) {
+    if (!isEmptyValue(values[i][0])) {
+      return firstRow + i;
+    }
+  }
+  return 0;
+}
+
+/**
+ * 在工作表末尾追加行，定位末尾和写入在同一次脚本执行中完成
+ * @param {Array} rows - 二维数组，每个子数组代表一行
+ * @param {string} column - 用于定位末尾的列字母（可选），不传则使用已使用区域的最后一行
+ * @param {string} sheetName - 工作表名称，不传则使用当前活动工作表
+ * @returns {Object} 写入信息 { startRow, rowsWritten, range }
+ */
+function appendRows(rows, column, sheetName) {
+  const ws = getWorksheetByName(sheetName);
+  if (!ws) {
+    throw new Error("未找到工作表: " + sheetName);
+  }
+
+  // 各行长度可能不同（来自不同生产者），补齐为矩形区域
+  const cols = rows.reduce((max, row) => Math.max(max, row.length), 0);
+  if (rows.length === 0 || cols === 0) {
+    throw new Error("数据为空");
+  }
+  const data = rows.map((row) =>
+    row.length === cols ? row : row.concat(new Array(cols - row.length).fill(""))
+  );
+
+  const lastRow = getLastRow(ws, column);
+  const startRow = lastRow + 1;
+  const startColumn = lastRow === 0 ? 1 : ws.UsedRange.Column;
+  const endRow = startRow + data.length - 1;
+  const address =
+    columnNumberToLetter(startColumn) +
+    startRow +
+    ":" +
+    columnNumberToLetter(startColumn + cols - 1) +
+    endRow;
+
+  ws.Range(address).Value = data;
+  return { startRow: startRow, rowsWritten: data.length, range: address };
+}
+
+// ==================== 批量执行 ====================
+
+/**
+ * 在批量模式下执行函数：关闭自动计算、屏幕刷新和事件，执行完成后恢复设置并统一重算一次
+ * 环境不支持的设置会被跳过
+ * @param {boolean} enabled - 是否启用批量模式，false 时直接执行
+ * @param {Function} fn - 要执行的函数
+ * @returns {Object} { result, timings: { runMs, recalcMs, totalMs, bulkMode, settings } }
+ */
+function runInBulkMode(enabled, fn) {
+  const start = Date.now();
+  const saved = {};
+
+  if (enabled) {
+    const settings = {
+      Calculation: -4135, // xlCalculationManual
+      ScreenUpdating: false,
+      EnableEvents: false,
+    };
+    for (const key in settings) {
+      try {
+        saved[key] = Application[key];
+        Application[key] = settings[key];
+      } catch (error) {
+        delete saved[key];
+        console.log("批量模式不支持设置:", key);
+      }
+    }
+  }
+
+  let result;
+  let runMs;
+  let recalcMs = 0;
+  try {
+    result = fn();
+  } finally {
+    runMs = Date.now() - start;
+    if (enabled) {
+      for (const key in saved) {
+        try {
+          Application[key] = saved[key];
+        } catch (error) {
+          console.log("恢复设置失败:", key);
+        }
+      }
+      const recalcStart = Date.now();
+      try {
+        Application.Calculate();
+      } catch (error) {
+        console.log("重算失败:", error.message);
+      }
+      recalcMs = Date.now() - recalcStart;
+    }
+  }
+
+  return {
+    result: result,
+    timings: {
+      runMs: runMs,
+      recalcMs: recalcMs,
+      totalMs: Date.now() - start,
+      bulkMode: !!enabled,
+      settings: Object.keys(saved),
+    },
+  };
+}
+
+/**
+ * 在一次脚本执行中依次执行多个操作
+ * @param {Array} operations - 操作数组 [{ function, sheet, ...参数 }]，sheet 可选
+ * @param {boolean} bulkMode - 是否启用批量模式
+ * @param {string} sheetName - 默认工作表名称，操作未指定 sheet 时使用
+ * @returns {Object} { results, timings }，results 与 operations 一一对应，每项含 elapsedMs
+ */
+function runBatch(operations, bulkMode, sheetName) {
+  const run = runInBulkMode(bulkMode, () =>
+    operations.map((op) => {
+      if (op.function === "runBatch") {
+        return { success: false, message: "不支持嵌套批量执行" };
+      }
+      const opStart = Date.now();
+      const opResult = executeFunction(op.function, op, op.sheet || sheetName)[0];
+      opResult.elapsedMs = Date.now() - opStart;
+      return opResult;
+    })
+  );
+  return { results: run.result, timings: run.timings };
+}
+
+// ==================== 数据指纹 ====================
+
+/**
+ * 计算数据指纹（cyrb53 哈希，53 位，十六进制字符串）
+ * @param {*} value - 任意可 JSON 序列化的值，如二维数组
+ * @returns {string} 指纹
+ */
+function hashValues(value) {
+  const text = JSON.stringify(value === undefined ? null : value);
+  let h1 = 0xdeadbeef;
+  let h2 = 0x41c6ce57;
+  for (let i = 0; i < text.length; i++) {
+    const ch = text.charCodeAt(i);
+    h1 = Math.imul(h1 ^ ch, 2654435761);
+    h2 = Math.imul(h2 ^ ch, 1597334677);
+  }
+  h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+  h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+  return (4294967296 * (2097151 & h2) + (h1 >>> 0)).toString(16);
+}
+
+/**
+ * 获取已使用区域的位置信息
+ * @param {Object} ws - 工作表对象
+ * @param {boolean} withData - 是否同时返回区域数据，默认 true
+ * @returns {Object} { address, startRow, startColumn, rows, columns, data }，空工作表 rows 为 0
+ */
+function getUsedRangeInfo(ws, withData = true) {
+  const usedRange = ws.UsedRange;
+  let rows = usedRange.Rows.Count;
+  let columns = usedRange.Columns.Count;
+  let data = null;
+
+  if (withData) {
+    data = toMatrix(usedRange.Value);
+  }
+  // 空工作表的 UsedRange 为 A1 单个空单元格
+  if (rows === 1 && columns === 1 && isEmptyValue(data ? data[0][0] : usedRange.Value)) {
+    rows = 0;
+    columns = 0;
+    data = data ? [] : null;
+  }
+
+  const info = {
+    address: usedRange.Address,
+    startRow: usedRange.Row,
+    startColumn: usedRange.Column,
+    rows: rows,
+    columns: columns,
+  };
+  if (withData) {
+    info.data = data;
+  }
+  return info;
+}
+
+/**
+ * 按行分块计算已使用区域的指纹，用于增量同步
+ * @param {number} blockRows - 每块行数，默认 500
+ * @param {string} sheetName - 工作表名称，不传则使用当前活动工作表
+ * @returns {Object} { address, startRow, startColumn, rows, columns, blockRows, blocks }
+ */
+function getRangeFingerprints(blockRows, sheetName) {
+  const ws = getWorksheetByName(sheetName);
+  if (!ws) {
+    throw new Error("未找到工作表: " + sheetName);
+  }
+  const size = blockRows || 500;
+  const info = getUsedRangeInfo(ws);
+  const blocks = [];
+  for (let i = 0; i < info.rows; i += size) {
+    blocks.push(hashValues(info.data.slice(i, i + size)));
+  }
+  return {
+    address: info.address,
+    startRow: info.startRow,
+    startColumn: info.startColumn,
+    rows: info.rows,
+    columns: info.columns,
+    blockRows: size,
+    blocks: blocks,
+  };
+}
+
+/**
+ * 条件读取：区域内容未变化时不返回数据（用于客户端的持久化缓存校验）
+ * @param {string} address - 区域地址，为空时读取已使用区域（与 getUsedRangeData 相同）
+ * @param {string} fingerprint - 缓存中数据的指纹，为空时总是返回数据
+ * @param {string} sheetName - 工作表名称，不传则使用当前活动工作表
+ * @returns {Object} 未变化时为 { notModified: true, fingerprint }，否则为 { notModified: false, fingerprint, values }
+ */
+function getRangeIfChanged(address, fingerprint, sheetName) {
+  const values = address ? getRangeValues(address, sheetName) : getUsedRangeData(sheetName);
+  const current = hashValues(values);
+  if (fingerprint && fingerprint === current) {
+    return { notModified: true, fingerprint: current };
+  }
+  return { notModified: false, fingerprint: current, values: values };
+}
+
+/**
+ * 一次获取所有工作表的概要：名称、序号、已使用区域位置和大小、内容指纹（不含内部工作表）
+ * @returns {Object} { count, sheets: [{ name, index, address, startRow, startColumn, rows, columns, fingerprint }] }
+ */
+function describeWorkbook() {
+  const sheets = getUserWorksheets();
+  const list = [];
+  for (let i = 0; i < sheets.length; i++) {
+    const ws = sheets[i];
+    const info = getUsedRangeInfo(ws);
+    list.push({
+      name: ws.Name,
+      index: i + 1,
+      address: info.address,
+      startRow: info.startRow,
+      startColumn: info.startColumn,
+      rows: info.rows,
+      columns: info.columns,
+      fingerprint: hashValues(info.data),
+    });
+  }
+  return { count: list.length, sheets: list };
+}
+
+// ==================== 乐观并发 ====================
+
+/**
+ * 获取区域的值和内容指纹，用于 compareAndSet
+ * @param {string} address - 区域地址，如 "A1:C10"
+ * @param {string} sheetName - 工作表名称，不传则使用当前活动工作表
+ * @returns {Object} { values, fingerprint }，values 始终为二维数组
+ */
+function getRangeSnapshot(address, sheetName) {
+  const values = toMatrix(getRange(address, sheetName).Value);
+  return { values: values, fingerprint: hashValues(values) };
+}
+
+/**
+ * 比较并写入：区域当前内容的指纹等于 expectedFingerprint 时才写入（读取、比较、写入在一次脚本执行内完成）
+ * @param {string} address - 区域地址，如 "A1:C10"
+ * @param {string} expectedFingerprint - 读取时得到的指纹（getRangeSnapshot）
+ * @param {Array} values - 要写入的二维数组
+ * @param {string} sheetName - 工作表名称，不传则使用当前活动工作表
+ * @returns {Object} 写入时为 { applied: true, fingerprint: 写入后的指纹 }；
+ *   内容已被修改时为 { applied: false, fingerprint: 当前指纹, values: 当前内容 }，可直接用于重试
+ */
+function compareAndSet(address, expectedFingerprint, values, sheetName) {
+  const range = getRange(address, sheetName);
+  const current = toMatrix(range.Value);
+  const fingerprint = hashValues(current);
+  if (fingerprint !== expectedFingerprint) {
+    return { applied: false, fingerprint: fingerprint, values: current };
+  }
+  range.Value = values;
+  return { applied: true, fingerprint: hashValues(toMatrix(range.Value)) };
+}
+
+// ==================== 变更订阅 ====================
+
+/**
+ * 保存行指纹的隐藏工作表名称
+ */
+function getChangeLogSheetName() {
+  return "_wps_change_log";
+}
+
+/**
+ * 获取保存行指纹的隐藏工作表，不存在时创建
+ * 每个被订阅的工作表占 3 列：第 1 行为 [工作表名, 版本号]，
+ * 之后第 k 行为工作表第 k 行的 [指纹, 最后修改版本, 出现版本]，指纹为空表示该行为空（已删除）
+ * @returns {Object} 工作表对象
+ */
+function getChangeLogSheet() {
+  const name = getChangeLogSheetName();
+  const sheets = Application.ActiveWorkbook.Sheets;
+  for (let i = 1; i <= sheets.Count; i++) {
+    if (sheets.Item(i).Name === name) {
+      return sheets.Item(i);
+    }
+  }
+  const active = Application.ActiveSheet;
+  const ws = addWorksheet(name);
+  try {
+    ws.Visible = 0; // xlSheetHidden
+  } catch (e) {
+    console.log("无法隐藏工作表:", e.message);
+  }
+  try {
+    active.Activate();
+  } catch (e) {
+    console.log("无法恢复活动工作表:", e.message);
+  }
+  return ws;
+}
+
+/**
+ * 获取自 cursor 版本以来新增、修改和删除的行（按行号识别行，中间插入行会使之后的行都视为修改）
+ * 每次调用对比各行指纹与隐藏工作表中保存的指纹，有变化时版本号加 1 并保存新指纹，
+ * 返回的数据量只与变化的行数有关
+ * @param {number} cursor - 上次调用返回的 cursor，0 或不传表示从头开始（所有行都视为新增）
+ * @param {string} sheetName - 工作表名称，不传则使用当前活动工作表
+ * @returns {Object} { cursor, reset, inserted: [{ row, values }], updated: [{ row, values }], deleted: [row] }
+ */
+function getChangesSince(cursor, sheetName) {
+  const ws = getWorksheetByName(sheetName);
+  if (!ws) {
+    throw new Error("未找到工作表: " + sheetName);
+  }
+  const log = getChangeLogSheet();
+  const logUsed = log.UsedRange;
+  const header = toMatrix(
+    log.Range("A1").Resize(1, logUsed.Column + logUsed.Columns.Count - 1).Value
+  )[0];
+
+  // 查找该工作表的列块，没有则使用第一个空列块
+  let column = 0;
+  while (column < header.length && !isEmptyValue(header[column])) {
+    if (String(header[column]) === ws.Name) {
+      break;
+    }
+    column += 3;
+  }
+  const tracked = column < header.length && String(header[column]) === ws.Name;
+  let version = tracked ? Number(header[column + 1]) || 0 : 0;
+  const logRows = tracked ? logUsed.Row + logUsed.Rows.Count - 2 : 0;
+  const state = logRows > 0
+    ? toMatrix(log.Range("A2").Offset(0, column).Resize(logRows, 3).Value)
+    : [];
+
+  const info = getUsedRangeInfo(ws);
+  const lastRow = info.rows > 0 ? info.startRow + info.rows - 1 : 0;
+  const total = Math.max(state.length, lastRow);
+  const rows = [];
+  const changed = [];
+  for (let r = 1; r <= total; r++) {
+    const values = r >= info.startRow && r <= lastRow ? info.data[r - info.startRow] : null;
+    const blank = !values || values.every(isEmptyValue);
+    const hash = blank ? "" : "h" + hashValues(values);
+    const old = state[r - 1] || ["", 0, 0];
+    const entry = [isEmptyValue(old[0]) ? "" : String(old[0]), Number(old[1]) || 0, Number(old[2]) || 0];
+    if (entry[0] !== hash) {
+      changed.push(r);
+      if (entry[0] === "") {
+        entry[2] = -1; // 本次出现，版本号确定后再填入
+      }
+      entry[0] = hash;
+      entry[1] = -1;
+    }
+    rows.push({ entry: entry, values: values });
+  }
+
+  if (changed.length > 0) {
+    version += 1;
+    for (let i = 0; i < changed.length; i++) {
+      const entry = rows[changed[i] - 1].entry;
+      entry[1] = version;
+      if (entry[2] === -1) {
+        entry[2] = version;
+      }
+    }
+    log.Range("A1").Offset(0, column).Resize(1, 2).Value = [[ws.Name, version]];
+    log.Range("A2").Offset(0, column).Resize(total, 3).Value = rows.map(function (row) {
+      return row.entry;
+    });
+  }
+
+  // 游标大于当前版本（如隐藏工作表被删除后重建）时从头开始
+  const since = Number(cursor) || 0;
+  const reset = since > version;
+  const from = reset ? 0 : since;
+  const result = { cursor: version, reset: reset, inserted: [], updated: [], deleted: [] };
+  for (let r = 1; r <= total; r++) {
+    const entry = rows[r - 1].entry;
+    if (entry[1] <= from) {
+      continue;
+    }
+    if (entry[0] === "") {
+      if (entry[2] <= from) {
+        result.deleted.push(r);
+      }
+    } else if (entry[2] > from) {
+      result.inserted.push({ row: r, values: rows[r - 1].values });
+    } else {
+      result.updated.push({ row: r, values: rows[r - 1].values });
+    }
+  }
+  return result;
+}
+
+// ==================== 按键更新 ====================
+
+/**
+ * 读取已使用区域，并按键列建立 键 -> 数组下标 索引（一次遍历）
+ * 索引没有原型（Object.create(null)），"toString"、"constructor"、"__proto__" 等键不会与 Object.prototype 冲突
+ * @returns {Object} { ws, data, startRow, startColumn, headers, keyIndex, index }
+ */
+function buildKeyIndex(keyColumn, hasHeader, sheetName) {
+  const ws = getWorksheetByName(sheetName);
+  if (!ws) {
+    throw new Error("未找到工作表: " + sheetName);
+  }
+  const info = getUsedRangeInfo(ws);
+  const data = info.data;
+  const startRow = info.startRow;
+  const startColumn = info.startColumn;
+  const headers = hasHeader && data.length > 0 ? data[0] : null;
+  const keyIndex = resolveQueryColumn(keyColumn, headers, startColumn);
+
+  const index = Object.create(null);
+  for (let i = hasHeader ? 1 : 0; i < data.length; i++) {
+    const key = data[i][keyIndex];
+    if (!isEmptyValue(key) && !(String(key) in index)) {
+      index[String(key)] = i;
+    }
+  }
+  return { ws, data, startRow, startColumn, headers, keyIndex, index };
+}
+
+/**
+ * 获取键列索引
+ * @param {string} keyColumn - 键列（标题名或列字母）
+ * @param {boolean} hasHeader - 首行是否为标题行
+ * @param {string} sheetName - 工作表名称，不传则使用当前活动工作表
+ * @returns {Object} 键 -> 行号
+ */
+function getKeyIndex(keyColumn, hasHeader, sheetName) {
+  const info = buildKeyIndex(keyColumn, hasHeader, sheetName);
+  const rows = Object.create(null);
+  for (const key in info.index) {
+    rows[key] = info.startRow + info.index[key];
+  }
+  return rows;
+}
+
+/**
+ * 按键列更新或追加行（一次脚本执行完成所有更新和追加）
+ * @param {string} keyColumn - 键列（标题名或列字母）
+ * @param {Array} rows - 行数组，元素为数组（整行，从已使用区域首列开始）或对象（标题名 -> 值，只更新指定列）
+ * @param {boolean} hasHeader - 首行是否为标题行
+ * @param {boolean} returnIndex - 是否返回更新后的 键 -> 行号 索引
+ * @param {string} sheetName - 工作表名称，不传则使用当前活动工作表
+ * @returns {Object} { updated, inserted, index }
+ */
+function upsertRows(keyColumn, rows, hasHeader, returnIndex, sheetName) {
+  const info = buildKeyIndex(keyColumn, hasHeader, sheetName);
+  const data = info.data;
+  const index = info.index;
+  const headers = info.headers;
+  const resolve = (ref) => resolveQueryColumn(ref, headers, info.startColumn);
+
+  let width = data.length > 0 ? data[0].length : 0;
+  const dirty = {};
+  const existingCount = data.length;
+  let updated = 0;
+  let inserted = 0;
+
+  for (let i = 0; i < rows.length; i++) {
+    const row = rows[i];
+    let cells;
+    if (Array.isArray(row)) {
+      cells = row.map((value, j) => [j, value]);
+    } else {
+      cells = Object.keys(row).map((ref) => [resolve(ref), row[ref]]);
+    }
+    const keyCell = cells.find((cell) => cell[0] === info.keyIndex);
+    if (!keyCell || isEmptyValue(keyCell[1])) {
+      throw new Error("第 " + (i + 1) + " 行缺少键列的值");
+    }
+    const key = String(keyCell[1]);
+
+    let target = index[key];
+    if (target === undefined) {
+      target = data.length;
+      data.push([]);
+      index[key] = target;
+      inserted++;
+    } else if (target < existingCount && !dirty[target]) {
+      updated++;
+    }
+    if (target < existingCount) {
+      dirty[target] = true;
+    }
+    for (let k = 0; k < cells.length; k++) {
+      data[target][cells[k][0]] = cells[k][1];
+      width = Math.max(width, cells[k][0] + 1);
+    }
+  }
+
+  const padRow = (row) => {
+    const out = row.slice();
+    for (let j = 0; j < width; j++) {
+      if (out[j] === undefined) out[j] = "";
+    }
+    return out;
+  };
+  const writeBlock = (from, to) => {
+    const address =
+      columnNumberToLetter(info.startColumn) +
+      (info.startRow + from) +
+      ":" +
+      columnNumberToLetter(info.startColumn + width - 1) +
+      (info.startRow + to);
+    info.ws.Range(address).Value = data.slice(from, to + 1).map(padRow);
+  };
+
+  // 更新的行按连续段写回，追加的行一次写入
+  const dirtyRows = Object.keys(dirty)
+    .map(Number)
+    .sort((a, b) => a - b);
+  let blockStart = null;
+  for (let i = 0; i < dirtyRows.length; i++) {
+    if (blockStart === null) blockStart = dirtyRows[i];
+    if (i === dirtyRows.length - 1 || dirtyRows[i + 1] !== dirtyRows[i] + 1) {
+      writeBlock(blockStart, dirtyRows[i]);
+      blockStart = null;
+    }
+  }
+  if (data.length > existingCount) {
+    writeBlock(existingCount, data.length - 1);
+  }
+
+  const result = { updated: updated, inserted: inserted };
+  if (returnIndex) {
+    result.index = Object.create(null);
+    for (const key in index) {
+      result.index[key] = info.startRow + index[key];
+    }
+  }
+  return result;
+}
+
+// ==================== 查询下推 ====================
+
+/**
+ * 在服务端对工作表数据执行筛选/投影/分组聚合，只返回结果
+ * @param {Object} spec - 查询描述（由 Python 客户端生成并校验）
+ *   - address: 查询区域（可选），不传则使用已使用区域
+ *   - hasHeader: 首行是否为标题行
+ *   - where: 条件树 { op, column, value } / { and: [...] } / { or: [...] } / { not: {...} }
+ *   - select: 返回的列（列字母或标题名）
+ *   - groupBy: 分组列
+ *   - agg: 聚合 [{ column, func }]，func 为 sum/count/avg/min/max
+ *   - limit: 最多返回的行数
+ * @param {string} sheetName - 工作表名称，不传则使用当前活动工作表
+ * @returns {Object} { columns, rows, matched, scanned }
+ */
+function queryRange(spec, sheetName) {
+  let range;
+  if (spec.address) {
+    range = getRange(spec.address, sheetName);
+  } else {
+    const ws = getWorksheetByName(sheetName);
+    if (!ws) {
+      throw new Error("未找到工作表: " + sheetName);
+    }
+    range = ws.UsedRange;
+  }
+
+  if (spec.select && spec.select.length > 0 && spec.agg && spec.agg.length > 0) {
+    throw new Error("select 与 agg 不能同时指定");
+  }
+
+  const data = toMatrix(range.Value);
+  const headers = spec.hasHeader && data.length > 0 ? data[0] : null;
+  const body = spec.hasHeader ? data.slice(1) : data;
+  const startColumn = range.Column;
+
+  const resolve = (ref) => resolveQueryColumn(ref, headers, startColumn);
+  const where = spec.where ? compileQueryCondition(spec.where, resolve) : null;
+
+  const matchedRows = [];
+  for (let i = 0; i < body.length; i++) {
+    if (!where || where(body[i])) {
+      matchedRows.push(body[i]);
+    }
+  }
+
+  // 无聚合：返回投影后的行
+  if (!spec.agg || spec.agg.length === 0) {
+    const selectRefs = spec.select && spec.select.length > 0 ? spec.select : null;
+    const indexes = selectRefs
+      ? selectRefs.map(resolve)
+      : (data[0] || []).map((_, j) => j);
+    const limited = spec.limit ? matchedRows.slice(0, spec.limit) : matchedRows;
+    return {
+      columns: selectRefs || indexes.map((j) => queryColumnName(j, headers, startColumn)),
+      rows: limited.map((row) => indexes.map((j) => row[j])),
+      matched: matchedRows.length,
+      scanned: body.length,
+    };
+  }
+
+  // 分组聚合
+  const groupRefs = spec.groupBy || [];
+  const groupIndexes = groupRefs.map(resolve);
+  const aggs = spec.agg.map((a) => ({
+    func: a.func,
+    index: a.column === "*" ? -1 : resolve(a.column),
+  }));
+
+  const groups = {};
+  const groupOrder = [];
+  for (let i = 0; i < matchedRows.length; i++) {
+    const row = matchedRows[i];
+    const keyValues = groupIndexes.map((j) => row[j]);
+    const key = JSON.stringify(keyValues);
+    let group = groups[key];
+    if (!group) {
+      group = {
+        keyValues: keyValues,
+        states: aggs.map(() => ({ count: 0, numeric: 0, sum: 0, min: null, max: null })),
+      };
+      groups[key] = group;
+      groupOrder.push(key);
+    }
+    for (let k = 0; k < aggs.length; k++) {
+      accumulateQueryAgg(group.states[k], aggs[k], row);
+    }
+  }
+
+  // 无分组时，即使没有匹配行也返回一行聚合结果
+  if (groupIndexes.length === 0 && groupOrder.length === 0) {
+    groups["[]"] = {
+      keyValues: [],
+      states: aggs.map(() => ({ count: 0, numeric: 0, sum: 0, min: null, max: null })),
+    };
+    groupOrder.push("[]");
+  }
+
+  let rows = groupOrder.map((key) => {
+    const group = groups[key];
+    return group.keyValues.concat(
+      aggs.map((a, k) => finishQueryAgg(group.states[k], a.func))
+    );
+  });
+  if (spec.limit) {
+    rows = rows.slice(0, spec.limit);
+  }
+
+  return {
+    columns: groupRefs.concat(spec.agg.map((a) => a.func + "(" + a.column + ")")),
+    rows: rows,
+    matched: matchedRows.length,
+    scanned: body.length,
+  };
+}
+
+/**
+ * 将列引用解析为行数组中的下标（优先匹配标题名，其次匹配列字母）
+ */
+function resolveQueryColumn(ref, headers, startColumn) {
+  if (headers) {
+    const index = headers.indexOf(ref);
+    if (index >= 0) {
+      return index;
+    }
+  }
+  if (typeof ref === "string" && /^[A-Z]+$/.test(ref)) {
+    const index = columnLetterToNumber(ref) - startColumn;
+    if (index >= 0) {
+      return index;
+    }
+  }
+  throw new Error("未知列: " + ref);
+}
+
+/**
+ * 获取列的显示名（有标题行时为标题，否则为列字母）
+ */
+function queryColumnName(index, headers, startColumn) {
+  if (headers && !isEmptyValue(headers[index])) {
+    return headers[index];
+  }
+  return columnNumberToLetter(startColumn + index);
+}
+
+/**
+ * 比较两个单元格值，数字与数字字符串按数值比较
+ * @returns {number} 负数/0/正数
+ */
+function compareQueryValues(a, b) {
+  if (typeof a === "number" && typeof b === "string" && b !== "" && !isNaN(b)) {
+    b = Number(b);
+  } else if (typeof b === "number" && typeof a === "string" && a !== "" && !isNaN(a)) {
+    a = Number(a);
+  }
+  if (a === b) return 0;
+  if (isEmptyValue(a)) return -1;
+  if (isEmptyValue(b)) return 1;
+  return a < b ? -1 : a > b ? 1 : 0;
+}
+
+/**
+ * 将条件树编译为行判断函数（只支持固定的运算符，不执行任意代码）
+ */
+function compileQueryCondition(node, resolve) {
+  if (node.and) {
+    const parts = node.and.map((n) => compileQueryCondition(n, resolve));
+    return (row) => parts.every((p) => p(row));
+  }
+  if (node.or) {
+    const parts = node.or.map((n) => compileQueryCondition(n, resolve));
+    return (row) => parts.some((p) => p(row));
+  }
+  if (node.not) {
+    const part = compileQueryCondition(node.not, resolve);
+    return (row) => !part(row);
+  }
+
+  const index = resolve(node.column);
+  const value = node.value;
+  if ((node.op === "in" || node.op === "not_in") && !Array.isArray(value)) {
+    throw new Error(node.op + " 运算符的值必须是数组");
+  }
+  switch (node.op) {
+    case "==":
+      return (row) => compareQueryValues(row[index], value) === 0;
+    case "!=":
+      return (row) => compareQueryValues(row[index], value) !== 0;
+    case ">":
+      return (row) => !isEmptyValue(row[index]) && compareQueryValues(row[index], value) > 0;
+    case ">=":
+      return (row) => !isEmptyValue(row[index]) && compareQueryValues(row[index], value) >= 0;
+    case "<":
+      return (row) => !isEmptyValue(row[index]) && compareQueryValues(row[index], value) < 0;
+    case "<=":
+      return (row) => !isEmptyValue(row[index]) && compareQueryValues(row[index], value) <= 0;
+    case "in":
+      return (row) => value.some((v) => compareQueryValues(row[index], v) === 0);
+    case "not_in":
+      return (row) => !value.some((v) => compareQueryValues(row[index], v) === 0);
+    case "contains":
+      return (row) => String(row[index] === undefined || row[index] === null ? "" : row[index]).includes(value);
+    case "startswith":
+      return (row) => String(row[index] === undefined || row[index] === null ? "" : row[index]).startsWith(value);
+    case "endswith":
+      return (row) => String(row[index] === undefined || row[index] === null ? "" : row[index]).endsWith(value);
+    case "empty":
+      return (row) => isEmptyValue(row[index]);
+    case "not_empty":
+      return (row) => !isEmptyValue(row[index]);
+    default:
+      throw new Error("未知运算符: " + node.op);
+  }
+}
+
+/**
+ * 累加聚合状态（count 统计非空单元格，sum/avg 只统计数字和数字字符串）
+ */
+function accumulateQueryAgg(state, agg, row) {
+  if (agg.index < 0) {
+    state.count++;
+    return;
+  }
+  const value = row[agg.index];
+  if (isEmptyValue(value)) {
+    return;
+  }
+  state.count++;
+  if (typeof value === "number") {
+    state.sum += value;
+    state.numeric++;
+  } else if (typeof value === "string" && value.trim() !== "" && !isNaN(value)) {
+    state.sum += Number(value);
+    state.numeric++;
+  }
+  if (state.min === null || compareQueryValues(value, state.min) < 0) state.min = value;
+  if (state.max === null || compareQueryValues(value, state.max) > 0) state.max = value;
+}
+
+/**
+ * 计算聚合结果
+ */
+function finishQueryAgg(state, func) {
+  switch (func) {
+    case "sum":
+      return state.sum;
+    case "count":
+      return state.count;
+    case "avg":
+      return state.numeric > 0 ? state.sum / state.numeric : null;
+    case "min":
+      return state.min;
+    case "max":
+      return state.max;
+    default:
+      throw new Error("未知聚合函数: " + func);
+  }
+}
+
 // ==================== 工具函数 ====================
 
+/**
+ * 判断单元格值是否为空
+ * @param {*} value - 单元格值
+ * @returns {boolean} 是否为空
+ */
+function isEmptyValue(value) {
+  return value === undefined || value === null || value === "";
+}
+
+/**
+ * 将 Range.Value 统一转换为二维数组（单个单元格返回的是标量）
+ * @param {*} value - Range.Value 的返回值
+ * @returns {Array} 二维数组
+ */
+function toMatrix(value) {
+  if (!Array.isArray(value)) {
+    return [[value]];
+  }
+  if (value.length > 0 && !Array.isArray(value[0])) {
+    return [value];
+  }
+  return value;
+}
+
 /**
  * 列字母转数字索引
  * @param {string} column - 列字母，如 "A", "AB"
@@ -3,14 +3,356 @@ WPS 智能表格 AirScript API 客户端
 提供简洁的 API 调用接口
 """
 
+import gzip
+import json
+import random
+import re
+import threading
+import time
+import zlib
+
 import requests
 from typing import Dict, Any, Optional, List
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from python.wps_grid import Grid, _to_matrix, to_grid
+except ImportError:  # 将 python 目录加入 sys.path 直接导入时
+    from wps_grid import Grid, _to_matrix, to_grid
+
+
+# ==================== JSON 编解码 ====================
+
+class JSONCodec:
+    """标准库 json 编解码器（未安装 orjson 时的默认实现）"""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        """序列化为 UTF-8 字节串"""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data: Any) -> Any:
+        """从 bytes 或 str 反序列化"""
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """基于 orjson 的编解码器，直接在 bytes 上编解码，适合大负载"""
+
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        """序列化为 UTF-8 字节串"""
+        return orjson.dumps(obj)
+
+    def loads(self, data: Any) -> Any:
+        """从 bytes 或 str 反序列化"""
+        return orjson.loads(data)
+
+
+def get_default_codec():
+    """获取默认编解码器：已安装 orjson 时使用 orjson，否则回退到标准库 json"""
+    if orjson is not None:
+        return OrjsonCodec()
+    return JSONCodec()
+
+
+# ==================== 压缩 ====================
+
+# 各压缩算法的默认级别：在压缩率和 CPU 耗时之间取折中
+DEFAULT_COMPRESSION_LEVELS = {"gzip": 6, "deflate": 6, "br": 5}
+
+
+def available_encodings() -> List[str]:
+    """获取当前环境可用的压缩算法（br 需要安装 brotli）"""
+    encodings = ["gzip", "deflate"]
+    if brotli is not None:
+        encodings.append("br")
+    return encodings
+
+
+def compress_bytes(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """
+    按指定算法压缩数据
+
+    Args:
+        data: 原始字节串
+        encoding: 压缩算法，"gzip"、"deflate" 或 "br"
+        level: 压缩级别，不指定则使用 DEFAULT_COMPRESSION_LEVELS
+
+    Returns:
+        压缩后的字节串
+    """
+    if encoding not in available_encodings():
+        raise ValueError(f"不支持的压缩算法: {encoding}")
+    if level is None:
+        level = DEFAULT_COMPRESSION_LEVELS[encoding]
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=level)
+    if encoding == "deflate":
+        return zlib.compress(data, level)
+    return brotli.compress(data, quality=level)
+
+
+def decompress_bytes(data: bytes, encoding: str) -> bytes:
+    """按指定算法解压数据"""
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "deflate":
+        return zlib.decompress(data)
+    if encoding == "br" and brotli is not None:
+        return brotli.decompress(data)
+    raise ValueError(f"不支持的压缩算法: {encoding}")
+
+
+def measure_compression(payload: Any, encodings: List[str] = None, level: Optional[int] = None,
+                        codec=None) -> List[Dict[str, Any]]:
+    """
+    测量各压缩算法对给定负载的压缩率和 CPU 耗时，用于选择 compression 参数
+
+    Args:
+        payload: 要测量的数据（bytes 或可 JSON 序列化的对象，如二维数组）
+        encodings: 要测量的算法列表，不指定则测量所有可用算法
+        level: 压缩级别，不指定则使用各算法默认级别
+        codec: 序列化对象时使用的编解码器，不指定则自动选择
+
+    Returns:
+        每个算法一条记录，包含原始大小、压缩后大小、压缩率以及压缩/解压耗时（毫秒）
+
+    Example:
+        >>> for row in measure_compression(values):
+        ...     print(row["encoding"], row["ratio"], row["compress_ms"])
+    """
+    if not isinstance(payload, (bytes, bytearray)):
+        payload = (codec or get_default_codec()).dumps(payload)
+
+    report = []
+    for encoding in encodings or available_encodings():
+        start = time.perf_counter()
+        compressed = compress_bytes(payload, encoding, level)
+        compress_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        decompress_bytes(compressed, encoding)
+        decompress_seconds = time.perf_counter() - start
+
+        report.append({
+            "encoding": encoding,
+            "raw_bytes": len(payload),
+            "compressed_bytes": len(compressed),
+            "ratio": len(payload) / len(compressed) if compressed else 0.0,
+            "compress_ms": compress_seconds * 1000,
+            "decompress_ms": decompress_seconds * 1000,
+        })
+    return report
+
+
+# ==================== 地址解析 ====================
+
+_CELL_PATTERN = re.compile(r'^\$?([A-Za-z]+)\$?(\d+)$')
+
+
+def column_letter_to_number(column: str) -> int:
+    """列字母转数字，如 "A" -> 1, "AB" -> 28"""
+    result = 0
+    for char in column.upper():
+        result = result * 26 + (ord(char) - ord('A') + 1)
+    return result
+
+
+def column_number_to_letter(num: int) -> str:
+    """列数字转字母，如 1 -> "A", 28 -> "AB" """
+    letter = ""
+    while num > 0:
+        remainder = (num - 1) % 26
+        letter = chr(ord('A') + remainder) + letter
+        num = (num - 1) // 26
+    return letter
+
+
+def parse_address(address: str) -> tuple:
+    """
+    解析单元格或区域地址
+
+    Args:
+        address: 地址，如 "A1"、"$A$1" 或 "A1:C3"
+
+    Returns:
+        (起始行, 起始列, 结束行, 结束列)，行列均从 1 开始
+
+    Example:
+        >>> parse_address("B2:D5")
+        (2, 2, 5, 4)
+    """
+    parts = address.split(':')
+    if len(parts) > 2:
+        raise ValueError(f"地址格式错误: {address}")
+    cells = []
+    for part in parts:
+        match = _CELL_PATTERN.match(part.strip())
+        if not match:
+            raise ValueError(f"地址格式错误: {address}")
+        cells.append((int(match.group(2)), column_letter_to_number(match.group(1))))
+    (row1, col1), (row2, col2) = cells[0], cells[-1]
+    return min(row1, row2), min(col1, col2), max(row1, row2), max(col1, col2)
+
+
+def format_address(row1: int, col1: int, row2: int = None, col2: int = None) -> str:
+    """
+    生成单元格或区域地址
+
+    Example:
+        >>> format_address(2, 2, 5, 4)
+        'B2:D5'
+    """
+    start = f"{column_number_to_letter(col1)}{row1}"
+    if row2 is None or (row2 == row1 and col2 == col1):
+        return start
+    return f"{start}:{column_number_to_letter(col2)}{row2}"
+
+
+# ==================== 查询描述 ====================
+
+QUERY_OPERATORS = ("==", "!=", ">", ">=", "<", "<=", "in", "not_in",
+                   "contains", "startswith", "endswith", "empty", "not_empty")
+QUERY_AGGREGATES = ("sum", "count", "avg", "min", "max")
+
+
+def _normalize_condition(condition: Any) -> Dict[str, Any]:
+    """
+    将查询条件规范化为服务端可执行的条件树，并校验运算符
+
+    支持的写法：
+        - ("部门", "==", "技术部") 或 {"column": "部门", "op": "==", "value": "技术部"}
+        - ("备注", "empty")：一元运算符可省略值
+        - [条件1, 条件2]：AND
+        - {"and": [...]}、{"or": [...]}、{"not": 条件}
+    """
+    if isinstance(condition, list):
+        return {"and": [_normalize_condition(c) for c in condition]}
+    if isinstance(condition, tuple):
+        if len(condition) == 2:
+            condition = {"column": condition[0], "op": condition[1]}
+        elif len(condition) == 3:
+            condition = {"column": condition[0], "op": condition[1], "value": condition[2]}
+        else:
+            raise ValueError(f"条件格式错误: {condition}")
+    if not isinstance(condition, dict):
+        raise ValueError(f"条件格式错误: {condition}")
+
+    if "and" in condition or "or" in condition:
+        key = "and" if "and" in condition else "or"
+        return {key: [_normalize_condition(c) for c in condition[key]]}
+    if "not" in condition:
+        return {"not": _normalize_condition(condition["not"])}
+
+    op = condition.get("op")
+    if op not in QUERY_OPERATORS:
+        raise ValueError(f"不支持的运算符: {op}，可用: {', '.join(QUERY_OPERATORS)}")
+    if "column" not in condition:
+        raise ValueError(f"条件缺少列: {condition}")
+    node = {"column": condition["column"], "op": op}
+    if op in ("in", "not_in"):
+        if not isinstance(condition.get("value"), (list, tuple)):
+            raise ValueError(f"{op} 运算符的值必须是列表或元组: {condition}")
+        node["value"] = list(condition["value"])
+    elif op not in ("empty", "not_empty"):
+        if "value" not in condition:
+            raise ValueError(f"条件缺少值: {condition}")
+        node["value"] = condition["value"]
+    return node
+
+
+def _normalize_aggregates(agg: Any) -> List[Dict[str, str]]:
+    """将聚合描述规范化为 [{"column": 列, "func": 函数}]"""
+    if isinstance(agg, dict):
+        items = list(agg.items())
+    else:
+        items = [tuple(a) for a in agg]
+    result = []
+    for column, func in items:
+        if func not in QUERY_AGGREGATES:
+            raise ValueError(f"不支持的聚合函数: {func}，可用: {', '.join(QUERY_AGGREGATES)}")
+        result.append({"column": column, "func": func})
+    return result
+
+
+# 变更订阅的隐藏工作表（与 JS 端 getChangeLogSheetName 一致），不出现在工作表列表中
+CHANGE_LOG_SHEET = "_wps_change_log"
+
+
+class _AppendBatch:
+    """一批待合并发送的追加行（多个生产者共享）"""
+
+    def __init__(self):
+        self.rows = []
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _InFlightRead:
+    """一次进行中的读请求，相同的并发读请求共享其响应"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
 
 class WPSAirScriptClient:
     """WPS 智能表格 AirScript API 客户端"""
+
+    # 只读的脚本函数：调用其他函数后会使对应工作表的客户端缓存失效
+    READ_FUNCTIONS = frozenset({
+        "getCellValue", "getRangeValues", "getCellFormula", "findCell", "findAllCells",
+        "getUsedRangeData", "getRangeFormulas", "worksheetExists", "getWorksheetCount", "getWorkbookName",
+        "queryRange", "getKeyIndex", "getRangeFingerprints", "getUsedRangeInfo", "describeWorkbook",
+        "getRangeSnapshot", "getRangeIfChanged",
+    })
+
+    # copy_block 支持的复制模式
+    COPY_MODES = ("all", "values", "formats")
+
+    # sort_range_by_keys 支持的排序方式
+    SORT_METHODS = ("auto", "native", "memory")
+
+    # normalize_range 支持的清理操作
+    NORMALIZE_OPS = ("trim", "collapse_whitespace", "remove_nonprinting", "empty_to_null", "to_number",
+                     "lower", "upper")
+
+    # 同步执行接口：连接在脚本运行期间一直保持
+    SYNC_TASK_PATH = "/api/v3/ide/file/{file_id}/script/{script_id}/sync_task"
+    # 任务模式：提交脚本运行，返回 task_id 后轮询结果
+    TASK_SUBMIT_PATH = "/api/v3/ide/file/{file_id}/script/{script_id}/task"
+    TASK_STATUS_PATH = "/api/v3/script/task"
+    # 任务未完成时的状态值
+    TASK_PENDING_STATUSES = frozenset({"pending", "queued", "running", "waiting"})
+    TASK_FAILED_STATUSES = frozenset({"error", "failed", "cancelled", "timeout"})
+    # job_mode="auto" 时始终使用任务模式的函数（响应大小无法从参数预估）
+    LONG_RUNNING_FUNCTIONS = frozenset({
+        "getUsedRangeData", "getRangeFingerprints", "describeWorkbook", "runBatch",
+    })
+    # 估算响应大小时每个单元格的字节数
+    BYTES_PER_CELL = 16
     
-    def __init__(self, file_id: str, token: str, script_id: str, base_url: str = "https://www.kdocs.cn"):
+    def __init__(self, file_id: str, token: str, script_id: str, base_url: str = "https://www.kdocs.cn",
+                 codec=None, compression: Optional[str] = None, compress_threshold: int = 64 * 1024,
+                 compression_level: Optional[int] = None, session=None, coalesce_reads: bool = True,
+                 timeout: float = 30, timeout_per_mb: float = 10, max_timeout: float = 600,
+                 job_mode: Any = False, job_threshold: int = 1024 * 1024,
+                 poll_interval: float = 0.25, max_poll_interval: float = 5.0, profile: bool = False,
+                 disk_cache=None):
         """
         初始化 API 客户端
 
@@ -19,19 +361,161 @@ class WPSAirScriptClient:
             token: AirScript Token
             script_id: 脚本id
             base_url: API 基础 URL，默认为 https://www.kdocs.cn
-        """
+            codec: JSON 编解码器，需提供 dumps(obj) -> bytes 和 loads(data) 方法。
+                不指定则自动选择（优先 orjson）
+            compression: 请求体压缩算法，"gzip"、"deflate" 或 "br"，默认不压缩。
+                需确认服务端接受 Content-Encoding 压缩的请求体后再开启
+            compress_threshold: 请求体达到该字节数才压缩，默认 64KB
+            compression_level: 压缩级别，不指定则使用各算法默认级别
+            session: HTTP 会话，需提供 post(url, headers, data, timeout) 方法，
+                如 requests.Session()（复用连接）或本地模拟服务 LocalAirScriptServer。
+                默认使用 requests 模块
+            coalesce_reads: 是否合并并发的相同读请求（同一工作表、函数和参数），默认开启。
+                进行中的读请求完成后，所有等待方共享同一响应，各自解码得到独立的结果对象
+            timeout: 基础超时（秒），默认 30
+            timeout_per_mb: 每 MB 负载（请求体加按区域地址估算的响应大小）增加的超时秒数，默认 10
+            max_timeout: 单次操作超时上限（秒），默认 600
+            job_mode: 任务模式（提交后轮询结果，不长时间占用连接）：
+                False 不使用（默认）、True 所有调用都使用、"auto" 负载达到 job_threshold
+                或调用 LONG_RUNNING_FUNCTIONS 中的函数时使用
+            job_threshold: job_mode="auto" 时使用任务模式的负载字节数，默认 1MB
+            poll_interval: 任务轮询的初始间隔（秒），之后逐步增大
+            max_poll_interval: 任务轮询的最大间隔（秒）
+            profile: 是否记录调用序列（函数、工作表、区域、耗时、调用位置）到 self.profiler，
+                用于找出可以合并的调用，见 python/wps_profiler.py
+            disk_cache: 磁盘缓存（DiskCache 实例或 SQLite 文件路径），get_range_values 和
+                get_used_range_data 的结果按内容指纹缓存，多个进程可共享同一文件。
+                缓存命中时脚本仍会读取区域计算指纹，但不再传输数据，见 python/wps_disk_cache.py
+        """
+        if job_mode not in (False, True, "auto"):
+            raise ValueError(f"不支持的任务模式: {job_mode}")
+        if compression is not None and compression not in available_encodings():
+            raise ValueError(f"不支持的压缩算法: {compression}")
         self.script_id = file_id
         self.token = token
         self.script_version = script_id
         self.base_url = base_url.rstrip('/')
+        self.codec = codec or get_default_codec()
+        self.session = session or requests
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+        self.compression_level = compression_level
+        self.coalesce_reads = coalesce_reads
+        self.timeout = timeout
+        self.timeout_per_mb = timeout_per_mb
+        self.max_timeout = max_timeout
+        self.job_mode = job_mode
+        self.job_threshold = job_threshold
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        # 压缩统计会被并发的请求（读合并、多脚本分发、后台刷新线程）同时更新
+        self._stats_lock = threading.Lock()
+        self._compression_stats = {
+            "requests": 0,
+            "compressed_requests": 0,
+            "raw_bytes_sent": 0,
+            "wire_bytes_sent": 0,
+            "compress_seconds": 0.0,
+            "raw_bytes_received": 0,
+            "wire_bytes_received": 0,
+        }
+        # 追加行合并：同一工作表/定位列的并发追加合并为一次请求
+        self._append_lock = threading.Lock()
+        self._append_batches: Dict[tuple, _AppendBatch] = {}
+        self._append_send_locks: Dict[tuple, threading.Lock] = {}
+        # 键列索引缓存：(工作表名, 键列) -> {键: 行号}
+        self._cache_lock = threading.Lock()
+        self._key_index_cache: Dict[tuple, Dict[str, int]] = {}
+        # describe_workbook 结果缓存，任何写操作后失效
+        self._workbook_description: Optional[Dict] = None
+        self._cache_generation = 0
+        # 进行中的读请求：(函数名, 工作表名, 参数, 缓存代数) -> _InFlightRead
+        self._inflight_lock = threading.Lock()
+        self._inflight_reads: Dict[tuple, _InFlightRead] = {}
+        self.coalesced_reads = 0
+        # 调用分析器，profile=True 时开启
+        self.profiler = None
+        if profile:
+            try:
+                from python.wps_profiler import CallProfiler
+            except ImportError:  # 将 python 目录加入 sys.path 直接导入时
+                from wps_profiler import CallProfiler
+            self.profiler = CallProfiler(self.READ_FUNCTIONS)
+        # 跨进程共享的区域数据缓存
+        if isinstance(disk_cache, str):
+            try:
+                from python.wps_disk_cache import DiskCache
+            except ImportError:  # 将 python 目录加入 sys.path 直接导入时
+                from wps_disk_cache import DiskCache
+            disk_cache = DiskCache(disk_cache, codec=self.codec)
+        self.disk_cache = disk_cache
 
     def _get_headers(self) -> Dict[str, str]:
         """获取请求头"""
         return {
             'Content-Type': 'application/json',
-            'AirScript-Token': self.token
+            'AirScript-Token': self.token,
+            # 显式协商压缩响应，requests 会自动解压
+            'Accept-Encoding': ', '.join(available_encodings())
         }
 
+    def _compress_body(self, body: bytes, headers: Dict[str, str]) -> bytes:
+        """
+        按配置压缩请求体，未开启压缩或未达到阈值时原样返回
+
+        Args:
+            body: 序列化后的请求体
+            headers: 请求头，压缩时会写入 Content-Encoding
+
+        Returns:
+            实际发送的请求体
+        """
+        raw_size = len(body)
+        compress_seconds = None
+        if self.compression and raw_size >= self.compress_threshold:
+            start = time.perf_counter()
+            body = compress_bytes(body, self.compression, self.compression_level)
+            compress_seconds = time.perf_counter() - start
+            headers['Content-Encoding'] = self.compression
+
+        with self._stats_lock:
+            stats = self._compression_stats
+            stats["requests"] += 1
+            stats["raw_bytes_sent"] += raw_size
+            stats["wire_bytes_sent"] += len(body)
+            if compress_seconds is not None:
+                stats["compress_seconds"] += compress_seconds
+                stats["compressed_requests"] += 1
+        return body
+
+    def _record_response_size(self, response) -> None:
+        """记录响应的传输大小和解压后大小"""
+        raw_size = len(response.content)
+        # 压缩响应的 Content-Length 是传输大小；缺失时（分块传输）按解压后大小计
+        wire_size = response.headers.get('Content-Length')
+        with self._stats_lock:
+            self._compression_stats["raw_bytes_received"] += raw_size
+            self._compression_stats["wire_bytes_received"] += int(wire_size) if wire_size else raw_size
+
+    def get_compression_stats(self) -> Dict[str, Any]:
+        """
+        获取压缩统计信息
+
+        Returns:
+            统计字典，包含发送/接收的原始字节数、传输字节数、压缩率和压缩耗时
+
+        Example:
+            >>> stats = client.get_compression_stats()
+            >>> print(stats["send_ratio"], stats["compress_seconds"])
+        """
+        with self._stats_lock:
+            stats = dict(self._compression_stats)
+        stats["send_ratio"] = (stats["raw_bytes_sent"] / stats["wire_bytes_sent"]
+                               if stats["wire_bytes_sent"] else 1.0)
+        stats["receive_ratio"] = (stats["raw_bytes_received"] / stats["wire_bytes_received"]
+                                  if stats["wire_bytes_received"] else 1.0)
+        return stats
+
     def _request(self, context: Dict[str, Any]) -> Dict[str, Any]:
         """
         发送 HTTP 请求
@@ -42,17 +526,27 @@ class WPSAirScriptClient:
         Returns:
             API 响应的 JSON 数据
         """
-        url = f"{self.base_url}/api/v3/ide/file/{self.script_id}/script/{self.script_version}/sync_task"
+        # 请求体只序列化一次，直接以 bytes 发送
+        body = self.codec.dumps({"Context": context})
+        argv = context.get("argv", {})
+        payload_size = self._estimate_payload(body, argv)
+        timeout = self._operation_timeout(payload_size)
+        headers = self._get_headers()
+        body = self._compress_body(body, headers)
         
         try:
-            response = requests.post(
-                url=url,
-                headers=self._get_headers(),
-                json={"Context": context},
-                timeout=30
+            if self._use_job_mode(argv.get("function"), payload_size):
+                return self._run_job(body, headers, timeout)
+            response = self.session.post(
+                url=self._url(self.SYNC_TASK_PATH),
+                headers=headers,
+                data=body,
+                timeout=timeout
             )
             response.raise_for_status()
-            return response.json()
+            self._record_response_size(response)
+            # 直接从原始 bytes 解码，跳过 response.text 的编码探测和字符串拷贝
+            return self.codec.loads(response.content)
         except requests.exceptions.RequestException as e:
             print(f"请求失败: {e}")
             if hasattr(e, 'response') and e.response is not None:
@@ -60,6 +554,76 @@ class WPSAirScriptClient:
                 print(f"响应内容: {e.response.text}")
             raise
 
+    def _url(self, path: str) -> str:
+        """拼接接口地址"""
+        return self.base_url + path.format(file_id=self.script_id, script_id=self.script_version)
+
+    def _estimate_payload(self, body: bytes, argv: Dict[str, Any]) -> int:
+        """估算一次调用的负载字节数：请求体大小加上按区域地址估算的响应大小"""
+        size = len(body)
+        address = argv.get("address")
+        if isinstance(address, str):
+            try:
+                row1, col1, row2, col2 = parse_address(address)
+            except ValueError:
+                return size
+            size += (row2 - row1 + 1) * (col2 - col1 + 1) * self.BYTES_PER_CELL
+        return size
+
+    def _operation_timeout(self, payload_size: int) -> float:
+        """按负载大小计算单次操作的超时时间"""
+        return min(self.timeout + self.timeout_per_mb * payload_size / (1024 * 1024), self.max_timeout)
+
+    def _use_job_mode(self, function_name: Optional[str], payload_size: int) -> bool:
+        """判断本次调用是否使用任务模式"""
+        if self.job_mode == "auto":
+            return payload_size >= self.job_threshold or function_name in self.LONG_RUNNING_FUNCTIONS
+        return bool(self.job_mode)
+
+    def _run_job(self, body: bytes, headers: Dict[str, str], timeout: float) -> Dict[str, Any]:
+        """
+        以任务模式执行：提交脚本运行，按逐步增大的间隔轮询直到完成
+
+        Returns:
+            与 sync_task 相同格式的响应 {"data": {"result": ...}, "error": ...}
+
+        Raises:
+            TimeoutError: 超过 timeout 仍未完成
+            RuntimeError: 提交失败或任务执行失败
+        """
+        deadline = time.monotonic() + timeout
+        response = self.session.post(url=self._url(self.TASK_SUBMIT_PATH), headers=headers, data=body,
+                                     timeout=self.timeout)
+        response.raise_for_status()
+        self._record_response_size(response)
+        submitted = self.codec.loads(response.content)
+        task_id = (submitted.get("data") or {}).get("task_id") or submitted.get("task_id")
+        if not task_id:
+            raise RuntimeError(f"提交任务失败: {submitted}")
+
+        status_url = self._url(self.TASK_STATUS_PATH)
+        poll_headers = {key: value for key, value in headers.items() if key != "Content-Encoding"}
+        interval = self.poll_interval
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"任务 {task_id} 在 {timeout:g} 秒内未完成")
+            time.sleep(min(interval, remaining))
+            response = self.session.get(url=status_url, headers=poll_headers, params={"task_id": task_id},
+                                        timeout=min(self.timeout, max(remaining, 1)))
+            response.raise_for_status()
+            polled = self.codec.loads(response.content)
+            data = polled.get("data") or {}
+            status = str(data.get("status", "")).lower()
+            if status in self.TASK_FAILED_STATUSES:
+                raise RuntimeError(f"任务 {task_id} 执行失败: {polled.get('error') or data}")
+            # 没有状态字段时以是否返回 result 判断是否完成
+            if (status not in self.TASK_PENDING_STATUSES) if status else "result" in data:
+                self._record_response_size(response)
+                return polled
+            # 轮询间隔逐步增大，短任务能快速返回，长任务不会产生过多请求
+            interval = min(interval * 1.5, self.max_poll_interval)
+
     def _extract_result(self, result: Any) -> Any:
         """
         提取结果：统一处理列表和字典格式
@@ -97,21 +661,126 @@ class WPSAirScriptClient:
         if sheet_name:
             context["active_sheet"] = sheet_name
         
-        response = self._request(context)
+        started = time.perf_counter()
+        error = None
+        try:
+            if function_name in self.READ_FUNCTIONS:
+                response = self._request_read(function_name, sheet_name, params, context)
+            else:
+                try:
+                    response = self._request(context)
+                finally:
+                    self._invalidate_caches(sheet_name)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if self.profiler is not None:
+                self.profiler.record(function_name, sheet_name, params, started,
+                                     time.perf_counter() - started, error)
         
         # 解析返回数据
-        if response.get("data") and response["data"].get("result"):
-            result_str = response["data"]["result"]
+        data = response.get("data")
+        if data and data.get("result"):
+            result_str = data["result"]
             if result_str != "[Undefined]":
-                import json
-                try:
-                    result = json.loads(result_str)
+                # data.result 通常是 JSON 字符串，只解码一次；若已是结构化数据则直接使用
+                if isinstance(result_str, (str, bytes)):
+                    try:
+                        result = self.codec.loads(result_str)
+                    except ValueError:
+                        return result_str
+                else:
+                    result = result_str
+                # 脚本返回 [结果]；其他形状（标量、字典）原样返回
+                if isinstance(result, list):
                     return result[0] if result else None
-                except:
-                    return result_str
+                return result
         
         return response
 
+    def _request_read(self, function_name: str, sheet_name: Optional[str], params: Dict[str, Any],
+                      context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        发送读请求，合并并发的相同请求：第一个调用方发送，其余调用方等待并共享响应
+
+        缓存代数包含在键中，本客户端完成写操作后发起的读请求不会共享写入前的响应。
+        """
+        if not self.coalesce_reads:
+            return self._request(context)
+
+        with self._cache_lock:
+            generation = self._cache_generation
+        key = (function_name, sheet_name, self.codec.dumps(params), generation)
+        with self._inflight_lock:
+            call = self._inflight_reads.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight_reads[key] = _InFlightRead()
+            else:
+                self.coalesced_reads += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.response
+
+        try:
+            call.response = self._request(context)
+            return call.response
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight_reads[key]
+            call.done.set()
+
+    def _invalidate_caches(self, sheet_name: str = None) -> None:
+        """
+        使客户端缓存失效
+
+        Args:
+            sheet_name: 工作表名称，不指定（当前活动工作表或工作簿级操作）时清空所有缓存
+        """
+        with self._cache_lock:
+            # 工作簿概要包含所有工作表的区域和指纹，任何写入都会使其失效
+            self._workbook_description = None
+            self._cache_generation += 1
+            if sheet_name is None:
+                self._key_index_cache.clear()
+                return
+            for key in [k for k in self._key_index_cache if k[0] in (sheet_name, None)]:
+                del self._key_index_cache[key]
+
+    def _cached_read(self, address: Optional[str], sheet_name: Optional[str]) -> Any:
+        """
+        通过磁盘缓存读取区域：发送缓存的指纹，内容未变化时使用缓存的数据
+
+        Args:
+            address: 区域地址，为 None 时读取已使用区域
+            sheet_name: 工作表名称
+
+        Returns:
+            区域数据（与 getRangeValues / getUsedRangeData 返回的数据相同）
+        """
+        key = "\x1f".join((self.script_id, sheet_name or "", address or ""))
+        fingerprint = self.disk_cache.fingerprint(key)
+        result = self._extract_result(self._call_function(
+            "getRangeIfChanged", sheet_name, address=address, fingerprint=fingerprint))
+        if not isinstance(result, dict) or not result.get("success"):
+            raise RuntimeError(f"读取区域失败: {result}")
+        if result.get("notModified"):
+            values = self.disk_cache.get(key, result["fingerprint"])
+            if values is not None:
+                return values
+            # 条目在检查指纹后被其他进程淘汰或替换，重新完整读取
+            result = self._extract_result(self._call_function(
+                "getRangeIfChanged", sheet_name, address=address, fingerprint=None))
+        self.disk_cache.put(key, result["fingerprint"], result["values"])
+        return result["values"]
+
     # ==================== 单元格操作 ====================
     
     def get_cell_value(self, address: str, sheet_name: str = None) -> Any:
@@ -151,22 +820,32 @@ class WPSAirScriptClient:
         """
         return self._call_function("setCellValue", sheet_name, address=address, value=value)
     
-    def get_range_values(self, address: str, sheet_name: str = None) -> List[List]:
+    def get_range_values(self, address: str, sheet_name: str = None, as_grid: bool = False) -> List[List]:
         """
         获取区域值（返回二维数组）
         
         Args:
             address: 区域地址，如 "A1:C3"
             sheet_name: 工作表名称，可选。不指定则使用当前活动工作表
+            as_grid: 是否返回紧凑的 Grid（按列存储，内存占用远小于二维列表，用法与列表相同）
             
         Returns:
-            二维数组，每个元素代表一行数据
+            二维数组，每个元素代表一行数据（单个单元格时为单个值）；as_grid=True 时为 Grid
             
         Example:
             >>> client.get_range_values("A1:B2")
             [['Name', 'Age'], ['Alice', 25]]
-        """
-        return self._call_function("getRangeValues", sheet_name, address=address)
+            >>> grid = client.get_range_values("A1:F200000", as_grid=True)
+            >>> grid.column(2).to_numpy().sum()
+        """
+        if self.disk_cache is not None:
+            result = self._cached_read(address, sheet_name)
+        else:
+            result = self._call_function("getRangeValues", sheet_name, address=address)
+            result = self._extract_result(result)
+            if isinstance(result, dict) and "values" in result:
+                result = result["values"]
+        return to_grid(result) if as_grid else result
     
     def set_range_values(self, address: str, values: List[List], sheet_name: str = None) -> Dict:
         """
@@ -186,6 +865,155 @@ class WPSAirScriptClient:
         """
         return self._call_function("setRangeValues", sheet_name, address=address, values=values)
     
+    def set_range_values_batch(self, items: List[Dict], sheet_name: str = None,
+                               bulk_mode: bool = False) -> Dict:
+        """
+        批量设置多个区域的值（一次请求完成所有写入）
+        
+        Args:
+            items: 写入项列表，每项为 {"address": "A1:B2", "values": [[...]], "sheet": "Sheet1"}，
+                sheet 可选，未指定时使用 sheet_name
+            sheet_name: 默认工作表名称，可选
+            bulk_mode: 是否启用批量模式（写入期间手动计算、关闭屏幕刷新和事件，结束后统一重算一次），
+                适用于公式依赖较多的工作表
+            
+        Returns:
+            执行结果字典，count 为写入的区域数量，timings 为服务端耗时
+            
+        Example:
+            >>> client.set_range_values_batch([
+            ...     {"address": "A1:B1", "values": [["Name", "Age"]]},
+            ...     {"address": "D5", "values": [[100]], "sheet": "Sheet2"},
+            ... ])
+        """
+        result = self._call_function("setRangeValuesBatch", sheet_name, items=items, bulkMode=bulk_mode)
+        for sheet in {item["sheet"] for item in items if item.get("sheet")}:
+            self._invalidate_caches(sheet)
+        return result
+
+    def run_batch(self, operations: List[Dict], sheet_name: str = None, bulk_mode: bool = False) -> Dict:
+        """
+        在一次请求中依次执行多个脚本函数
+        
+        Args:
+            operations: 操作列表，每项为 {"function": 函数名, "sheet": 工作表名称, ...函数参数}，
+                sheet 可选，未指定时使用 sheet_name。参数名与 JS 端一致（如 address、values）
+            sheet_name: 默认工作表名称，可选
+            bulk_mode: 是否启用批量模式：执行期间将计算模式设为手动并关闭屏幕刷新和事件
+                （AirScript 不支持的设置会跳过），全部操作完成后恢复设置并重算一次
+            
+        Returns:
+            执行结果字典：
+            - results: 与 operations 一一对应的结果，每项含 elapsedMs
+            - timings: {"runMs", "recalcMs", "totalMs", "bulkMode", "settings"}，
+              settings 为实际生效的设置
+            
+        Example:
+            >>> result = client.run_batch([
+            ...     {"function": "setRangeValues", "address": "A1:B2", "values": [[1, 2], [3, 4]]},
+            ...     {"function": "setCellFormula", "address": "C1", "formula": "=SUM(A1:B2)"},
+            ...     {"function": "getCellValue", "address": "C1"},
+            ... ], bulk_mode=True)
+            >>> result["results"][2]["value"], result["timings"]["recalcMs"]
+        """
+        result = self._call_function("runBatch", sheet_name, operations=operations, bulkMode=bulk_mode)
+        for sheet in {op["sheet"] for op in operations if op.get("sheet")}:
+            self._invalidate_caches(sheet)
+        return result
+
+    def get_range_snapshot(self, address: str, sheet_name: str = None) -> Dict[str, Any]:
+        """
+        获取区域的值和内容指纹（服务端计算），用于 compare_and_set
+        
+        Args:
+            address: 区域地址，如 "A1:C10"
+            sheet_name: 工作表名称，可选
+            
+        Returns:
+            {"values": 二维数组, "fingerprint": 指纹字符串}
+            
+        Example:
+            >>> snapshot = client.get_range_snapshot("B2:B2")
+            >>> snapshot["values"], snapshot["fingerprint"]
+        """
+        result = self._extract_result(self._call_function("getRangeSnapshot", sheet_name, address=address))
+        if not isinstance(result, dict) or "fingerprint" not in result:
+            raise RuntimeError(f"获取区域快照失败: {result}")
+        return {"values": result["values"], "fingerprint": result["fingerprint"]}
+
+    def compare_and_set(self, address: str, expected_fingerprint: str, new_values: List[List],
+                        sheet_name: str = None) -> Dict[str, Any]:
+        """
+        比较并写入：区域内容的指纹仍为 expected_fingerprint 时才写入 new_values
+        
+        读取、比较和写入在一次脚本执行内完成，其他客户端在此期间的修改不会被覆盖。
+        
+        Args:
+            address: 区域地址，如 "A1:C10"
+            expected_fingerprint: 读取时得到的指纹（get_range_snapshot）
+            new_values: 要写入的二维数组
+            sheet_name: 工作表名称，可选
+            
+        Returns:
+            {"applied": 是否已写入, "fingerprint": 写入后或当前的指纹}，
+            未写入时还包含 "values"（区域当前内容），可直接用于重试
+            
+        Example:
+            >>> snapshot = client.get_range_snapshot("B2")
+            >>> result = client.compare_and_set("B2", snapshot["fingerprint"], [[snapshot["values"][0][0] + 1]])
+            >>> result["applied"]
+        """
+        result = self._extract_result(self._call_function(
+            "compareAndSet", sheet_name, address=address, expectedFingerprint=expected_fingerprint,
+            values=new_values))
+        if not isinstance(result, dict) or "applied" not in result:
+            raise RuntimeError(f"比较并写入失败: {result}")
+        result.pop("success", None)
+        return result
+
+    def update_range(self, address: str, fn, sheet_name: str = None, max_retries: int = 5,
+                     backoff: float = 0.05, max_backoff: float = 1.0) -> Dict[str, Any]:
+        """
+        读取-修改-写入区域，其他客户端同时修改时自动重试（乐观并发）
+        
+        先读取值和指纹，再用 compare_and_set 写入 fn 的结果；区域在此期间被修改时，
+        使用冲突响应中返回的当前内容重新调用 fn，不需要额外读取。重试间隔按指数退避（带随机抖动）。
+        
+        Args:
+            address: 区域地址，如 "A1:C10"
+            fn: 修改函数，接收当前值（二维数组的副本），返回新值；返回 None 时使用原地修改后的参数。
+                重试时会再次调用，不应有副作用
+            sheet_name: 工作表名称，可选
+            max_retries: 冲突后的最大重试次数
+            backoff: 第一次重试前的等待秒数，之后每次加倍
+            max_backoff: 单次等待的最大秒数
+            
+        Returns:
+            {"values": 写入的值, "fingerprint": 写入后的指纹, "attempts": 尝试次数}
+            
+        Raises:
+            RuntimeError: 重试次数用完仍然冲突
+            
+        Example:
+            >>> def increment(values):
+            ...     values[0][0] = (values[0][0] or 0) + 1
+            >>> client.update_range("B2", increment)
+        """
+        snapshot = self.get_range_snapshot(address, sheet_name)
+        values, fingerprint = snapshot["values"], snapshot["fingerprint"]
+        for attempt in range(max_retries + 1):
+            rows = [list(row) for row in values]
+            new_values = fn(rows)
+            if new_values is None:
+                new_values = rows
+            result = self.compare_and_set(address, fingerprint, new_values, sheet_name)
+            if result["applied"]:
+                return {"values": new_values, "fingerprint": result["fingerprint"], "attempts": attempt + 1}
+            values, fingerprint = result["values"], result["fingerprint"]
+            if attempt < max_retries:
+                time.sleep(min(max_backoff, backoff * 2 ** attempt) * random.uniform(0.5, 1.0))
+        raise RuntimeError(f"更新区域 {address} 失败：{max_retries + 1} 次尝试均与其他写入冲突")
+    
     def batch_write(self, data: List[List], start_cell: str = "A1", sheet_name: str = None) -> Dict[str, Any]:
         """
         批量写入数据到工作表
@@ -209,7 +1037,6 @@ class WPSAirScriptClient:
             return {"success": False, "message": "数据为空"}
         
         # 计算结束单元格
-        import re
         match = re.match(r'([A-Z]+)(\d+)', start_cell)
         if not match:
             return {"success": False, "message": "起始单元格格式错误"}
@@ -225,21 +1052,74 @@ class WPSAirScriptClient:
         address = f"{start_cell}:{end_col}{end_row}"
         return self.set_range_values(address, data, sheet_name)
     
-    def _column_letter_to_number(self, column: str) -> int:
-        """列字母转数字"""
-        result = 0
-        for char in column:
-            result = result * 26 + (ord(char) - ord('A') + 1)
+    def append_rows(self, rows: List[List], sheet_name: str = None, column: str = None) -> Dict[str, Any]:
+        """
+        在工作表末尾追加行（服务端定位末尾并写入，只需一次请求）
+        
+        多个线程同时追加到同一工作表时，会自动合并为一次请求：
+        前一批发送期间到达的行会累积到下一批中一起写入。
+        
+        Args:
+            rows: 二维数组数据，每个子数组代表一行
+            sheet_name: 工作表名称，可选
+            column: 用于定位末尾的列字母，如 "A"，可选。
+                不指定则追加到已使用区域的最后一行之后
+            
+        Returns:
+            执行结果字典，startRow 为本次调用的行写入的起始行号，
+            batchedRows 为合并发送的总行数
+            
+        Example:
+            >>> client.append_rows([["2024-01-01", "登录", "张三"]], "日志")
+            >>> client.append_rows(rows, "日志", column="A")
+        """
+        if not rows:
+            return {"success": False, "message": "数据为空"}
+
+        key = (sheet_name, column)
+        with self._append_lock:
+            batch = self._append_batches.get(key)
+            leader = batch is None
+            if leader:
+                batch = _AppendBatch()
+                self._append_batches[key] = batch
+            offset = len(batch.rows)
+            batch.rows.extend(rows)
+            send_lock = self._append_send_locks.setdefault(key, threading.Lock())
+
+        if leader:
+            # 等待上一批发送完成，期间到达的行继续并入当前批次
+            with send_lock:
+                with self._append_lock:
+                    del self._append_batches[key]
+                try:
+                    batch.result = self._extract_result(
+                        self._call_function("appendRows", sheet_name, rows=batch.rows, column=column))
+                except Exception as e:
+                    batch.error = e
+                finally:
+                    batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+
+        result = batch.result
+        if isinstance(result, dict) and result.get("success") and "startRow" in result:
+            result = dict(result)
+            result["startRow"] += offset
+            result["batchedRows"] = result["rowsWritten"]
+            result["rowsWritten"] = len(rows)
         return result
+
+    def _column_letter_to_number(self, column: str) -> int:
+        """列字母转数字（见 column_letter_to_number）"""
+        return column_letter_to_number(column)
     
     def _column_number_to_letter(self, num: int) -> str:
-        """列数字转字母"""
-        letter = ""
-        while num > 0:
-            remainder = (num - 1) % 26
-            letter = chr(ord('A') + remainder) + letter
-            num = (num - 1) // 26
-        return letter
+        """列数字转字母（见 column_number_to_letter）"""
+        return column_number_to_letter(num)
     
     def clear_range(self, address: str, sheet_name: str = None) -> Dict:
         """
@@ -294,6 +1174,66 @@ class WPSAirScriptClient:
         """
         return self._call_function("setCellFormula", sheet_name, address=address, formula=formula)
 
+    def get_range_formulas(self, address: str, sheet_name: str = None) -> List[List]:
+        """
+        获取区域公式（返回二维数组，一次请求）
+        
+        Args:
+            address: 区域地址，如 "D2:D100"
+            sheet_name: 工作表名称，可选
+            
+        Returns:
+            二维数组，有公式的单元格为公式字符串，其他单元格为其值
+            
+        Example:
+            >>> client.get_range_formulas("D2:E3")
+            [['=B2*C2', '=SUM(B2:C2)'], ['=B3*C3', '=SUM(B3:C3)']]
+        """
+        result = self._call_function("getRangeFormulas", sheet_name, address=address)
+        result = self._extract_result(result)
+        
+        if result and isinstance(result, dict) and 'formulas' in result:
+            return result['formulas']
+        
+        return []
+    
+    def set_range_formulas(self, address: str, formulas: List[List], sheet_name: str = None) -> Dict:
+        """
+        设置区域公式（二维数组，一次请求）
+        
+        Args:
+            address: 区域地址，如 "D2:D3"
+            formulas: 二维数组，元素为公式字符串（如 "=B2*C2"）或常量
+            sheet_name: 工作表名称，可选
+            
+        Returns:
+            执行结果字典
+            
+        Example:
+            >>> client.set_range_formulas("D2:D3", [["=B2*C2"], ["=B3*C3"]])
+        """
+        return self._call_function("setRangeFormulas", sheet_name, address=address, formulas=formulas)
+    
+    def fill_formula(self, address: str, r1c1_formula: str, sheet_name: str = None) -> Dict:
+        """
+        用同一个 R1C1 公式填充整个区域（一次请求）
+        
+        R1C1 公式中的相对引用按每个单元格的位置自动调整，适合填充整列计算公式。
+        
+        Args:
+            address: 区域地址，如 "D2:D10001"
+            r1c1_formula: R1C1 格式公式，如 "=RC[-2]*RC[-1]"（同一行左侧第 2 列乘以左侧第 1 列）
+            sheet_name: 工作表名称，可选
+            
+        Returns:
+            执行结果字典
+            
+        Example:
+            >>> # D 列 = B 列 * C 列，共 10000 行
+            >>> client.fill_formula("D2:D10001", "=RC[-2]*RC[-1]")
+        """
+        return self._call_function("fillFormula", sheet_name, address=address, formula=r1c1_formula)
+
     # ==================== 格式化操作 ====================
     
     def set_font(self, address: str, font_options: Dict, sheet_name: str = None) -> Dict:
@@ -555,6 +1495,114 @@ class WPSAirScriptClient:
         """
         return self._call_function("deleteColumns", sheet_name, columnIndex=column_index, count=count)
 
+    @staticmethod
+    def _merge_delete_spans(indices: List[int]) -> List[Dict[str, int]]:
+        """将待删除的索引去重、排序并合并为连续段"""
+        spans = []
+        for index in sorted(set(indices)):
+            if index < 1:
+                raise ValueError(f"索引必须从 1 开始: {index}")
+            if spans and spans[-1]["index"] + spans[-1]["count"] == index:
+                spans[-1]["count"] += 1
+            else:
+                spans.append({"index": index, "count": 1})
+        return spans
+
+    @staticmethod
+    def _merge_insert_spans(positions: List, count: int) -> List[Dict[str, int]]:
+        """将插入位置合并为插入段，同一位置的插入数量累加"""
+        merged: Dict[int, int] = {}
+        for position in positions:
+            index, n = position if isinstance(position, (tuple, list)) else (position, count)
+            if index < 1 or n < 1:
+                raise ValueError(f"插入位置和数量必须从 1 开始: {position}")
+            merged[index] = merged.get(index, 0) + n
+        return [{"index": index, "count": n} for index, n in sorted(merged.items())]
+
+    def delete_rows_many(self, row_indices: List[int], sheet_name: str = None) -> Dict:
+        """
+        批量删除多行（一次请求）
+        
+        索引自动去重、排序并合并为连续段，在服务端自下而上删除，
+        所有索引均指删除前的原始行号，无需自行处理行号偏移。
+        
+        Args:
+            row_indices: 要删除的行索引列表（从 1 开始），可以无序、不连续
+            sheet_name: 工作表名称，可选
+            
+        Returns:
+            执行结果字典，count 为删除的总行数
+            
+        Example:
+            >>> client.delete_rows_many([3, 4, 5, 9, 20])  # 合并为 3 段删除
+        """
+        spans = self._merge_delete_spans(row_indices)
+        if not spans:
+            return {"success": True, "count": 0}
+        return self._call_function("applyRowSpans", sheet_name, action="delete", spans=spans)
+
+    def insert_rows_many(self, positions: List, count: int = 1, sheet_name: str = None) -> Dict:
+        """
+        批量在多个位置插入行（一次请求）
+        
+        所有位置均指插入前的原始行号，在服务端自下而上插入。
+        
+        Args:
+            positions: 插入位置列表，元素为行索引（插入 count 行）或 (行索引, 行数)
+            count: 每个位置默认插入的行数，默认为 1
+            sheet_name: 工作表名称，可选
+            
+        Returns:
+            执行结果字典，count 为插入的总行数
+            
+        Example:
+            >>> client.insert_rows_many([3, 10])  # 在原第 3、10 行前各插入 1 行
+            >>> client.insert_rows_many([(3, 2), (10, 5)])
+        """
+        spans = self._merge_insert_spans(positions, count)
+        if not spans:
+            return {"success": True, "count": 0}
+        return self._call_function("applyRowSpans", sheet_name, action="insert", spans=spans)
+
+    def delete_columns_many(self, column_indices: List[int], sheet_name: str = None) -> Dict:
+        """
+        批量删除多列（一次请求），索引均指删除前的原始列号
+        
+        Args:
+            column_indices: 要删除的列索引列表（从 1 开始，A=1, B=2, ...）
+            sheet_name: 工作表名称，可选
+            
+        Returns:
+            执行结果字典，count 为删除的总列数
+            
+        Example:
+            >>> client.delete_columns_many([2, 3, 7])  # 删除 B、C、G 列
+        """
+        spans = self._merge_delete_spans(column_indices)
+        if not spans:
+            return {"success": True, "count": 0}
+        return self._call_function("applyColumnSpans", sheet_name, action="delete", spans=spans)
+
+    def insert_columns_many(self, positions: List, count: int = 1, sheet_name: str = None) -> Dict:
+        """
+        批量在多个位置插入列（一次请求），位置均指插入前的原始列号
+        
+        Args:
+            positions: 插入位置列表，元素为列索引（插入 count 列）或 (列索引, 列数)
+            count: 每个位置默认插入的列数，默认为 1
+            sheet_name: 工作表名称，可选
+            
+        Returns:
+            执行结果字典，count 为插入的总列数
+            
+        Example:
+            >>> client.insert_columns_many([2, (5, 3)])
+        """
+        spans = self._merge_insert_spans(positions, count)
+        if not spans:
+            return {"success": True, "count": 0}
+        return self._call_function("applyColumnSpans", sheet_name, action="insert", spans=spans)
+
     # ==================== 查找和替换 ====================
     
     def find_cell(self, search_text: str, search_range: str, sheet_name: str = None) -> Dict:
@@ -619,6 +1667,147 @@ class WPSAirScriptClient:
         
         return []
 
+    # ==================== 按键更新 ====================
+    
+    def upsert_rows(self, sheet_name: str, key_column: str, rows: List, has_header: bool = True,
+                    cache_index: bool = False) -> Dict[str, Any]:
+        """
+        按键列更新或追加行（一次请求完成）
+        
+        服务端一次遍历建立 键 -> 行 索引，键已存在的行原地更新，不存在的追加到末尾。
+        同一批中重复的键以最后一次为准。
+        
+        Args:
+            sheet_name: 工作表名称
+            key_column: 键列，标题名（has_header=True 时）或列字母
+            rows: 行列表，元素可以是：
+                - 列表：整行数据，从已使用区域的首列开始
+                - 字典：{标题名或列字母: 值}，只更新指定的列，必须包含键列
+            has_header: 首行是否为标题行，默认 True
+            cache_index: 是否在客户端缓存更新后的键索引，供 lookup_row 使用
+            
+        Returns:
+            执行结果字典，updated 为更新的行数，inserted 为追加的行数
+            
+        Example:
+            >>> client.upsert_rows("员工", "工号", [
+            ...     ["E001", "张三", 8800],
+            ...     {"工号": "E009", "姓名": "新员工"},
+            ... ])
+            {'success': True, 'updated': 1, 'inserted': 1}
+        """
+        if not rows:
+            return {"success": True, "updated": 0, "inserted": 0}
+
+        result = self._call_function("upsertRows", sheet_name, keyColumn=key_column, rows=rows,
+                                     hasHeader=has_header, returnIndex=cache_index)
+        result = self._extract_result(result)
+
+        if cache_index and isinstance(result, dict) and "index" in result:
+            with self._cache_lock:
+                self._key_index_cache[(sheet_name, key_column)] = result.pop("index")
+        return result
+
+    def lookup_row(self, sheet_name: str, key_column: str, key: Any, has_header: bool = True) -> Optional[int]:
+        """
+        按键查找行号，使用客户端缓存的键索引
+        
+        首次查找时从服务端获取整个键索引并缓存；通过本客户端写入该工作表后缓存自动失效。
+        其他客户端的写入无法感知，必要时调用 invalidate_key_index 手动失效。
+        
+        Args:
+            sheet_name: 工作表名称
+            key_column: 键列，标题名或列字母
+            key: 要查找的键
+            has_header: 首行是否为标题行，默认 True
+            
+        Returns:
+            行号（从 1 开始），不存在时返回 None
+            
+        Example:
+            >>> row = client.lookup_row("员工", "工号", "E001")
+            >>> client.set_cell_value(f"C{row}", 9000, "员工")
+        """
+        cache_key = (sheet_name, key_column)
+        with self._cache_lock:
+            index = self._key_index_cache.get(cache_key)
+
+        if index is None:
+            result = self._call_function("getKeyIndex", sheet_name, keyColumn=key_column, hasHeader=has_header)
+            result = self._extract_result(result)
+            if not (isinstance(result, dict) and "index" in result):
+                return None
+            index = result["index"]
+            with self._cache_lock:
+                self._key_index_cache[cache_key] = index
+
+        return index.get(str(key))
+
+    def invalidate_key_index(self, sheet_name: str = None) -> None:
+        """
+        使键索引缓存失效
+        
+        Args:
+            sheet_name: 工作表名称，不指定则清空所有缓存
+        """
+        self._invalidate_caches(sheet_name)
+
+    # ==================== 查询下推 ====================
+    
+    def query(self, sheet_name: str = None, where: Any = None, select: List[str] = None,
+              group_by: Any = None, agg: Any = None, address: str = None,
+              has_header: bool = True, limit: int = None) -> Dict[str, Any]:
+        """
+        在服务端筛选/投影/分组聚合工作表数据，只返回结果行
+        
+        列可用标题名（has_header=True 时）或列字母引用，标题名优先。
+        条件只支持固定的运算符，不会在服务端执行任意代码。
+        
+        Args:
+            sheet_name: 工作表名称，可选
+            where: 筛选条件，如 ("部门", "==", "技术部")、条件列表（AND）
+                或 {"or": [...]} / {"not": ...}。运算符：
+                ==, !=, >, >=, <, <=, in, not_in, contains, startswith, endswith, empty, not_empty
+            select: 返回的列，不指定则返回所有列，不能与 agg 同时指定
+            group_by: 分组列，单个列或列列表
+            agg: 聚合，如 {"工资": "sum"} 或 [("工资", "avg"), ("*", "count")]，
+                函数：sum, count, avg, min, max。count 统计非空单元格，
+                sum 和 avg 只统计数字（包括数字文本）
+            address: 查询区域，如 "A1:D1000"，不指定则使用已使用区域
+            has_header: 首行是否为标题行，默认 True
+            limit: 最多返回的行数
+            
+        Returns:
+            结果字典 {"columns": [...], "rows": [[...]], "matched": 匹配行数, "scanned": 扫描行数}
+            
+        Example:
+            >>> # 技术部工资总和
+            >>> client.query("Sheet1", where=("部门", "==", "技术部"), agg={"工资": "sum"})
+            {'columns': ['sum(工资)'], 'rows': [[16500]], 'matched': 2, 'scanned': 3, ...}
+            >>> # 各部门平均工资
+            >>> client.query("Sheet1", group_by="部门", agg=[("工资", "avg"), ("*", "count")])
+        """
+        if select and agg:
+            raise ValueError("select 与 agg 不能同时指定，聚合结果的列由 group_by 和 agg 决定")
+        spec = {"hasHeader": has_header}
+        if address:
+            spec["address"] = address
+        if where is not None:
+            spec["where"] = _normalize_condition(where)
+        if select:
+            spec["select"] = list(select)
+        if group_by:
+            spec["groupBy"] = [group_by] if isinstance(group_by, str) else list(group_by)
+        if agg:
+            spec["agg"] = _normalize_aggregates(agg)
+        elif group_by:
+            raise ValueError("group_by 需要同时指定 agg")
+        if limit:
+            spec["limit"] = limit
+
+        result = self._call_function("queryRange", sheet_name, spec=spec)
+        return self._extract_result(result)
+
     # ==================== 排序操作 ====================
     
     def sort_range(self, address: str, sort_options: Dict, sheet_name: str = None) -> Dict:
@@ -628,9 +1817,9 @@ class WPSAirScriptClient:
         Args:
             address: 区域地址，如 "A1:C10"
             sort_options: 排序选项字典，可包含以下键：
-                - key: 排序列索引（从 1 开始）
-                - order: 排序顺序，"asc" 升序或 "desc" 降序
-                - hasHeaders: 是否包含标题行，True/False
+                - key: 排序列，区域内的列索引（从 1 开始）、列字母如 "B" 或单元格地址如 "B1"
+                - order: 排序顺序，"asc"（或 1）升序，"desc"（或 2）降序
+                - hasHeaders（或 hasHeader）: 是否包含标题行，True/False
             sheet_name: 工作表名称，可选
             
         Returns:
@@ -641,9 +1830,120 @@ class WPSAirScriptClient:
         """
         return self._call_function("sortRange", sheet_name, address=address, sortOptions=sort_options)
 
+    def sort_range_by_keys(self, address: str, keys: List[Any], header: Any = "auto", sheet_name: str = None,
+                           method: str = "auto") -> Dict[str, Any]:
+        """
+        按多个键在服务端排序区域（稳定排序：所有键都相同的行保持原有顺序）
+        
+        不超过 3 个键时使用原生排序（格式随行移动）；键更多或原生排序失败时，
+        在一次脚本执行内读取、排序并写回（只移动值和公式，不移动格式）。
+        空单元格始终排在最后，文本比较不区分大小写，数字排在文本之前。
+        
+        Args:
+            address: 区域地址，如 "A1:F5000"
+            keys: 排序键列表，按优先级排列，每项为：
+                - 列：区域内的列索引（从 1 开始）、列字母如 "C" 或单元格地址如 "C1"，升序
+                - (列, "asc"/"desc") 元组
+                - {"column": 列, "order": "asc"/"desc"} 字典
+            header: 第一行是否为标题行：True、False 或 "auto"（第一行全为文本且排序列中有非文本值时视为标题行）
+            sheet_name: 工作表名称，可选
+            method: "auto"（默认）、"native"（只用原生排序，最多 3 个键）或 "memory"（总是内存排序）
+            
+        Returns:
+            {"method": 实际使用的方式, "header": 是否有标题行, "rows": 排序的数据行数, "keys": 规范化后的排序键}
+            
+        Example:
+            >>> client.sort_range_by_keys("A1:F5000", ["C", ("E", "desc"), 1])
+        """
+        if method not in self.SORT_METHODS:
+            raise ValueError(f"不支持的排序方式: {method}，可选: {', '.join(self.SORT_METHODS)}")
+        specs = []
+        for key in keys:
+            if isinstance(key, dict):
+                specs.append(key)
+            elif isinstance(key, (tuple, list)):
+                specs.append({"column": key[0], "order": key[1] if len(key) > 1 else "asc"})
+            else:
+                specs.append({"column": key, "order": "asc"})
+        result = self._extract_result(self._call_function(
+            "sortRangeByKeys", sheet_name, address=address, keys=specs,
+            options={"header": header, "method": method}))
+        if not isinstance(result, dict) or not result.get("success"):
+            raise RuntimeError(f"排序失败: {result}")
+        result.pop("success")
+        return result
+
+    # ==================== 数据清理 ====================
+
+    def dedupe_rows(self, address: str, key_columns: List[Any] = None, header: Any = "auto", keep: str = "first",
+                    ignore_case: bool = False, trim: bool = False, sheet_name: str = None) -> Dict[str, Any]:
+        """
+        在服务端删除重复行（一次读取、一次写回）
+        
+        键列的值都相同的行只保留一行，其余行上移，区域底部空出的行被清空；区域外的单元格不受影响。
+        含公式的单元格按公式移动，格式不随行移动。
+        
+        Args:
+            address: 区域地址，如 "A1:F5000"
+            key_columns: 键列（区域内的列索引、列字母如 "B" 或单元格地址），不指定则比较整行
+            header: 第一行是否为标题行：True、False 或 "auto"（规则同 sort_range_by_keys）
+            keep: "first" 保留第一次出现的行，"last" 保留最后一次出现的行
+            ignore_case: 比较文本键时是否忽略大小写
+            trim: 比较文本键时是否忽略首尾空白
+            sheet_name: 工作表名称，可选
+            
+        Returns:
+            {"header": 是否有标题行, "rows": 数据行数, "rowsKept": 保留的行数, "rowsRemoved": 删除的行数}
+            
+        Example:
+            >>> client.dedupe_rows("A1:F5000", ["A", "C"], ignore_case=True)["rowsRemoved"]
+        """
+        if keep not in ("first", "last"):
+            raise ValueError(f"keep 只能为 first 或 last: {keep}")
+        result = self._extract_result(self._call_function(
+            "dedupeRows", sheet_name, address=address, keyColumns=list(key_columns or []),
+            options={"header": header, "keep": keep, "ignoreCase": ignore_case, "trim": trim}))
+        if not isinstance(result, dict) or not result.get("success"):
+            raise RuntimeError(f"删除重复行失败: {result}")
+        result.pop("success")
+        return result
+
+    def normalize_range(self, address: str, ops: List[str] = ("trim", "empty_to_null"),
+                        sheet_name: str = None) -> Dict[str, Any]:
+        """
+        在服务端批量清理单元格值（一次读取、一次写回，公式单元格不处理）
+        
+        Args:
+            address: 区域地址，如 "A1:F5000"
+            ops: 按顺序执行的清理操作（见 NORMALIZE_OPS）：
+                - "trim": 去除首尾空白（包括全角空格和不换行空格）
+                - "collapse_whitespace": 连续空白合并为一个空格
+                - "remove_nonprinting": 删除控制字符和零宽字符
+                - "empty_to_null": 只含空白的文本清空为空单元格
+                - "to_number": 数字文本转换为数字（如 "1,234.5"）
+                - "lower" / "upper": 转换为小写 / 大写
+            sheet_name: 工作表名称，可选
+            
+        Returns:
+            {"cells": 单元格数, "cellsChanged": 修改的单元格数}，没有修改时不写回
+            
+        Example:
+            >>> client.normalize_range("A2:F5000", ["trim", "empty_to_null", "to_number"])
+        """
+        unknown = [op for op in ops if op not in self.NORMALIZE_OPS]
+        if unknown:
+            raise ValueError(f"不支持的清理操作: {', '.join(unknown)}，可选: {', '.join(self.NORMALIZE_OPS)}")
+        result = self._extract_result(self._call_function("normalizeRange", sheet_name, address=address,
+                                                          ops=list(ops)))
+        if not isinstance(result, dict) or not result.get("success"):
+            raise RuntimeError(f"清理区域失败: {result}")
+        result.pop("success")
+        return result
+
     # ==================== 复制粘贴 ====================
     
-    def copy_paste_range(self, source_address: str, target_address: str, sheet_name: str = None) -> Dict:
+    def copy_paste_range(self, source_address: str, target_address: str, sheet_name: str = None,
+                         target_sheet: str = None) -> Dict:
         """
         复制粘贴区域
         
@@ -651,6 +1951,7 @@ class WPSAirScriptClient:
             source_address: 源区域地址，如 "A1:C3"
             target_address: 目标区域起始地址，如 "E1"
             sheet_name: 工作表名称，可选
+            target_sheet: 目标工作表名称，可选，不指定时与 sheet_name 相同
             
         Returns:
             执行结果字典
@@ -658,8 +1959,40 @@ class WPSAirScriptClient:
         Example:
             >>> client.copy_paste_range("A1:C3", "E1")
         """
-        return self._call_function("copyPasteRange", sheet_name, 
-                                  sourceAddress=source_address, targetAddress=target_address)
+        params = {"sourceAddress": source_address, "targetAddress": target_address}
+        if target_sheet:
+            params["targetSheet"] = target_sheet
+        result = self._call_function("copyPasteRange", sheet_name, **params)
+        if target_sheet:
+            self._invalidate_caches(target_sheet)
+        return result
+
+    def copy_block(self, src_sheet: str, src_range: str, dst_sheet: str, dst_cell: str,
+                   mode: str = "all") -> Dict:
+        """
+        在工作表之间复制区域（一次请求完成，不经过剪贴板，可在多个线程中并发调用）
+        
+        Args:
+            src_sheet: 源工作表名称
+            src_range: 源区域地址，如 "A1:D20"
+            dst_sheet: 目标工作表名称，可与源工作表相同
+            dst_cell: 目标区域左上角单元格，如 "B2"
+            mode: 复制内容
+                - "all": 值、公式和格式（默认）
+                - "values": 仅值，公式转为计算结果
+                - "formats": 仅格式，目标区域原有内容保持不变
+            
+        Returns:
+            执行结果字典，address 为目标区域地址，rows/columns 为复制的行列数
+            
+        Example:
+            >>> client.copy_block("模板", "A1:F30", "2024-06", "A1")
+            >>> client.copy_block("Sheet1", "A1:D1", "Sheet2", "A1", mode="formats")
+        """
+        if mode not in self.COPY_MODES:
+            raise ValueError(f"不支持的复制模式: {mode}，可选: {', '.join(self.COPY_MODES)}")
+        return self._call_function("copyBlock", dst_sheet, sourceSheet=src_sheet, sourceAddress=src_range,
+                                   targetSheet=dst_sheet, targetCell=dst_cell, mode=mode)
     
     def copy_range(self, source_address: str, sheet_name: str = None) -> Dict:
         """
@@ -727,28 +2060,143 @@ class WPSAirScriptClient:
         
         return []
     
-    def get_used_range_data(self, sheet_name: str = None) -> List[List]:
+    def describe_workbook(self, refresh: bool = False) -> Dict[str, Any]:
+        """
+        获取工作簿概要（一次请求），用于在任务开始时规划工作
+        
+        结果缓存在客户端上，直到通过本客户端执行写操作或指定 refresh=True。
+        其他客户端的修改不会使缓存失效，长时间运行的任务应定期刷新。
+        
+        Args:
+            refresh: 是否忽略缓存重新获取
+            
+        Returns:
+            {"count": 工作表数量, "sheets": [...]}，每个工作表包含：
+            - name: 名称
+            - index: 序号（从 1 开始）
+            - address: 已使用区域地址，如 "$A$1:$D$100"
+            - startRow / startColumn: 已使用区域起始行号和列号
+            - rows / columns: 已使用区域行数和列数，空工作表为 0
+            - fingerprint: 已使用区域内容指纹，内容变化时改变
+            
+        Example:
+            >>> workbook = client.describe_workbook()
+            >>> for sheet in workbook["sheets"]:
+            ...     print(sheet["name"], sheet["rows"], sheet["fingerprint"])
+        """
+        with self._cache_lock:
+            description = None if refresh else self._workbook_description
+            generation = self._cache_generation
+        if description is None:
+            description = self._extract_result(self._call_function("describeWorkbook", None))
+            if not isinstance(description, dict) or not description.get("success"):
+                raise RuntimeError(f"获取工作簿概要失败: {description}")
+            description.pop("success", None)
+            with self._cache_lock:
+                # 请求期间有写操作时不缓存，避免缓存过期的概要
+                if generation == self._cache_generation:
+                    self._workbook_description = description
+        # 返回副本，避免调用方修改缓存
+        return {"count": description["count"], "sheets": [dict(sheet) for sheet in description["sheets"]]}
+    
+    def get_used_range_data(self, sheet_name: str = None, as_grid: bool = False) -> List[List]:
         """
         获取已使用区域的数据
         
         Args:
             sheet_name: 工作表名称，可选
+            as_grid: 是否返回紧凑的 Grid（见 get_range_values）
             
         Returns:
-            二维数组，包含所有已使用单元格的数据
+            二维数组，包含所有已使用单元格的数据；as_grid=True 时为 Grid
             
         Example:
             >>> data = client.get_used_range_data("Sheet1")
             >>> print(data)  # [['Name', 'Age'], ['Alice', 25]]
         """
+        if self.disk_cache is not None:
+            data = self._cached_read(None, sheet_name)
+            return to_grid(data) if as_grid else data
+
         result = self._call_function("getUsedRangeData", sheet_name)
         result = self._extract_result(result)
         
         # 返回实际的数据数组
+        data = []
         if result and isinstance(result, dict) and 'data' in result:
-            return result['data']
+            data = result['data']
         
-        return []
+        return to_grid(data) if as_grid else data
+
+    def get_used_range_info(self, sheet_name: str = None) -> Dict[str, Any]:
+        """
+        获取已使用区域的位置和大小（不返回数据）
+        
+        Args:
+            sheet_name: 工作表名称，可选
+            
+        Returns:
+            字典，包含 address、startRow、startColumn、rows、columns，空工作表 rows 为 0
+            
+        Example:
+            >>> info = client.get_used_range_info("Sheet1")
+            >>> print(info["address"], info["rows"], info["columns"])
+        """
+        result = self._call_function("getUsedRangeInfo", sheet_name)
+        return self._extract_result(result)
+
+    def get_range_fingerprints(self, block_rows: int = 500, sheet_name: str = None) -> Dict[str, Any]:
+        """
+        获取已使用区域的分块指纹（按行分块），用于增量同步时判断哪些块发生了变化
+        
+        Args:
+            block_rows: 每块行数，默认 500
+            sheet_name: 工作表名称，可选
+            
+        Returns:
+            字典，包含 address、startRow、startColumn、rows、columns、blockRows，
+            以及 blocks（每块一个指纹字符串）
+            
+        Example:
+            >>> info = client.get_range_fingerprints(500, "Sheet1")
+            >>> print(info["rows"], len(info["blocks"]))
+        """
+        result = self._call_function("getRangeFingerprints", sheet_name, blockRows=block_rows)
+        return self._extract_result(result)
+
+    def changes_since(self, sheet_name: str = None, cursor: int = 0) -> Dict[str, Any]:
+        """
+        获取自上次同步以来新增、修改和删除的行（变更订阅）
+        
+        服务端在隐藏工作表 "_wps_change_log" 中保存每行的指纹和修改版本，每次调用对比当前内容，
+        只返回 cursor 之后发生变化的行，传输量与变化的行数有关，与工作表大小无关。
+        行按行号识别：在中间插入或删除行会使之后的行都视为修改。多个消费者可以各自保存 cursor。
+        
+        Args:
+            sheet_name: 工作表名称，可选
+            cursor: 上次调用返回的 cursor，0 表示从头开始（所有行都作为 inserted 返回）
+            
+        Returns:
+            字典：
+            - cursor: 新的游标，下次调用时传入
+            - inserted: [{"row": 行号, "values": 行数据}]，cursor 之后（重新）出现的行
+            - updated: [{"row": 行号, "values": 行数据}]，内容发生变化的行
+            - deleted: [行号]，被清空的行
+            - reset: 游标无效（如隐藏工作表被删除）时为 True，此时返回全部行
+            
+        Example:
+            >>> cursor = 0
+            >>> while True:
+            ...     changes = client.changes_since("订单", cursor)
+            ...     apply(changes["inserted"], changes["updated"], changes["deleted"])
+            ...     cursor = changes["cursor"]
+            ...     time.sleep(60)
+        """
+        result = self._extract_result(self._call_function("getChangesSince", sheet_name, cursor=cursor))
+        if not isinstance(result, dict) or "cursor" not in result:
+            raise RuntimeError(f"获取变更失败: {result}")
+        result.pop("success", None)
+        return result
 
     # ==================== 工作表操作 ====================
     
@@ -0,0 +1,224 @@
+"""
+wps-airsheet-api.js 精简包生成
+按工作负载实际调用的函数，生成只包含对应分发项和依赖函数的脚本
+
+命令行用法:
+    python -m python.wps_bundle getCellValue setRangeValues -o dist/wps-airsheet-min.js
+    python -m python.wps_bundle getCellValue --benchmark 200   # 与完整脚本对比冷启动耗时（需要 node）
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Dict, Iterable, List, Optional
+
+JAVASCRIPT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "javascript")
+DEFAULT_SOURCE = os.path.join(JAVASCRIPT_DIR, "wps-airsheet-api.js")
+BENCHMARK_SCRIPT = os.path.join(JAVASCRIPT_DIR, "benchmark-bundle.js")
+
+# 分发入口，所有精简包都包含
+_ENTRY_FUNCTIONS = ("executeFunction", "getFunctionHandlers")
+
+_FUNCTION_START = re.compile(r"^function (\w+)\(")
+_HANDLER_START = re.compile(r"^    (\w+): function \(params, sheetName\) \{$")
+_IDENTIFIER = re.compile(r"\b[A-Za-z_$][\w$]*\b")
+
+
+class ScriptParts:
+    """
+    wps-airsheet-api.js 的组成部分
+
+    Attributes:
+        prelude: HTTP 调用入口（第一个顶层函数之前的代码）
+        functions: 顶层函数名 -> 源码（按文件中的顺序）
+        handlers: 分发表中的函数名 -> 分发项源码
+        epilogue: 返回结果的结尾代码
+    """
+
+    def __init__(self, prelude: str, functions: Dict[str, str], handlers: Dict[str, str], epilogue: str):
+        self.prelude = prelude
+        self.functions = functions
+        self.handlers = handlers
+        self.epilogue = epilogue
+
+
+def parse_script(source: str) -> ScriptParts:
+    """
+    拆分脚本：入口代码、顶层函数、分发表各项和结尾代码
+
+    依赖脚本的格式约定：顶层函数以行首 "function name(" 开始、以行首 "}" 结束；
+    分发项在 getFunctionHandlers 中，以 "    name: function (params, sheetName) {" 开始、以 "    }," 结束。
+
+    Args:
+        source: 脚本源码
+
+    Returns:
+        ScriptParts 实例
+    """
+    lines = source.split("\n")
+    functions: Dict[str, str] = {}
+    first_function = None
+    i = 0
+    while i < len(lines):
+        match = _FUNCTION_START.match(lines[i])
+        if not match:
+            i += 1
+            continue
+        if first_function is None:
+            first_function = i
+        end = lines.index("}", i)
+        functions[match.group(1)] = "\n".join(lines[i:end + 1])
+        i = end + 1
+
+    if first_function is None or "getFunctionHandlers" not in functions:
+        raise ValueError("脚本中未找到 getFunctionHandlers 分发表")
+
+    # 入口代码不包含第一个函数前的分节注释和 JSDoc
+    start = first_function
+    while start > 0 and (lines[start - 1].startswith(("/**", " *", "// ====")) or not lines[start - 1].strip()):
+        start -= 1
+    prelude = "\n".join(lines[:start]).rstrip() + "\n"
+
+    handlers: Dict[str, str] = {}
+    table = functions["getFunctionHandlers"].split("\n")
+    i = 0
+    while i < len(table):
+        match = _HANDLER_START.match(table[i])
+        if not match:
+            i += 1
+            continue
+        end = table.index("    },", i)
+        handlers[match.group(1)] = "\n".join(table[i:end + 1])
+        i = end + 1
+
+    epilogue = next(line for line in reversed(lines) if line.startswith("return "))
+    return ScriptParts(prelude, functions, handlers, epilogue + "\n")
+
+
+def resolve_dependencies(parts: ScriptParts, handlers: Iterable[str]) -> List[str]:
+    """
+    计算分发项依赖的顶层函数（传递闭包，按文件中的顺序）
+
+    按标识符匹配，字符串或属性名中出现的同名标识符也会被计入，只会多包含函数，不会遗漏。
+    """
+    needed = set(_ENTRY_FUNCTIONS)
+    queue = [parts.handlers[name] for name in handlers]
+    queue += [parts.functions[name] for name in _ENTRY_FUNCTIONS if name != "getFunctionHandlers"]
+    while queue:
+        for identifier in _IDENTIFIER.findall(queue.pop()):
+            if identifier in parts.functions and identifier not in needed:
+                needed.add(identifier)
+                queue.append(parts.functions[identifier])
+    return [name for name in parts.functions if name in needed]
+
+
+def build_bundle(functions: Iterable[str], source_path: str = DEFAULT_SOURCE,
+                 output_path: Optional[str] = None) -> str:
+    """
+    生成精简包：只包含指定函数的分发项及其依赖的顶层函数
+
+    Args:
+        functions: 工作负载调用的脚本函数名（如 "getCellValue"），可直接传入
+            LocalAirScriptServer.calls（runBatch 中各操作的函数名也会计入）
+        source_path: 完整脚本路径，默认为 javascript/wps-airsheet-api.js
+        output_path: 输出文件路径，不指定则只返回源码
+
+    Returns:
+        精简包源码
+
+    Raises:
+        ValueError: 函数不在分发表中
+
+    Example:
+        >>> server = LocalAirScriptServer()
+        >>> client = WPSAirScriptClient("file", "token", "script", session=server)
+        >>> run_workload(client)
+        >>> build_bundle(server.calls, output_path="dist/wps-airsheet-min.js")
+    """
+    with open(source_path, encoding="utf-8") as f:
+        parts = parse_script(f.read())
+
+    selected = sorted(set(functions))
+    unknown = [name for name in selected if name not in parts.handlers]
+    if unknown:
+        raise ValueError(f"分发表中没有这些函数: {', '.join(unknown)}")
+    # 保持分发表中的原有顺序
+    selected = [name for name in parts.handlers if name in selected]
+
+    table = "function getFunctionHandlers() {\n  return {\n" + "\n\n".join(
+        parts.handlers[name] for name in selected) + "\n  };\n}"
+    body = [table if name == "getFunctionHandlers" else parts.functions[name]
+            for name in resolve_dependencies(parts, selected)]
+
+    header = ("/**\n"
+              f" * {os.path.basename(source_path)} 精简包（由 python/wps_bundle.py 生成，请勿手动修改）\n"
+              f" * 包含函数: {', '.join(selected)}\n"
+              " */\n\n")
+    bundle = header + parts.prelude + "\n" + "\n\n".join(body) + "\n\n" + parts.epilogue
+
+    if output_path:
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(bundle)
+    return bundle
+
+
+def benchmark_bundle(functions: Iterable[str], iterations: int = 200, source_path: str = DEFAULT_SOURCE,
+                     node: str = "node") -> str:
+    """
+    对比精简包与完整脚本的冷启动执行耗时（每次重新编译并执行脚本，调用第一个函数）
+
+    在 node 中使用内存模拟的 AirScript 对象运行 javascript/benchmark-bundle.js。
+
+    Args:
+        functions: 精简包包含的函数名，基准调用第一个
+        iterations: 每个脚本的执行次数
+        source_path: 完整脚本路径
+        node: node 可执行文件
+
+    Returns:
+        基准报告文本
+
+    Raises:
+        RuntimeError: 未找到 node
+    """
+    functions = list(functions)
+    if shutil.which(node) is None:
+        raise RuntimeError("基准测试需要 node: https://nodejs.org/")
+    with tempfile.TemporaryDirectory() as directory:
+        bundle_path = os.path.join(directory, "bundle.js")
+        build_bundle(functions, source_path, bundle_path)
+        completed = subprocess.run(
+            [node, BENCHMARK_SCRIPT, source_path, bundle_path, functions[0], str(iterations)],
+            capture_output=True, text=True, check=True)
+    return completed.stdout
+
+
+def main(argv: List[str] = None) -> None:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="生成只包含指定函数的 wps-airsheet-api.js 精简包")
+    parser.add_argument("functions", nargs="+", help="脚本函数名，如 getCellValue setRangeValues")
+    parser.add_argument("-o", "--output", help="输出文件路径，不指定则输出到标准输出")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="完整脚本路径")
+    parser.add_argument("--benchmark", type=int, metavar="N",
+                        help="与完整脚本对比冷启动耗时，每个脚本执行 N 次（需要 node）")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        print(benchmark_bundle(args.functions, args.benchmark, args.source), end="")
+        return
+    bundle = build_bundle(args.functions, args.source, args.output)
+    if args.output:
+        print(f"已生成 {args.output}（{len(bundle.encode('utf-8'))} 字节）", file=sys.stderr)
+    else:
+        sys.stdout.write(bundle)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+WPS 智能表格区域读取的磁盘缓存
+区域数据按内容指纹保存在本地 SQLite 文件中，同一台机器上的多个进程（或重启后的进程）共享。
+读取时把缓存中的指纹发给脚本做条件读取，内容未变化时脚本只返回指纹，不再传输数据。
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+from python.wps_airscript_client import get_default_codec
+
+
+class DiskCache:
+    """
+    跨进程共享的区域数据缓存
+
+    每个条目为 键 -> (指纹, 压缩后的数据)。指纹由脚本计算（与 getRangeFingerprints 相同），
+    缓存本身不判断数据是否过期：只有指纹与脚本返回的一致时才使用缓存的数据。
+    总大小超过 max_bytes 时按最近访问时间淘汰。
+
+    Example:
+        >>> cache = DiskCache("~/.cache/wps/ranges.db")
+        >>> client = WPSAirScriptClient(file_id, token, script_id, disk_cache=cache)
+        >>> client.get_range_values("A1:F50000")  # 首次读取，写入缓存
+        >>> # 另一个进程使用同一缓存文件：内容未变化时只传输指纹
+        >>> WPSAirScriptClient(file_id, token, script_id, disk_cache="~/.cache/wps/ranges.db")
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, codec=None, timeout: float = 30):
+        """
+        打开（或创建）缓存文件
+
+        Args:
+            path: SQLite 数据库文件路径（支持 ~），多个进程使用同一路径即共享缓存
+            max_bytes: 缓存数据（压缩后）的总字节数上限，默认 256MB
+            codec: 序列化数据使用的编解码器，不指定则自动选择。共享缓存的进程需使用兼容的编解码器
+            timeout: 等待其他进程释放写锁的秒数，默认 30
+        """
+        self.path = os.path.expanduser(path)
+        self.max_bytes = max_bytes
+        self.codec = codec or get_default_codec()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        # 自动提交模式，写入时显式开启事务；WAL 模式下读取不会被其他进程的写入阻塞
+        self.conn = sqlite3.connect(self.path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, fingerprint TEXT, value BLOB, size INTEGER, accessed REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def fingerprint(self, key: str) -> Optional[str]:
+        """返回缓存中键对应的指纹，没有缓存时返回 None"""
+        with self._lock:
+            row = self.conn.execute("SELECT fingerprint FROM entries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def get(self, key: str, fingerprint: str) -> Any:
+        """
+        读取缓存的数据
+
+        Args:
+            key: 缓存键
+            fingerprint: 脚本返回的当前指纹
+
+        Returns:
+            指纹一致时返回缓存的数据，否则返回 None（缓存未命中或已过期）
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value FROM entries WHERE key = ? AND fingerprint = ?", (key, fingerprint)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self.conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+        return self.codec.loads(zlib.decompress(row[0]))
+
+    def put(self, key: str, fingerprint: str, value: Any) -> None:
+        """
+        写入缓存，总大小超过上限时淘汰最久未访问的条目
+
+        压缩后超过 max_bytes 的数据不缓存。
+        """
+        data = zlib.compress(self.codec.dumps(value), 1)
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            # BEGIN IMMEDIATE 立即获取写锁，多个进程同时写入时依次执行
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, fingerprint, value, size, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, fingerprint, data, len(data), time.time()),
+                )
+                total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+                if total > self.max_bytes:
+                    self._evict(total - self.max_bytes, key)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self._stats["stores"] += 1
+
+    def _evict(self, excess: int, keep: str) -> None:
+        """按最近访问时间从旧到新删除条目，直到释放 excess 字节（不删除刚写入的 keep）"""
+        rows = self.conn.execute(
+            "SELECT key, size FROM entries WHERE key != ? ORDER BY accessed", (keep,)
+        ).fetchall()
+        for key, size in rows:
+            if excess <= 0:
+                break
+            self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._stats["evictions"] += 1
+            excess -= size
+
+    def delete(self, key: str) -> None:
+        """删除一个条目"""
+        with self._lock:
+            self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        """清空缓存（所有共享该文件的进程都会受影响）"""
+        with self._lock:
+            self.conn.execute("DELETE FROM entries")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        获取缓存统计
+
+        Returns:
+            本实例的 hits、misses、stores、evictions，以及缓存文件中的 entries 和 bytes
+        """
+        with self._lock:
+            entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            return dict(self._stats, entries=entries, bytes=size)
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,656 @@
+"""
+WPS AirScript 本地模拟服务
+在内存中模拟 sync_task 接口和常用脚本函数，用于离线测试和性能基准
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from python.wps_airscript_client import (
+    CHANGE_LOG_SHEET, column_letter_to_number, decompress_bytes, format_address, get_default_codec, parse_address,
+)
+
+JAVASCRIPT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "javascript")
+NODE_RUNNER = os.path.join(JAVASCRIPT_DIR, "local-server.js")
+
+_NUMBER_TEXT = re.compile(r"^\s*[-+]?(\d{1,3}(,\d{3})+|\d+)?(\.\d+)?([eE][-+]?\d+)?\s*$")
+
+
+def _to_number(text: str) -> Any:
+    if not _NUMBER_TEXT.match(text) or not re.search(r"\d", text):
+        return text
+    number = float(text.replace(",", ""))
+    return int(number) if number.is_integer() and abs(number) < 2 ** 53 else number
+
+
+# normalizeRange 的清理操作（与 JS 端一致，只作用于文本）
+_NORMALIZERS = {
+    "trim": str.strip,
+    "collapse_whitespace": lambda text: re.sub(r"\s+", " ", text),
+    "remove_nonprinting": lambda text: re.sub("[\x00-\x08\x0b\x0c\x0e-\x1f\x7f\u200b-\u200d\ufeff]", "", text),
+    "empty_to_null": lambda text: "" if not text.strip() else text,
+    "to_number": _to_number,
+    "lower": str.lower,
+    "upper": str.upper,
+}
+
+
+class LocalResponse:
+    """模拟的 HTTP 响应，提供客户端用到的 requests.Response 接口"""
+
+    def __init__(self, content: bytes, status_code: int = 200):
+        self.content = content
+        self.status_code = status_code
+        self.headers = {"Content-Length": str(len(content))}
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}: {self.text}")
+
+
+class LocalAirScriptServer:
+    """
+    AirScript 本地模拟服务
+
+    作为 WPSAirScriptClient 的 session 使用，按与 wps-airsheet-api.js 相同的
+    请求/响应格式处理调用。工作表数据保存在内存中，只实现了常用的数据读写函数，
+    未实现的函数返回 "未知函数"。
+
+    同时模拟任务模式：POST 到 .../task 提交后立即返回 task_id，脚本在后台线程中运行
+    （耗时 latency + job_duration 秒），GET 状态接口在完成前返回 status="running"。
+
+    Example:
+        >>> server = LocalAirScriptServer(sheets=["Sheet1"], latency=0.05)
+        >>> client = WPSAirScriptClient("file", "token", "script", session=server)
+        >>> client.set_range_values("A1:B1", [["Name", "Age"]])
+        >>> server.sheet_values("Sheet1")
+        [['Name', 'Age']]
+    """
+
+    def __init__(self, sheets: List[str] = None, latency: float = 0.0, codec=None, job_duration: float = 0.0,
+                 serialize_scripts: bool = False):
+        """
+        初始化模拟服务
+
+        Args:
+            sheets: 初始工作表名称列表，默认 ["Sheet1"]，第一个为活动工作表
+            latency: 每次请求额外等待的秒数，用于模拟网络往返
+            codec: JSON 编解码器，不指定则自动选择
+            job_duration: 任务模式下脚本额外运行的秒数，用于模拟长时间运行的任务
+            serialize_scripts: 是否模拟同一 script_id 的同步调用串行执行（包括 latency 等待）
+        """
+        self.latency = latency
+        self.codec = codec or get_default_codec()
+        # 工作表名 -> {(行, 列): 值}
+        self.workbook: Dict[str, Dict[tuple, Any]] = {name: {} for name in (sheets or ["Sheet1"])}
+        self.requests = 0
+        self.calls: Dict[str, int] = {}
+        self.job_duration = job_duration
+        self.polls = 0
+        # task_id -> {"status", "result"}
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        # 工作表名 -> {"version", "rows": [[指纹, 最后修改版本, 出现版本], ...]}，对应 JS 端的隐藏工作表
+        # （首次调用 getChangesSince 时同样会在工作簿中创建 CHANGE_LOG_SHEET）
+        self.change_logs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.serialize_scripts = serialize_scripts
+        # 脚本路径 -> 串行执行锁
+        self._script_locks: Dict[str, threading.Lock] = {}
+        self._handlers: Dict[str, Callable] = {
+            "getCellValue": self._get_cell_value,
+            "setCellValue": self._set_cell_value,
+            "getRangeValues": self._get_range_values,
+            "setRangeValues": self._set_range_values,
+            "getRangeSnapshot": self._get_range_snapshot,
+            "compareAndSet": self._compare_and_set,
+            "getRangeIfChanged": self._get_range_if_changed,
+            "getChangesSince": self._get_changes_since,
+            "setRangeValuesBatch": self._set_range_values_batch,
+            "runBatch": self._run_batch,
+            "copyBlock": self._copy_block,
+            "sortRangeByKeys": self._sort_range_by_keys,
+            "dedupeRows": self._dedupe_rows,
+            "normalizeRange": self._normalize_range,
+            "clearRange": self._clear_range,
+            "clearRangeContents": self._clear_range,
+            "getUsedRangeData": self._get_used_range_data,
+            "getUsedRangeInfo": self._get_used_range_info,
+            "appendRows": self._append_rows,
+            "getWorkbookName": self._get_workbook_name,
+            "describeWorkbook": self._describe_workbook,
+            "getWorksheetCount": self._get_worksheet_count,
+            "worksheetExists": self._worksheet_exists,
+            "addWorksheet": self._add_worksheet,
+            "deleteWorksheet": self._delete_worksheet,
+        }
+
+    # ==================== HTTP 接口 ====================
+
+    def post(self, url: str, headers: Dict[str, str] = None, data: bytes = None, timeout: float = None,
+             **kwargs) -> LocalResponse:
+        """处理 sync_task 请求和任务提交请求"""
+        encoding = (headers or {}).get("Content-Encoding")
+        if encoding:
+            data = decompress_bytes(data, encoding)
+        context = self.codec.loads(data)["Context"]
+        if not url.rstrip("/").endswith("/sync_task"):
+            return self._submit_job(context)
+        if self.serialize_scripts:
+            with self._lock:
+                script_lock = self._script_locks.setdefault(url.rsplit("/", 1)[0], threading.Lock())
+            with script_lock:
+                return self._run_sync(context)
+        return self._run_sync(context)
+
+    def _run_sync(self, context: Dict[str, Any]) -> LocalResponse:
+        if self.latency:
+            time.sleep(self.latency)
+        result = self.execute(context.get("argv", {}), context.get("active_sheet"))
+        return self._envelope(result)
+
+    def get(self, url: str, headers: Dict[str, str] = None, params: Dict[str, Any] = None,
+            timeout: float = None, **kwargs) -> LocalResponse:
+        """处理任务状态查询"""
+        task_id = (params or {}).get("task_id")
+        with self._lock:
+            self.polls += 1
+            job = self.jobs.get(task_id)
+        if job is None:
+            return LocalResponse(self.codec.dumps({"data": {}, "error": f"任务不存在: {task_id}"}), 404)
+        if job["status"] == "running":
+            return LocalResponse(self.codec.dumps({"data": {"task_id": task_id, "status": "running"}, "error": ""}))
+        return self._envelope(job["result"], task_id=task_id, status="finished")
+
+    def _submit_job(self, context: Dict[str, Any]) -> LocalResponse:
+        """提交任务：在后台线程中运行脚本，立即返回 task_id"""
+        task_id = uuid.uuid4().hex
+        job = {"status": "running", "result": None}
+        with self._lock:
+            self.jobs[task_id] = job
+
+        def run():
+            time.sleep(self.latency + self.job_duration)
+            job["result"] = self.execute(context.get("argv", {}), context.get("active_sheet"))
+            job["status"] = "finished"
+
+        threading.Thread(target=run, name=f"local-job-{task_id[:8]}", daemon=True).start()
+        return LocalResponse(self.codec.dumps({"data": {"task_id": task_id}, "error": ""}))
+
+    def _envelope(self, result: List[Dict], **data) -> LocalResponse:
+        """按 AirScript 格式包装结果：data.result 为 JSON 字符串"""
+        body = {"data": dict(data, result=self.codec.dumps(result).decode("utf-8")), "error": ""}
+        return LocalResponse(self.codec.dumps(body))
+
+    def execute(self, argv: Dict[str, Any], sheet_name: Optional[str]) -> List[Dict]:
+        """执行一次脚本调用，返回与 executeFunction 相同的结果数组"""
+        function_name = argv.get("function")
+        with self._lock:
+            self.requests += 1
+            self.calls[function_name] = self.calls.get(function_name, 0) + 1
+            handler = self._handlers.get(function_name)
+            if handler is None:
+                return [{"success": False, "message": f"未知函数: {function_name}"}]
+            try:
+                return [handler(argv, sheet_name)]
+            except Exception as e:
+                return [{"success": False, "error": str(e)}]
+
+    # ==================== 工作表 ====================
+
+    def _sheet(self, sheet_name: Optional[str]) -> Dict[tuple, Any]:
+        """按名称获取工作表（精确匹配优先，其次包含匹配），不指定则为第一个工作表"""
+        if not sheet_name:
+            return next(iter(self.workbook.values()))
+        if sheet_name in self.workbook:
+            return self.workbook[sheet_name]
+        for name, cells in self.workbook.items():
+            if name != CHANGE_LOG_SHEET and sheet_name in name:
+                return cells
+        raise ValueError(f"未找到工作表: {sheet_name}")
+
+    def _user_sheets(self) -> List[str]:
+        """用户工作表名称（不含内部工作表），按工作簿中的顺序"""
+        return [name for name in self.workbook if name != CHANGE_LOG_SHEET]
+
+    @staticmethod
+    def _used_bounds(cells: Dict[tuple, Any]) -> Optional[tuple]:
+        """已使用区域的 (起始行, 起始列, 结束行, 结束列)，空工作表返回 None"""
+        if not cells:
+            return None
+        rows = [r for r, _ in cells]
+        cols = [c for _, c in cells]
+        return min(rows), min(cols), max(rows), max(cols)
+
+    @staticmethod
+    def _read(cells: Dict[tuple, Any], row1: int, col1: int, row2: int, col2: int) -> Any:
+        """读取区域，单个单元格返回标量（与 Range.Value 一致）"""
+        if row1 == row2 and col1 == col2:
+            return cells.get((row1, col1), "")
+        return [[cells.get((r, c), "") for c in range(col1, col2 + 1)] for r in range(row1, row2 + 1)]
+
+    @staticmethod
+    def _write(cells: Dict[tuple, Any], row1: int, col1: int, values: Any) -> None:
+        """从 (row1, col1) 开始写入二维数组或单个值，空字符串和 None 视为清除"""
+        if not isinstance(values, list):
+            values = [[values]]
+        for i, row in enumerate(values):
+            for j, value in enumerate(row):
+                if value is None or value == "":
+                    cells.pop((row1 + i, col1 + j), None)
+                else:
+                    cells[(row1 + i, col1 + j)] = value
+
+    def _fingerprint(self, values: Any) -> str:
+        """内容指纹：只在模拟服务内部可比较，与 JS 端的 cyrb53 指纹不通用"""
+        return hashlib.sha1(self.codec.dumps(values)).hexdigest()[:14]
+
+    def sheet_values(self, sheet_name: str = None) -> List[List]:
+        """获取工作表已使用区域的数据（测试断言用）"""
+        cells = self._sheet(sheet_name)
+        bounds = self._used_bounds(cells)
+        if bounds is None:
+            return []
+        row1, col1, row2, col2 = bounds
+        return [[cells.get((r, c), "") for c in range(col1, col2 + 1)] for r in range(row1, row2 + 1)]
+
+    # ==================== 脚本函数 ====================
+
+    def _get_cell_value(self, argv, sheet_name):
+        row, col, _, _ = parse_address(argv["address"])
+        return {"success": True, "value": self._sheet(sheet_name).get((row, col), "")}
+
+    def _set_cell_value(self, argv, sheet_name):
+        row, col, _, _ = parse_address(argv["address"])
+        self._write(self._sheet(sheet_name), row, col, argv["value"])
+        return {"success": True, "message": "设置成功"}
+
+    def _get_range_values(self, argv, sheet_name):
+        return {"success": True, "values": self._read(self._sheet(sheet_name), *parse_address(argv["address"]))}
+
+    def _set_range_values(self, argv, sheet_name):
+        row, col, _, _ = parse_address(argv["address"])
+        self._write(self._sheet(sheet_name), row, col, argv["values"])
+        return {"success": True, "message": "设置成功"}
+
+    def _get_range_snapshot(self, argv, sheet_name):
+        row1, col1, row2, col2 = parse_address(argv["address"])
+        cells = self._sheet(sheet_name)
+        values = [[cells.get((r, c), "") for c in range(col1, col2 + 1)] for r in range(row1, row2 + 1)]
+        return {"success": True, "values": values, "fingerprint": self._fingerprint(values)}
+
+    def _compare_and_set(self, argv, sheet_name):
+        snapshot = self._get_range_snapshot(argv, sheet_name)
+        if snapshot["fingerprint"] != argv["expectedFingerprint"]:
+            return dict(snapshot, applied=False)
+        row, col, _, _ = parse_address(argv["address"])
+        self._write(self._sheet(sheet_name), row, col, argv["values"])
+        return {"success": True, "applied": True,
+                "fingerprint": self._get_range_snapshot(argv, sheet_name)["fingerprint"]}
+
+    def _get_range_if_changed(self, argv, sheet_name):
+        if argv.get("address"):
+            values = self._get_range_values(argv, sheet_name)["values"]
+        else:
+            values = self._get_used_range_data(argv, sheet_name)["data"]
+        fingerprint = self._fingerprint(values)
+        if argv.get("fingerprint") == fingerprint:
+            return {"success": True, "notModified": True, "fingerprint": fingerprint}
+        return {"success": True, "notModified": False, "fingerprint": fingerprint, "values": values}
+
+    def _set_range_values_batch(self, argv, sheet_name):
+        for item in argv["items"]:
+            row, col, _, _ = parse_address(item["address"])
+            self._write(self._sheet(item.get("sheet") or sheet_name), row, col, item["values"])
+        return {"success": True, "count": len(argv["items"]), "timings": self._timings(argv.get("bulkMode"))}
+
+    def _run_batch(self, argv, sheet_name):
+        results = []
+        for op in argv["operations"]:
+            if op.get("function") == "runBatch":
+                results.append({"success": False, "message": "不支持嵌套批量执行"})
+                continue
+            # 批量中的函数也计入 calls，便于按 calls 生成精简包
+            self.calls[op.get("function")] = self.calls.get(op.get("function"), 0) + 1
+            handler = self._handlers.get(op.get("function"))
+            if handler is None:
+                result = {"success": False, "message": f"未知函数: {op.get('function')}"}
+            else:
+                try:
+                    result = handler(op, op.get("sheet") or sheet_name)
+                except Exception as e:
+                    result = {"success": False, "error": str(e)}
+            result["elapsedMs"] = 0
+            results.append(result)
+        return {"success": True, "results": results, "timings": self._timings(argv.get("bulkMode"))}
+
+    @staticmethod
+    def _timings(bulk_mode) -> Dict[str, Any]:
+        """批量执行的耗时信息（模拟服务不计算公式，耗时均为 0）"""
+        return {"runMs": 0, "recalcMs": 0, "totalMs": 0, "bulkMode": bool(bulk_mode), "settings": []}
+
+    def _copy_block(self, argv, sheet_name):
+        # 模拟服务不保存格式："all" 与 "values" 都复制值，"formats" 不改变内容
+        row1, col1, row2, col2 = parse_address(argv["sourceAddress"])
+        source = self._sheet(argv.get("sourceSheet") or sheet_name)
+        values = [[source.get((r, c), "") for c in range(col1, col2 + 1)] for r in range(row1, row2 + 1)]
+        row, col, _, _ = parse_address(argv["targetCell"])
+        if argv.get("mode", "all") != "formats":
+            self._write(self._sheet(argv.get("targetSheet") or sheet_name), row, col, values)
+        rows, cols = row2 - row1 + 1, col2 - col1 + 1
+        address = re.sub(r'([A-Z]+)(\d+)', r'$\1$\2', format_address(row, col, row + rows - 1, col + cols - 1))
+        return {"success": True, "address": address, "rows": rows, "columns": cols}
+
+    def _sort_range_by_keys(self, argv, sheet_name):
+        # 模拟服务不保存格式，总是按 JS 端的内存排序规则排序
+        row1, col1, row2, col2 = parse_address(argv["address"])
+        keys = [{"column": self._key_column(spec["column"], col1, col2),
+                 "order": 2 if spec.get("order") in (2, "desc") else 1} for spec in argv["keys"]]
+        options = argv.get("options") or {}
+        if options.get("method") == "native" and len(keys) > 3:
+            raise ValueError("原生排序最多支持 3 个键")
+
+        cells = self._sheet(sheet_name)
+        values = [[cells.get((r, c), "") for c in range(col1, col2 + 1)] for r in range(row1, row2 + 1)]
+        header = self._detect_header(values, [key["column"] for key in keys], options.get("header", "auto"))
+        start = 1 if header else 0
+
+        def rank(value):
+            # 数字 < 文本（不区分大小写）< 逻辑值
+            if isinstance(value, bool):
+                return 2, value
+            if isinstance(value, (int, float)):
+                return 0, value
+            return 1, str(value).lower()
+
+        rows = values[start:]
+        # 稳定排序：从最后一个键开始依次排序；空单元格不论升降序都排在最后
+        for key in reversed(keys):
+            index = key["column"] - 1
+            filled = [row for row in rows if row[index] != ""]
+            empty = [row for row in rows if row[index] == ""]
+            filled.sort(key=lambda row: rank(row[index]), reverse=key["order"] == 2)
+            rows = filled + empty
+        self._write(cells, row1 + start, col1, rows)
+        return {"success": True, "method": "memory", "header": bool(header), "rows": len(rows), "keys": keys}
+
+    @staticmethod
+    def _key_column(column, col1: int, col2: int) -> int:
+        """区域内的列序号、列字母或单元格地址 -> 区域内的列序号"""
+        original = column
+        if isinstance(column, str):
+            column = column_letter_to_number(re.match(r"\$?([A-Za-z]+)", column).group(1).upper()) - col1 + 1
+        if not 1 <= column <= col2 - col1 + 1:
+            raise ValueError(f"排序键不在区域内: {original}")
+        return column
+
+    @staticmethod
+    def _detect_header(values: List[List], columns: List[int], header) -> bool:
+        """header 为 "auto" 时：第一行全为非空文本，且某个键列的数据行中有非文本值"""
+        if header not in (None, "auto"):
+            return bool(header)
+        return (len(values) > 1 and all(isinstance(v, str) and v != "" for v in values[0])
+                and any(v != "" and not isinstance(v, str)
+                        for column in columns for v in (row[column - 1] for row in values[1:])))
+
+    def _dedupe_rows(self, argv, sheet_name):
+        row1, col1, row2, col2 = parse_address(argv["address"])
+        columns = [self._key_column(column, col1, col2) for column in argv.get("keyColumns") or []]
+        columns = columns or list(range(1, col2 - col1 + 2))
+        options = argv.get("options") or {}
+        cells = self._sheet(sheet_name)
+        values = [[cells.get((r, c), "") for c in range(col1, col2 + 1)] for r in range(row1, row2 + 1)]
+        header = self._detect_header(values, columns, options.get("header", "auto"))
+        start = 1 if header else 0
+
+        def key_of(row):
+            key = []
+            for column in columns:
+                value = row[column - 1]
+                if isinstance(value, str):
+                    value = value.strip() if options.get("trim") else value
+                    value = value.lower() if options.get("ignoreCase") else value
+                key.append(value)
+            return self.codec.dumps(key)
+
+        rows = values[start:]
+        keep = {}
+        for i, row in enumerate(rows):
+            if options.get("keep") == "last" or key_of(row) not in keep:
+                keep[key_of(row)] = i
+        kept = [row for i, row in enumerate(rows) if keep[key_of(row)] == i]
+        removed = len(rows) - len(kept)
+        if removed:
+            blank = [""] * (col2 - col1 + 1)
+            self._write(cells, row1 + start, col1, kept + [blank] * removed)
+        return {"success": True, "header": header, "rows": len(rows), "rowsKept": len(kept), "rowsRemoved": removed}
+
+    def _normalize_range(self, argv, sheet_name):
+        unknown = [op for op in argv["ops"] if op not in _NORMALIZERS]
+        if unknown:
+            raise ValueError(f"不支持的清理操作: {unknown[0]}")
+        row1, col1, row2, col2 = parse_address(argv["address"])
+        cells = self._sheet(sheet_name)
+        output, changed = [], 0
+        for r in range(row1, row2 + 1):
+            row = []
+            for c in range(col1, col2 + 1):
+                value = result = cells.get((r, c), "")
+                for op in argv["ops"]:
+                    result = _NORMALIZERS[op](result) if isinstance(result, str) else result
+                changed += result != value
+                row.append(result)
+            output.append(row)
+        if changed:
+            self._write(cells, row1, col1, output)
+        return {"success": True, "cells": len(output) * (col2 - col1 + 1), "cellsChanged": changed}
+
+    def _clear_range(self, argv, sheet_name):
+        cells = self._sheet(sheet_name)
+        row1, col1, row2, col2 = parse_address(argv["address"])
+        for key in [k for k in cells if row1 <= k[0] <= row2 and col1 <= k[1] <= col2]:
+            del cells[key]
+        return {"success": True, "message": "清除成功"}
+
+    def _get_used_range_data(self, argv, sheet_name):
+        cells = self._sheet(sheet_name)
+        bounds = self._used_bounds(cells) or (1, 1, 1, 1)
+        return {"success": True, "data": self._read(cells, *bounds)}
+
+    def _get_used_range_info(self, argv, sheet_name):
+        bounds = self._used_bounds(self._sheet(sheet_name))
+        if bounds is None:
+            return {"success": True, "address": "$A$1", "startRow": 1, "startColumn": 1, "rows": 0, "columns": 0}
+        row1, col1, row2, col2 = bounds
+        address = re.sub(r'([A-Z]+)(\d+)', r'$\1$\2', format_address(row1, col1, row2, col2))
+        return {"success": True, "address": address, "startRow": row1, "startColumn": col1,
+                "rows": row2 - row1 + 1, "columns": col2 - col1 + 1}
+
+    def _append_rows(self, argv, sheet_name):
+        cells = self._sheet(sheet_name)
+        rows = argv["rows"]
+        bounds = self._used_bounds(cells)
+        column = argv.get("column")
+        if bounds is None:
+            last_row, start_col = 0, 1
+        elif column:
+            col = parse_address(f"{column}1")[1]
+            last_row = max([r for r, c in cells if c == col], default=0)
+            start_col = bounds[1]
+        else:
+            last_row, start_col = bounds[2], bounds[1]
+        width = max(len(row) for row in rows)
+        self._write(cells, last_row + 1, start_col, rows)
+        end_row = last_row + len(rows)
+        return {"success": True, "startRow": last_row + 1, "rowsWritten": len(rows),
+                "range": format_address(last_row + 1, start_col, end_row, start_col + width - 1)}
+
+    def _get_changes_since(self, argv, sheet_name):
+        cells = self._sheet(sheet_name)
+        name = next(n for n, c in self.workbook.items() if c is cells)
+        self.workbook.setdefault(CHANGE_LOG_SHEET, {})
+        log = self.change_logs.setdefault(name, {"version": 0, "rows": []})
+        bounds = self._used_bounds(cells)
+        last_row = bounds[2] if bounds else 0
+        col1, col2 = (bounds[1], bounds[3]) if bounds else (1, 1)
+        total = max(len(log["rows"]), last_row)
+        values = [[cells.get((r, c), "") for c in range(col1, col2 + 1)] if r <= last_row else None
+                  for r in range(1, total + 1)]
+        entries = [list(entry) for entry in log["rows"]] + [["", 0, 0]] * (total - len(log["rows"]))
+        changed = []
+        for r, row in enumerate(values):
+            blank = row is None or all(v == "" for v in row)
+            fingerprint = "" if blank else self._fingerprint(row)
+            if entries[r][0] != fingerprint:
+                changed.append(r)
+                entries[r] = [fingerprint, None, None if entries[r][0] == "" else entries[r][2]]
+        if changed:
+            log["version"] += 1
+            for r in changed:
+                entries[r][1] = log["version"]
+                if entries[r][2] is None:
+                    entries[r][2] = log["version"]
+            log["rows"] = entries
+
+        version = log["version"]
+        since = argv.get("cursor") or 0
+        reset = since > version
+        since = 0 if reset else since
+        result = {"success": True, "cursor": version, "reset": reset, "inserted": [], "updated": [], "deleted": []}
+        for r, (fingerprint, modified, created) in enumerate(entries):
+            if modified <= since:
+                continue
+            if fingerprint == "":
+                if created <= since:
+                    result["deleted"].append(r + 1)
+            else:
+                result["inserted" if created > since else "updated"].append({"row": r + 1, "values": values[r]})
+        return result
+
+    def _get_workbook_name(self, argv, sheet_name):
+        return {"success": True, "sheets": self._user_sheets()}
+
+    def _describe_workbook(self, argv, sheet_name):
+        sheets = []
+        for index, name in enumerate(self._user_sheets(), 1):
+            info = self._get_used_range_info({}, name)
+            info.pop("success")
+            info.update(name=name, index=index,
+                        fingerprint=self._fingerprint(self.sheet_values(name)))
+            sheets.append(info)
+        return {"success": True, "count": len(sheets), "sheets": sheets}
+
+    def _get_worksheet_count(self, argv, sheet_name):
+        return {"success": True, "count": len(self._user_sheets())}
+
+    def _worksheet_exists(self, argv, sheet_name):
+        name = argv.get("sheetName")
+        return {"success": True, "exists": name in self.workbook or any(name in n for n in self._user_sheets())}
+
+    def _add_worksheet(self, argv, sheet_name):
+        name = argv.get("sheetName") or f"Sheet{len(self.workbook) + 1}"
+        self.workbook.setdefault(name, {})
+        return {"success": True, "message": "添加工作表成功", "sheetName": name}
+
+    def _delete_worksheet(self, argv, sheet_name):
+        identifier = argv["sheetIdentifier"]
+        if isinstance(identifier, int):
+            identifier = self._user_sheets()[identifier - 1]
+        self.workbook.pop(identifier)
+        return {"success": True, "message": "删除工作表成功"}
+
+
+class NodeAirScriptServer(LocalAirScriptServer):
+    """
+    在 node 中运行 wps-airsheet-api.js 的本地服务
+
+    接口与 LocalAirScriptServer 相同（可作为 session，支持任务模式），但每次调用都由
+    javascript/local-server.js 在内存模拟的工作簿（javascript/airscript-mock.js）上执行实际部署的脚本。
+    LocalAirScriptServer 是各函数的 Python 独立实现，测试脚本本身的行为（如公式随排序移动）需使用本类。
+
+    Example:
+        >>> with NodeAirScriptServer(sheets=["Sheet1"]) as server:
+        ...     client = WPSAirScriptClient("file", "token", "script", session=server)
+        ...     client.fill_formula("C2:C10", "=RC[-2]*RC[-1]", "Sheet1")
+    """
+
+    def __init__(self, sheets: List[str] = None, script_path: str = None, node: str = "node",
+                 latency: float = 0.0, codec=None, job_duration: float = 0.0, serialize_scripts: bool = False):
+        """
+        启动 node 进程
+
+        Args:
+            sheets: 初始工作表名称列表，默认 ["Sheet1"]，第一个为活动工作表
+            script_path: 脚本路径，默认为 javascript/wps-airsheet-api.js（也可以是 wps_bundle 生成的精简包）
+            node: node 可执行文件
+            latency / codec / job_duration / serialize_scripts: 见 LocalAirScriptServer
+
+        Raises:
+            RuntimeError: 未找到 node
+        """
+        super().__init__(sheets, latency, codec, job_duration, serialize_scripts)
+        if shutil.which(node) is None:
+            raise RuntimeError("NodeAirScriptServer 需要 node: https://nodejs.org/")
+        script_path = script_path or os.path.join(JAVASCRIPT_DIR, "wps-airsheet-api.js")
+        self.process = subprocess.Popen(
+            [node, NODE_RUNNER, script_path] + list(sheets or ["Sheet1"]),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def execute(self, argv: Dict[str, Any], sheet_name: Optional[str]) -> List[Dict]:
+        """在 node 中执行一次脚本调用，返回脚本的结果数组"""
+        function_name = argv.get("function")
+        with self._lock:
+            self.requests += 1
+            self.calls[function_name] = self.calls.get(function_name, 0) + 1
+            if function_name == "runBatch":
+                for op in argv.get("operations") or []:
+                    self.calls[op.get("function")] = self.calls.get(op.get("function"), 0) + 1
+            return self._send(argv, sheet_name)
+
+    def _send(self, argv: Dict[str, Any], sheet_name: Optional[str]) -> List[Dict]:
+        """发送一行请求并读取一行结果（调用方持有 self._lock）"""
+        context = {"argv": argv}
+        if sheet_name:
+            context["active_sheet"] = sheet_name
+        self.process.stdin.write(self.codec.dumps(context) + b"\n")
+        self.process.stdin.flush()
+        line = self.process.stdout.readline()
+        if not line:
+            raise RuntimeError("node 进程已退出")
+        return self.codec.loads(line)
+
+    def sheet_values(self, sheet_name: str = None) -> List[List]:
+        """获取工作表已使用区域的数据（测试断言用，不计入 requests 和 calls）"""
+        with self._lock:
+            result = self._send({"function": "getUsedRangeData"}, sheet_name)[0]
+        data = result.get("data")
+        if not isinstance(data, list):
+            return [] if data in ("", None) else [[data]]
+        return data
+
+    def close(self) -> None:
+        """结束 node 进程"""
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait(timeout=10)
+        self.process.stdout.close()
+
+    def __enter__(self) -> "NodeAirScriptServer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
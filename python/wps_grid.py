@@ -0,0 +1,397 @@
+"""
+WPS 智能表格紧凑区域数据
+按列存储区域读取结果：数值列使用 array，文本列使用共享的字符串表，空单元格使用位图
+"""
+
+from array import array
+from collections.abc import Sequence
+from typing import Any, Iterator, List, Optional
+
+try:
+    import numpy
+except ImportError:  # numpy 为可选依赖，只用于 to_numpy()
+    numpy = None
+
+
+# 列存储类型
+INT = "int"
+FLOAT = "float"
+STR = "str"
+OBJECT = "object"
+
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+
+
+def _to_matrix(values: Any) -> List[List]:
+    """将区域读取结果统一转换为二维数组（单个单元格返回的是标量）"""
+    if not isinstance(values, list):
+        return [[values]]
+    if values and not isinstance(values[0], list):
+        return [values]
+    return values
+
+
+def _value_kind(value: Any) -> str:
+    """单个非空值的存储类型"""
+    if isinstance(value, bool):
+        return OBJECT
+    if isinstance(value, int):
+        return INT if _INT64_MIN <= value <= _INT64_MAX else OBJECT
+    if isinstance(value, float):
+        return FLOAT
+    if isinstance(value, str):
+        return STR
+    return OBJECT
+
+
+def _column_kind(column: List[Any], empty: Any) -> str:
+    """
+    根据列中的非空值确定主存储类型：数值（整数与浮点数混合时为 float）与文本中较多的一种，
+    不属于主类型的值（如数值列的标题）不超过非空值的 1/4 时作为例外单独保存，否则为 object
+    """
+    counts = {INT: 0, FLOAT: 0, STR: 0, OBJECT: 0}
+    for value in column:
+        if value is not None and value != empty:
+            counts[_value_kind(value)] += 1
+    numbers = counts[INT] + counts[FLOAT]
+    total = numbers + counts[STR] + counts[OBJECT]
+    if total == 0:
+        return STR
+    if numbers >= counts[STR]:
+        kind, main = (FLOAT if counts[FLOAT] else INT), numbers
+    else:
+        kind, main = STR, counts[STR]
+    return kind if (total - main) * 4 <= total else OBJECT
+
+
+def _fits(kind: str, value: Any) -> bool:
+    """值能否保存在该类型的列存储中"""
+    value_kind = _value_kind(value)
+    return value_kind == kind or (kind == FLOAT and value_kind == INT)
+
+
+class Grid(Sequence):
+    """
+    紧凑的二维区域数据
+
+    与 get_range_values 返回的二维列表用法相同（len、下标、切片、迭代、与列表比较），
+    但按列存储，内存占用远小于嵌套列表：
+
+    - 整数列：array("q")，浮点数列（或整数与浮点数混合）：array("d")
+    - 文本列：array("I") 保存字符串表下标，相同文本在整个 Grid 中只保存一份
+    - 空单元格：每列一个位图，读取时返回 empty（默认 ""）
+    - 少量不属于列主类型的值（如数值列的标题行）：按行号单独保存
+    - 类型混合较多的列（或布尔值列）：普通列表
+
+    grid[i] 和 grid.column(j) 返回不复制数据的行/列视图。
+    整数与浮点数混合的列中，整数读取时为浮点数（3 读取为 3.0）。
+
+    Example:
+        >>> rows = [["Name", "Age"], ["张三", 25], ["李四", ""], ["王五", 31], ["赵六", 28]]
+        >>> grid = Grid.from_rows(rows)
+        >>> grid[1][1], grid[2][1], len(grid)
+        (25, '', 5)
+        >>> grid.column(0).kind, grid.column(1).kind
+        ('str', 'int')
+        >>> grid == rows
+        True
+    """
+
+    __slots__ = ("_rows", "_columns", "_kinds", "_data", "_empty_bits", "_extras", "_strings", "_empty")
+
+    def __init__(self, n_rows: int, kinds: List[str], data: List[Any], empty_bits: List[bytearray],
+                 strings: List[str], empty: Any = "", extras: List[Optional[dict]] = None):
+        """
+        直接由列存储构造，通常使用 Grid.from_rows
+
+        Args:
+            n_rows: 行数
+            kinds: 每列的存储类型
+            data: 每列的数据（array 或 list）
+            empty_bits: 每列的空单元格位图
+            strings: 字符串表
+            empty: 空单元格的值
+            extras: 每列不属于主类型的值 {行下标: 值}，没有时为 None
+        """
+        self._rows = n_rows
+        self._columns = len(kinds)
+        self._kinds = kinds
+        self._data = data
+        self._empty_bits = empty_bits
+        self._extras = extras or [None] * len(kinds)
+        self._strings = strings
+        self._empty = empty
+
+    @classmethod
+    def from_rows(cls, values: Any, empty: Any = "") -> "Grid":
+        """
+        由区域读取结果（二维数组、一维数组或单个值）构造 Grid
+
+        Args:
+            values: 区域数据，行长度不一致时按最长行补齐空单元格
+            empty: 表示空单元格的值，默认 ""（与 AirScript 返回一致），None 也视为空
+
+        Returns:
+            Grid 实例
+        """
+        rows = _to_matrix(values)
+        n_rows = len(rows)
+        n_columns = max((len(row) for row in rows), default=0)
+        string_index = {}
+        strings: List[str] = []
+        kinds, data, empty_bits, extras = [], [], [], []
+
+        for j in range(n_columns):
+            column = [row[j] if j < len(row) else empty for row in rows]
+            kind = _column_kind(column, empty)
+            bits = bytearray((n_rows + 7) // 8)
+            column_extras = {}
+            if kind == OBJECT:
+                store = column
+            else:
+                store = array({INT: "q", FLOAT: "d", STR: "I"}[kind], [0]) * n_rows
+            for i, value in enumerate(column):
+                if value is None or value == empty:
+                    bits[i >> 3] |= 1 << (i & 7)
+                    if kind == OBJECT:
+                        store[i] = empty
+                elif kind == OBJECT:
+                    continue
+                elif not _fits(kind, value):
+                    column_extras[i] = value
+                elif kind == STR:
+                    index = string_index.get(value)
+                    if index is None:
+                        index = string_index[value] = len(strings)
+                        strings.append(value)
+                    store[i] = index
+                else:
+                    store[i] = value
+            kinds.append(kind)
+            data.append(store)
+            empty_bits.append(bits)
+            extras.append(column_extras or None)
+
+        return cls(n_rows, kinds, data, empty_bits, strings, empty, extras)
+
+    # ==================== 读取 ====================
+
+    @property
+    def shape(self) -> tuple:
+        """(行数, 列数)"""
+        return self._rows, self._columns
+
+    @property
+    def kinds(self) -> List[str]:
+        """每列的存储类型：int、float、str 或 object"""
+        return list(self._kinds)
+
+    def cell(self, row: int, column: int) -> Any:
+        """获取单元格值（下标从 0 开始）"""
+        if row < 0:
+            row += self._rows
+        if column < 0:
+            column += self._columns
+        if not (0 <= row < self._rows and 0 <= column < self._columns):
+            raise IndexError("Grid 下标越界")
+        return self._cell(row, column)
+
+    def _cell(self, row: int, column: int) -> Any:
+        if self._empty_bits[column][row >> 3] & (1 << (row & 7)):
+            return self._empty
+        column_extras = self._extras[column]
+        if column_extras is not None and row in column_extras:
+            return column_extras[row]
+        value = self._data[column][row]
+        if self._kinds[column] == STR:
+            return self._strings[value]
+        return value
+
+    def is_empty(self, row: int, column: int) -> bool:
+        """单元格是否为空"""
+        return bool(self._empty_bits[column][row >> 3] & (1 << (row & 7)))
+
+    def row(self, index: int) -> "RowView":
+        """获取行视图（不复制数据）"""
+        if index < 0:
+            index += self._rows
+        if not 0 <= index < self._rows:
+            raise IndexError("Grid 行下标越界")
+        return RowView(self, index)
+
+    def column(self, index: int) -> "ColumnView":
+        """获取列视图（不复制数据）"""
+        if index < 0:
+            index += self._columns
+        if not 0 <= index < self._columns:
+            raise IndexError("Grid 列下标越界")
+        return ColumnView(self, index)
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            return self.cell(*index)
+        if isinstance(index, slice):
+            return [RowView(self, i) for i in range(*index.indices(self._rows))]
+        return self.row(index)
+
+    def __iter__(self) -> Iterator["RowView"]:
+        for i in range(self._rows):
+            yield RowView(self, i)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(other) == self._rows and all(row == other_row for row, other_row in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Grid({self._rows}x{self._columns}, kinds={self._kinds})"
+
+    def tolist(self) -> List[List]:
+        """转换为二维列表（与 get_range_values 的普通返回值相同）"""
+        return [row.tolist() for row in self]
+
+    @property
+    def nbytes(self) -> int:
+        """列存储占用的字节数（估算，不含字符串表中字符串本身）"""
+        total = sum(len(bits) for bits in self._empty_bits)
+        for kind, store in zip(self._kinds, self._data):
+            total += len(store) * (store.itemsize if kind != OBJECT else 8)
+        total += sum(len(column_extras) * 16 for column_extras in self._extras if column_extras)
+        return total + len(self._strings) * 8
+
+
+class RowView(Sequence):
+    """Grid 的行视图，行为与列表相同但不复制数据"""
+
+    __slots__ = ("_grid", "_index")
+
+    def __init__(self, grid: Grid, index: int):
+        self._grid = grid
+        self._index = index
+
+    def __len__(self) -> int:
+        return self._grid._columns
+
+    def __getitem__(self, index):
+        grid = self._grid
+        if isinstance(index, slice):
+            return [grid._cell(self._index, j) for j in range(*index.indices(grid._columns))]
+        if index < 0:
+            index += grid._columns
+        if not 0 <= index < grid._columns:
+            raise IndexError("行下标越界")
+        return grid._cell(self._index, index)
+
+    def __iter__(self) -> Iterator[Any]:
+        grid, row = self._grid, self._index
+        for j in range(grid._columns):
+            yield grid._cell(row, j)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(other) == len(self) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(self.tolist())
+
+    def tolist(self) -> List[Any]:
+        """转换为列表"""
+        return list(self)
+
+
+class ColumnView(Sequence):
+    """Grid 的列视图，可直接访问底层 array 或转换为 numpy 数组（不复制数据）"""
+
+    __slots__ = ("_grid", "_index")
+
+    def __init__(self, grid: Grid, index: int):
+        self._grid = grid
+        self._index = index
+
+    @property
+    def kind(self) -> str:
+        """列的存储类型"""
+        return self._grid._kinds[self._index]
+
+    @property
+    def array(self) -> Any:
+        """
+        底层存储（不复制）：数值列为 array("q"/"d")，文本列为字符串表下标 array("I")，
+        object 列为列表。空单元格和例外值在数值列中为 0，需结合 empty_mask() 和 extras 使用
+        """
+        return self._grid._data[self._index]
+
+    @property
+    def extras(self) -> dict:
+        """不属于列主类型的值 {行下标: 值}，如数值列的标题"""
+        return dict(self._grid._extras[self._index] or {})
+
+    def empty_mask(self) -> List[bool]:
+        """每行是否为空"""
+        bits = self._grid._empty_bits[self._index]
+        return [bool(bits[i >> 3] & (1 << (i & 7))) for i in range(self._grid._rows)]
+
+    def to_numpy(self) -> Any:
+        """
+        转换为 numpy 数组：数值列为共享内存的 int64/float64 视图，其他列为 object 数组（需要复制）
+
+        Raises:
+            ImportError: 未安装 numpy
+        """
+        if numpy is None:
+            raise ImportError("to_numpy 需要安装 numpy: pip install numpy")
+        if self.kind == INT:
+            return numpy.frombuffer(self.array, dtype=numpy.int64)
+        if self.kind == FLOAT:
+            return numpy.frombuffer(self.array, dtype=numpy.float64)
+        return numpy.array(self.tolist(), dtype=object)
+
+    def __len__(self) -> int:
+        return self._grid._rows
+
+    def __getitem__(self, index):
+        grid = self._grid
+        if isinstance(index, slice):
+            return [grid._cell(i, self._index) for i in range(*index.indices(grid._rows))]
+        if index < 0:
+            index += grid._rows
+        if not 0 <= index < grid._rows:
+            raise IndexError("列下标越界")
+        return grid._cell(index, self._index)
+
+    def __iter__(self) -> Iterator[Any]:
+        grid, column = self._grid, self._index
+        for i in range(grid._rows):
+            yield grid._cell(i, column)
+
+    def __repr__(self) -> str:
+        return f"ColumnView({self.kind}, {len(self)} rows)"
+
+    def tolist(self) -> List[Any]:
+        """转换为列表"""
+        return list(self)
+
+
+def to_grid(values: Any, empty: Any = "") -> Optional[Grid]:
+    """
+    将区域读取结果转换为 Grid，None 原样返回
+
+    Args:
+        values: get_range_values / get_used_range_data 的返回值
+        empty: 表示空单元格的值，默认 ""
+
+    Returns:
+        Grid 实例
+    """
+    if values is None:
+        return None
+    return Grid.from_rows(values, empty)
@@ -0,0 +1,258 @@
+"""
+WPS AirScript 多脚本客户端
+将调用分发到多个部署了 wps-airsheet-api.js 的脚本（script_id/token），提高并发吞吐量
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from python.wps_airscript_client import CHANGE_LOG_SHEET, WPSAirScriptClient, parse_address
+
+
+class _Shard:
+    """一个脚本分片：对应的客户端和吞吐量统计"""
+
+    def __init__(self, client: WPSAirScriptClient, script_id: str):
+        self.client = client
+        self.script_id = script_id
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+
+
+def _same_sheet(a: Optional[str], b: Optional[str]) -> bool:
+    """
+    两个工作表名是否可能指向同一工作表
+
+    None 表示活动工作表，客户端无法确定是哪一个；脚本按名称包含关系模糊匹配工作表，
+    因此一个名称包含另一个时也视为同一工作表。
+    """
+    if a is None or b is None:
+        return True
+    return a in b or b in a
+
+
+def _overlaps(a: Optional[tuple], b: Optional[tuple]) -> bool:
+    """两个区域是否重叠（None 表示整个工作表）"""
+    if a is None or b is None:
+        return True
+    r1, c1, r2, c2 = a
+    s1, d1, s2, d2 = b
+    return r1 <= s2 and s1 <= r2 and c1 <= d2 and d1 <= c2
+
+
+class _PendingOperation:
+    """一次进行中的调用，用于保证同一区域上的调用顺序"""
+
+    def __init__(self, targets: Optional[List[tuple]], is_write: bool):
+        # [(工作表名, 区域)]，区域为 None 表示整个工作表；targets 为 None 表示无法分析，与所有调用保持顺序
+        self.targets = targets
+        self.is_write = is_write
+        self.done = threading.Event()
+
+    def conflicts(self, other: "_PendingOperation") -> bool:
+        """两次调用是否需要保持顺序：至少一个为写操作，且作用的区域可能重叠"""
+        if not (self.is_write or other.is_write):
+            return False
+        if self.targets is None or other.targets is None:
+            return True
+        return any(_same_sheet(sheet, other_sheet) and _overlaps(bounds, other_bounds)
+                   for sheet, bounds in self.targets
+                   for other_sheet, other_bounds in other.targets)
+
+
+class ShardedAirScriptClient(WPSAirScriptClient):
+    """
+    多脚本客户端
+
+    同一个 script_id 的脚本执行是串行的，单个客户端的并发请求无法提高吞吐量。
+    在同一文件中部署多份 wps-airsheet-api.js，将它们的 (token, script_id) 传给本客户端，
+    调用会按最少进行中请求数（least-loaded）分发到各个脚本。
+
+    - 接口与 WPSAirScriptClient 完全相同，可直接替换
+    - 区域可能重叠且至少一个为写操作的调用按发起顺序依次执行。批量写入、run_batch、
+      copy_block 等调用按其中每个工作表和区域判断；追加行、插入删除行列等视为作用于整个工作表；
+      无法分析的调用（如增删工作表、剪贴板复制粘贴）与之前和之后的所有调用保持顺序
+    - get_shard_stats() 返回每个脚本的请求数、错误数、平均耗时和吞吐量
+
+    Example:
+        >>> client = ShardedAirScriptClient("file_id", [
+        ...     ("token1", "script_id1"),
+        ...     ("token2", "script_id2"),
+        ...     ("token3", "script_id3"),
+        ... ])
+        >>> with ThreadPoolExecutor(12) as executor:
+        ...     list(executor.map(lambda i: client.set_cell_value(f"A{i}", i), range(1, 101)))
+        >>> client.get_shard_stats()
+    """
+
+    # 没有 address 参数、作用于调用的整个工作表的脚本函数
+    SHEET_FUNCTIONS = frozenset({
+        "getUsedRangeData", "getUsedRangeInfo", "getRangeFingerprints", "getKeyIndex", "upsertRows", "appendRows",
+        "insertRows", "deleteRows", "insertColumns", "deleteColumns", "applyRowSpans", "applyColumnSpans",
+        "setRowHeight", "setColumnWidth",
+    })
+
+    def __init__(self, file_id: str, shards: Sequence[Union[tuple, Dict[str, str]]],
+                 base_url: str = "https://www.kdocs.cn", **kwargs):
+        """
+        初始化多脚本客户端
+
+        Args:
+            file_id: 文件 ID
+            shards: 脚本列表，每项为 (token, script_id) 或 {"token": ..., "script_id": ...}，
+                所有脚本都需部署 wps-airsheet-api.js
+            base_url: API 基础 URL
+            **kwargs: 其他 WPSAirScriptClient 参数（codec、compression、session、job_mode 等），
+                对所有脚本生效
+        """
+        shards = [(s["token"], s["script_id"]) if isinstance(s, dict) else tuple(s) for s in shards]
+        if not shards:
+            raise ValueError("至少需要一个脚本")
+        super().__init__(file_id, shards[0][0], shards[0][1], base_url, **kwargs)
+        # 各分片共享编解码器和 HTTP 会话，调用分析和磁盘缓存只在本客户端上使用
+        kwargs.update(codec=self.codec, session=self.session, profile=False, disk_cache=None)
+        self._shards = [_Shard(WPSAirScriptClient(file_id, token, script_id, base_url, **kwargs), script_id)
+                        for token, script_id in shards]
+        self._schedule_lock = threading.Lock()
+        # 进行中的调用（按发起顺序）
+        self._pending: List[_PendingOperation] = []
+        self._started_at = time.monotonic()
+
+    # ==================== 调度 ====================
+
+    def _request(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """等待与之冲突的先前调用完成后，发送到当前负载最低的脚本"""
+        argv = context.get("argv", {})
+        operation = _PendingOperation(self._operation_targets(argv, context.get("active_sheet")),
+                                      argv.get("function") not in self.READ_FUNCTIONS)
+
+        with self._schedule_lock:
+            predecessors = [op for op in self._pending if op.conflicts(operation)]
+            self._pending.append(operation)
+
+        try:
+            for predecessor in predecessors:
+                predecessor.done.wait()
+            shard = self._acquire_shard()
+            start = time.monotonic()
+            failed = True
+            try:
+                response = shard.client._request(context)
+                failed = False
+                return response
+            finally:
+                self._release_shard(shard, time.monotonic() - start, failed)
+        finally:
+            with self._schedule_lock:
+                self._pending.remove(operation)
+            operation.done.set()
+
+    @classmethod
+    def _operation_targets(cls, argv: Dict[str, Any], sheet: Optional[str]) -> Optional[List[tuple]]:
+        """
+        调用作用的 [(工作表名, 区域)]
+
+        未指定工作表的批量写入项和 run_batch 操作使用调用的工作表。
+        区域为 (起始行, 起始列, 结束行, 结束列)，None 表示整个工作表；无法分析的调用返回 None。
+        """
+        function = argv.get("function")
+        if function == "runBatch":
+            targets = []
+            for op in argv.get("operations") or []:
+                op_targets = cls._operation_targets(op, op.get("sheet") or sheet)
+                if op_targets is None:
+                    return None
+                targets.extend(op_targets)
+            return targets
+        if function == "setRangeValuesBatch":
+            return [(item.get("sheet") or sheet, cls._address_bounds(item.get("address")))
+                    for item in argv.get("items") or []]
+        if function in ("copyBlock", "copyPasteRange"):
+            source = cls._address_bounds(argv.get("sourceAddress"))
+            target = cls._address_bounds(argv.get("targetCell") or argv.get("targetAddress"))
+            if source is not None and target is not None:
+                # 目标地址可能只给出左上角，按源区域大小扩展
+                target = (target[0], target[1], max(target[2], target[0] + source[2] - source[0]),
+                          max(target[3], target[1] + source[3] - source[1]))
+            else:
+                target = None
+            return [(argv.get("sourceSheet") or sheet, source), (argv.get("targetSheet") or sheet, target)]
+        if function in ("findCell", "findAllCells", "replaceInRangeWithCount"):
+            return [(sheet, cls._address_bounds(argv.get("searchRange")))]
+        if function == "queryRange":
+            return [(sheet, cls._address_bounds((argv.get("spec") or {}).get("address")))]
+        if function == "getChangesSince":
+            return [(sheet, None), (CHANGE_LOG_SHEET, None)]
+        if "address" in argv or function in cls.SHEET_FUNCTIONS:
+            return [(sheet, cls._address_bounds(argv.get("address")))]
+        return None
+
+    @staticmethod
+    def _address_bounds(address: Any) -> Optional[tuple]:
+        """地址对应的区域 (起始行, 起始列, 结束行, 结束列)，无法解析时为 None（整个工作表）"""
+        if not isinstance(address, str):
+            return None
+        try:
+            return parse_address(address)
+        except ValueError:
+            return None
+
+    def _acquire_shard(self) -> _Shard:
+        """选择进行中请求最少的脚本（相同时选择累计请求最少的）"""
+        with self._schedule_lock:
+            shard = min(self._shards, key=lambda s: (s.in_flight, s.requests))
+            shard.in_flight += 1
+            shard.requests += 1
+            return shard
+
+    def _release_shard(self, shard: _Shard, seconds: float, failed: bool) -> None:
+        with self._schedule_lock:
+            shard.in_flight -= 1
+            shard.busy_seconds += seconds
+            shard.errors += failed
+
+    # ==================== 统计 ====================
+
+    def get_shard_stats(self) -> Dict[str, Any]:
+        """
+        获取各脚本的吞吐量统计
+
+        Returns:
+            {"shards": [...], "requests", "errors", "requests_per_second", "elapsed_seconds"}，
+            每个脚本包含 script_id、requests、errors、in_flight、busy_seconds、
+            avg_seconds（平均耗时）、requests_per_second
+
+        Example:
+            >>> for shard in client.get_shard_stats()["shards"]:
+            ...     print(shard["script_id"], shard["requests"], shard["requests_per_second"])
+        """
+        elapsed = max(time.monotonic() - self._started_at, 1e-9)
+        with self._schedule_lock:
+            shards = [{
+                "script_id": shard.script_id,
+                "requests": shard.requests,
+                "errors": shard.errors,
+                "in_flight": shard.in_flight,
+                "busy_seconds": shard.busy_seconds,
+                "avg_seconds": shard.busy_seconds / shard.requests if shard.requests else 0.0,
+                "requests_per_second": shard.requests / elapsed,
+            } for shard in self._shards]
+        requests = sum(shard["requests"] for shard in shards)
+        return {
+            "shards": shards,
+            "requests": requests,
+            "errors": sum(shard["errors"] for shard in shards),
+            "requests_per_second": requests / elapsed,
+            "elapsed_seconds": elapsed,
+        }
+
+    def get_compression_stats(self) -> Dict[str, Any]:
+        """获取所有脚本汇总的压缩统计信息（见 WPSAirScriptClient.get_compression_stats）"""
+        snapshots = [shard.client.get_compression_stats() for shard in self._shards]
+        with self._stats_lock:
+            for key in self._compression_stats:
+                self._compression_stats[key] = sum(snapshot[key] for snapshot in snapshots)
+        return super().get_compression_stats()
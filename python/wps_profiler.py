@@ -0,0 +1,405 @@
+"""
+WPS AirScript 调用分析
+记录客户端的调用序列（函数、工作表、区域、时间、调用位置），找出可以合并的调用模式，
+并按调用栈汇总耗时（火焰图格式）
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from python.wps_airscript_client import format_address, parse_address
+
+# 这些模块的栈帧属于客户端内部，调用位置取它们之外最内层的栈帧
+_CLIENT_FILES = frozenset(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in ("wps_airscript_client.py", "wps_pool.py", "wps_profiler.py")
+)
+
+# 格式设置函数：同一区域上的多次调用可以合并
+FORMAT_FUNCTIONS = frozenset({
+    "setCellFont", "setCellBackgroundColor", "setCellAlignment", "setCellBorder",
+    "setCellNumberFormat", "mergeCells", "unmergeCells", "autoFitColumns",
+    "setColumnWidth", "setRowHeight",
+})
+
+# 逐单元格循环的改进建议
+_LOOP_SUGGESTIONS = {
+    "getCellValue": "改用 get_range_values 一次读取",
+    "setCellValue": "改用 set_range_values 一次写入（或 WriteBehindBuffer）",
+    "getCellFormula": "改用 get_range_formulas 一次读取",
+    "setCellFormula": "改用 set_range_formulas 或 fill_formula 一次写入",
+}
+
+PATTERN_NAMES = {
+    "cell_loop": "逐单元格循环",
+    "repeated_format": "同一区域重复格式化",
+    "read_after_write": "写入后立即读取",
+    "repeated_read": "重复读取",
+}
+
+
+class ProfiledCall:
+    """一次脚本调用的记录"""
+
+    __slots__ = ("index", "function", "sheet", "address", "bounds", "params_key", "options_key",
+                 "timestamp", "started", "seconds", "stack", "is_read", "error")
+
+    def __init__(self, index: int, function: str, sheet: Optional[str], params: Dict[str, Any],
+                 timestamp: float, started: float, seconds: float, stack: List[str], is_read: bool,
+                 error: Optional[str]):
+        self.index = index
+        self.function = function
+        self.sheet = sheet
+        address = params.get("address")
+        self.address = address if isinstance(address, str) else None
+        try:
+            self.bounds = parse_address(self.address) if self.address else None
+        except ValueError:
+            self.bounds = None
+        self.params_key = json.dumps(params, sort_keys=True, default=str)
+        self.options_key = json.dumps({k: v for k, v in params.items() if k != "address"},
+                                      sort_keys=True, default=str)
+        self.timestamp = timestamp
+        self.started = started
+        self.seconds = seconds
+        # 调用栈：由外到内，最后一项为客户端方法，如 "client.set_cell_value"
+        self.stack = stack
+        self.is_read = is_read
+        self.error = error
+
+    @property
+    def call_site(self) -> str:
+        """发起调用的最内层栈帧"""
+        return self.stack[-2] if len(self.stack) > 1 else "<unknown>"
+
+    @property
+    def is_single_cell(self) -> bool:
+        return self.bounds is not None and self.bounds[0] == self.bounds[2] and self.bounds[1] == self.bounds[3]
+
+    def overlaps(self, other: "ProfiledCall") -> bool:
+        """两次调用的区域是否重叠（没有 address 的调用视为作用于整个工作表）"""
+        if self.bounds is None or other.bounds is None:
+            return True
+        r1, c1, r2, c2 = self.bounds
+        s1, d1, s2, d2 = other.bounds
+        return r1 <= s2 and s1 <= r2 and c1 <= d2 and d1 <= c2
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "function": self.function,
+            "sheet": self.sheet,
+            "address": self.address,
+            "timestamp": self.timestamp,
+            "seconds": self.seconds,
+            "call_site": self.call_site,
+            "is_read": self.is_read,
+            "error": self.error,
+        }
+
+
+class CallProfiler:
+    """
+    调用分析器
+
+    通过 WPSAirScriptClient(..., profile=True) 开启后，客户端每次调用脚本函数都会记录到 client.profiler。
+    分析以下可以减少往返次数的模式：
+
+    - cell_loop: 同一位置对相邻单元格逐个调用（如循环 set_cell_value），可合并为一次区域调用
+    - repeated_format: 同一区域上多次格式设置调用，可用 run_batch 合并为一次请求
+    - read_after_write: 写入后立即读取重叠区域，可用 run_batch 合并或直接使用写入的值
+    - repeated_read: 两次读取之间没有写入该工作表，第二次读取可以复用结果
+
+    Example:
+        >>> client = WPSAirScriptClient(file_id, token, script_id, profile=True)
+        >>> run_workload(client)
+        >>> print(client.profiler.report())
+        >>> open("calls.folded", "w").write("\\n".join(client.profiler.folded()))  # flamegraph.pl / speedscope
+    """
+
+    def __init__(self, read_functions=(), min_loop: int = 3, stack_depth: int = 16):
+        """
+        Args:
+            read_functions: 只读函数名集合，默认使用 WPSAirScriptClient.READ_FUNCTIONS
+            min_loop: 识别为逐单元格循环的最少连续调用次数
+            stack_depth: 每次调用记录的调用栈最大深度
+        """
+        self.read_functions = frozenset(read_functions)
+        self.min_loop = min_loop
+        self.stack_depth = stack_depth
+        self._lock = threading.Lock()
+        self._calls: List[ProfiledCall] = []
+
+    # ==================== 记录 ====================
+
+    def record(self, function_name: str, sheet_name: Optional[str], params: Dict[str, Any],
+               started: float, seconds: float, error: Optional[BaseException] = None) -> None:
+        """
+        记录一次调用（由客户端在 _call_function 中调用）
+
+        Args:
+            function_name: 脚本函数名
+            sheet_name: 工作表名称
+            params: 调用参数
+            started: 开始时间（time.perf_counter()）
+            seconds: 耗时（秒）
+            error: 调用失败时的异常
+        """
+        stack = self._capture_stack()
+        timestamp = time.time() - (time.perf_counter() - started)
+        with self._lock:
+            self._calls.append(ProfiledCall(
+                len(self._calls), function_name, sheet_name, params, timestamp, started, seconds, stack,
+                function_name in self.read_functions, repr(error) if error else None))
+
+    def _capture_stack(self) -> List[str]:
+        """当前调用栈：客户端之外的栈帧（由外到内），加上被调用的客户端方法"""
+        frame = sys._getframe(1)
+        method = None
+        while frame is not None and frame.f_code.co_filename in _CLIENT_FILES:
+            method = frame.f_code.co_name
+            frame = frame.f_back
+        frames = []
+        while frame is not None and len(frames) < self.stack_depth:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        frames.reverse()
+        frames.append(f"client.{method}" if method else "client")
+        return frames
+
+    @property
+    def calls(self) -> List[ProfiledCall]:
+        """已记录的调用（按发起顺序）"""
+        with self._lock:
+            return list(self._calls)
+
+    def reset(self) -> None:
+        """清空记录"""
+        with self._lock:
+            self._calls = []
+
+    # ==================== 模式分析 ====================
+
+    def findings(self) -> List[Dict[str, Any]]:
+        """
+        分析调用序列中可以合并的模式
+
+        Returns:
+            发现列表（按可减少的往返次数降序），每项包含 pattern、call_site、function、sheet、
+            calls（涉及的调用次数）、round_trips_saved、seconds（涉及调用的总耗时）、detail、suggestion
+        """
+        return self._finalize(self._analyze(self.calls))
+
+    def _analyze(self, calls: List[ProfiledCall]) -> List[Dict[str, Any]]:
+        """运行所有模式分析，每个发现的 avoidable 为可以省去的调用序号集合"""
+        return (self._find_cell_loops(calls) + self._find_repeated_formats(calls)
+                + self._find_reads_after_writes(calls) + self._find_repeated_reads(calls))
+
+    @staticmethod
+    def _finalize(findings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        for finding in findings:
+            finding["round_trips_saved"] = len(finding.pop("avoidable"))
+        return sorted(findings, key=lambda f: (-f["round_trips_saved"], -f["seconds"]))
+
+    def _find_cell_loops(self, calls: List[ProfiledCall]) -> List[Dict[str, Any]]:
+        groups: Dict[tuple, List[ProfiledCall]] = {}
+        for call in calls:
+            if call.is_single_cell:
+                # 格式设置只有参数相同时才能合并；读写值的参数本来就各不相同
+                options = call.options_key if call.function in FORMAT_FUNCTIONS else None
+                groups.setdefault((call.call_site, call.function, call.sheet, options), []).append(call)
+
+        findings = []
+        for (site, function, sheet, _), group in groups.items():
+            runs = []
+            run = [group[0]]
+            direction = None
+            for call in group[1:]:
+                (r, c, _, _), (pr, pc, _, _) = call.bounds, run[-1].bounds
+                step = "row" if r == pr and c == pc + 1 else "column" if c == pc and r == pr + 1 else None
+                if step is not None and direction in (None, step):
+                    run.append(call)
+                    direction = step
+                    continue
+                runs.append(run)
+                run = [call]
+                direction = None
+            runs.append(run)
+            runs = [run for run in runs if len(run) >= self.min_loop]
+            if not runs:
+                continue
+            involved = [call for run in runs for call in run]
+            ranges = [format_address(run[0].bounds[0], run[0].bounds[1], run[-1].bounds[2], run[-1].bounds[3])
+                      for run in runs]
+            findings.append(self._finding(
+                "cell_loop", site, function, sheet, involved,
+                [call for run in runs for call in run[1:]],
+                f"{len(runs)} 个循环共 {len(involved)} 次逐单元格调用，覆盖 {', '.join(ranges[:3])}"
+                + (" 等" if len(ranges) > 3 else ""),
+                _LOOP_SUGGESTIONS.get(function, "对合并后的区域调用一次")))
+        return findings
+
+    def _find_repeated_formats(self, calls: List[ProfiledCall]) -> List[Dict[str, Any]]:
+        by_range: Dict[tuple, List[ProfiledCall]] = {}
+        for call in calls:
+            if call.function in FORMAT_FUNCTIONS and call.bounds is not None:
+                by_range.setdefault((call.sheet, call.bounds), []).append(call)
+
+        # 按（第一次调用位置，函数组合）汇总，循环中对每个单元格设置多种格式时只报告一次
+        grouped: Dict[tuple, List[List[ProfiledCall]]] = {}
+        for group in by_range.values():
+            if len(group) > 1:
+                key = (group[0].call_site, tuple(sorted({call.function for call in group})), group[0].sheet)
+                grouped.setdefault(key, []).append(group)
+
+        findings = []
+        for (site, functions, sheet), groups in grouped.items():
+            involved = [call for group in groups for call in group]
+            sizes = {len(group) for group in groups}
+            findings.append(self._finding(
+                "repeated_format", site, "/".join(functions), sheet, involved,
+                [call for group in groups for call in group[1:]],
+                f"{len(groups)} 个区域上" + (f"各有 {sizes.pop()} 次" if len(sizes) == 1 else f"共 {len(involved)} 次")
+                + "格式设置调用",
+                "用 run_batch 在一次请求中完成同一区域的全部格式设置"))
+        return findings
+
+    def _find_reads_after_writes(self, calls: List[ProfiledCall]) -> List[Dict[str, Any]]:
+        previous: Dict[Optional[str], ProfiledCall] = {}
+        grouped: Dict[tuple, List[ProfiledCall]] = {}
+        for call in calls:
+            last = previous.get(call.sheet)
+            if call.is_read and last is not None and not last.is_read and call.overlaps(last):
+                grouped.setdefault((call.call_site, call.function, last.function, call.sheet), []).append(call)
+            previous[call.sheet] = call
+
+        return [self._finding(
+            "read_after_write", site, function, sheet, group, group,
+            f"{len(group)} 次在 {write_function} 之后立即读取重叠区域",
+            "用 run_batch 将写入和读取合并为一次请求，或直接使用写入的值")
+            for (site, function, write_function, sheet), group in grouped.items()]
+
+    def _find_repeated_reads(self, calls: List[ProfiledCall]) -> List[Dict[str, Any]]:
+        # (函数名, 工作表, 参数) -> 上次读取；写入工作表后清除
+        seen: Dict[tuple, ProfiledCall] = {}
+        grouped: Dict[tuple, List[ProfiledCall]] = {}
+        for call in calls:
+            if not call.is_read:
+                for key in [key for key in seen if key[1] == call.sheet or call.sheet is None]:
+                    del seen[key]
+                continue
+            key = (call.function, call.sheet, call.params_key)
+            first = seen.get(key)
+            # 与上次读取同时进行的请求已由客户端合并，不计入
+            if first is not None and call.started >= first.started + first.seconds:
+                grouped.setdefault((call.call_site, call.function, call.sheet), []).append(call)
+            else:
+                seen[key] = call
+
+        return [self._finding(
+            "repeated_read", site, function, sheet, group, group,
+            f"{len(group)} 次读取与之前的读取完全相同，期间没有写入该工作表",
+            "复用第一次读取的结果（或使用 describe_workbook / wps_replica 等缓存）")
+            for (site, function, sheet), group in grouped.items()]
+
+    @staticmethod
+    def _finding(pattern: str, site: str, function: str, sheet: Optional[str], involved: List[ProfiledCall],
+                 avoidable: List[ProfiledCall], detail: str, suggestion: str) -> Dict[str, Any]:
+        return {
+            "pattern": pattern,
+            "call_site": site,
+            "function": function,
+            "sheet": sheet,
+            "calls": len(involved),
+            "seconds": sum(call.seconds for call in involved),
+            "detail": detail,
+            "suggestion": suggestion,
+            "avoidable": {call.index for call in avoidable},
+        }
+
+    # ==================== 汇总 ====================
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        调用统计
+
+        Returns:
+            {"calls", "seconds", "round_trips_saved", "findings"}，round_trips_saved 为所有发现合计
+            可以减少的往返次数（同一调用被多个发现涉及时只计一次）
+        """
+        calls = self.calls
+        findings = self._analyze(calls)
+        avoidable = set().union(*(finding["avoidable"] for finding in findings))
+        return {
+            "calls": len(calls),
+            "seconds": sum(call.seconds for call in calls),
+            "round_trips_saved": len(avoidable),
+            "findings": self._finalize(findings),
+        }
+
+    def folded(self) -> List[str]:
+        """
+        按调用栈汇总耗时，输出火焰图折叠格式（"帧1;帧2;...;client.方法 微秒数"），
+        可直接用于 flamegraph.pl 或 https://www.speedscope.app/
+        """
+        totals: Dict[tuple, float] = {}
+        for call in self.calls:
+            stack = tuple(call.stack)
+            totals[stack] = totals.get(stack, 0.0) + call.seconds
+        return [f"{';'.join(stack)} {round(seconds * 1e6)}" for stack, seconds in totals.items()]
+
+    def report(self, min_share: float = 0.01) -> str:
+        """
+        文本报告：可合并的调用模式，以及按调用栈展开的耗时树
+
+        Args:
+            min_share: 耗时树中省略占比低于该值的节点
+        """
+        summary = self.summary()
+        calls = self.calls
+        lines = [f"调用分析: {summary['calls']} 次调用，耗时 {summary['seconds']:.3f} 秒，"
+                 f"预计可减少 {summary['round_trips_saved']} 次往返"]
+        if summary["findings"]:
+            lines.append("")
+            lines.append("可合并的调用:")
+        for finding in summary["findings"]:
+            lines.append(f"  [{PATTERN_NAMES[finding['pattern']]}] {finding['call_site']} {finding['function']}"
+                         f"（{finding['sheet'] or '活动工作表'}）: {finding['detail']}，"
+                         f"可减少 {finding['round_trips_saved']} 次往返")
+            lines.append(f"      建议: {finding['suggestion']}")
+
+        total = summary["seconds"]
+        if not calls or total <= 0:
+            return "\n".join(lines)
+        # 去掉所有调用共同的外层栈帧（如 <module>、测试框架）
+        common = 0
+        while (all(len(call.stack) > common + 1 for call in calls)
+               and len({call.stack[common] for call in calls}) == 1):
+            common += 1
+        tree: Dict[str, Any] = {}
+        for call in calls:
+            node = tree
+            for frame in call.stack[common:]:
+                child = node.setdefault(frame, {"seconds": 0.0, "calls": 0, "children": {}})
+                child["seconds"] += call.seconds
+                child["calls"] += 1
+                node = child["children"]
+
+        lines.append("")
+        lines.append("按调用位置耗时:")
+        lines.append("  耗时(秒)    占比     次数  调用栈")
+
+        def walk(children: Dict[str, Any], depth: int) -> None:
+            for frame, node in sorted(children.items(), key=lambda item: -item[1]["seconds"]):
+                share = node["seconds"] / total
+                if share < min_share:
+                    continue
+                lines.append(f"  {node['seconds']:8.3f} {share:7.1%} {node['calls']:8d}  {'  ' * depth}{frame}")
+                walk(node["children"], depth + 1)
+
+        walk(tree, 0)
+        return "\n".join(lines)
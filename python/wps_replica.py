@@ -0,0 +1,242 @@
+"""
+WPS 智能表格本地副本
+将工作簿的所有工作表镜像到本地 SQLite，按分块指纹增量刷新
+"""
+
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+from python.wps_airscript_client import (
+    WPSAirScriptClient, _to_matrix, column_number_to_letter, format_address,
+)
+
+
+def _quote(name: str) -> str:
+    """SQLite 标识符转义"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+class WorkbookReplica:
+    """
+    工作簿的本地 SQLite 副本
+
+    每个工作表对应一张同名表，列名为列字母（A、B、C ...），
+    row_number 为工作表中的行号。刷新时只重新下载指纹发生变化的行块。
+
+    Example:
+        >>> replica = replicate(client, "workbook.db")
+        >>> replica.sql('SELECT C, SUM(D) FROM "Sheet1" WHERE row_number > 1 GROUP BY C')
+        >>> replica.refresh()  # 只下载发生变化的块
+    """
+
+    def __init__(self, client: WPSAirScriptClient, path: str, block_rows: int = 500):
+        """
+        初始化本地副本（不会自动刷新）
+
+        Args:
+            client: API 客户端
+            path: SQLite 数据库文件路径，":memory:" 表示内存数据库
+            block_rows: 指纹分块的行数，默认 500。块越小增量越精细，但指纹越多
+        """
+        self.client = client
+        self.path = path
+        self.block_rows = block_rows
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS _replica_sheets ("
+            "name TEXT PRIMARY KEY, start_row INTEGER, start_column INTEGER, "
+            "n_rows INTEGER, n_columns INTEGER, block_rows INTEGER, refreshed_at REAL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS _replica_blocks ("
+            "sheet TEXT, block INTEGER, fingerprint TEXT, PRIMARY KEY (sheet, block))"
+        )
+        self.conn.commit()
+
+    # ==================== 刷新 ====================
+
+    def refresh(self, sheets: List[str] = None) -> Dict[str, Dict[str, int]]:
+        """
+        增量刷新本地副本
+
+        Args:
+            sheets: 要刷新的工作表名称列表，不指定则刷新工作簿中的所有工作表，
+                并删除工作簿中已不存在的工作表
+
+        Returns:
+            每个工作表的刷新统计 {"rows", "blocks", "blocks_fetched", "requests"}
+        """
+        all_sheets = sheets is None
+        if all_sheets:
+            sheets = self.client.get_workbook_sheets()
+
+        stats = {}
+        for sheet in sheets:
+            stats[sheet] = self._refresh_sheet(sheet)
+
+        if all_sheets:
+            for name in set(self.sheets()) - set(sheets):
+                self._drop_sheet(name)
+            self.conn.commit()
+        return stats
+
+    def _refresh_sheet(self, sheet: str) -> Dict[str, int]:
+        """刷新单个工作表：比较分块指纹，只下载变化的块"""
+        info = self.client.get_range_fingerprints(self.block_rows, sheet)
+        if not isinstance(info, dict) or not info.get("success"):
+            raise RuntimeError(f"获取工作表指纹失败: {sheet}: {info}")
+
+        start_row, start_column = info["startRow"], info["startColumn"]
+        n_rows, n_columns = info["rows"], info["columns"]
+        blocks = info["blocks"]
+        requests = 1
+
+        meta = self.conn.execute(
+            "SELECT start_row, start_column, n_columns, block_rows FROM _replica_sheets WHERE name = ?",
+            (sheet,)).fetchone()
+        # 区域起点、列数或分块大小变化时，所有块都需要重新下载
+        if meta != (start_row, start_column, n_columns, self.block_rows):
+            self._create_sheet_table(sheet, start_column, n_columns)
+            stored = {}
+        else:
+            stored = dict(self.conn.execute(
+                "SELECT block, fingerprint FROM _replica_blocks WHERE sheet = ?", (sheet,)))
+
+        changed = [i for i, fingerprint in enumerate(blocks) if stored.get(i) != fingerprint]
+        table = _quote(sheet)
+        columns = [column_number_to_letter(start_column + j) for j in range(n_columns)]
+        insert_sql = (f"INSERT INTO {table} (row_number, {', '.join(_quote(c) for c in columns)}) "
+                      f"VALUES ({', '.join('?' * (n_columns + 1))})")
+
+        # 相邻的变化块合并为一次读取
+        for first, last in self._merge_runs(changed):
+            row1 = start_row + first * self.block_rows
+            row2 = start_row + min((last + 1) * self.block_rows, n_rows) - 1
+            address = format_address(row1, start_column, row2, start_column + n_columns - 1)
+            values = _to_matrix(self.client.get_range_values(address, sheet))
+            requests += 1
+
+            self.conn.execute(f"DELETE FROM {table} WHERE row_number BETWEEN ? AND ?", (row1, row2))
+            self.conn.executemany(insert_sql, (
+                [row1 + i] + list(row) + [None] * (n_columns - len(row))
+                for i, row in enumerate(values)
+            ))
+
+        # 删除已不存在的行和块
+        self.conn.execute(f"DELETE FROM {table} WHERE row_number < ? OR row_number >= ?",
+                          (start_row, start_row + n_rows))
+        self.conn.execute("DELETE FROM _replica_blocks WHERE sheet = ? AND block >= ?", (sheet, len(blocks)))
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO _replica_blocks (sheet, block, fingerprint) VALUES (?, ?, ?)",
+            ((sheet, i, blocks[i]) for i in changed))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO _replica_sheets "
+            "(name, start_row, start_column, n_rows, n_columns, block_rows, refreshed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (sheet, start_row, start_column, n_rows, n_columns, self.block_rows, time.time()))
+        self.conn.commit()
+
+        return {"rows": n_rows, "blocks": len(blocks), "blocks_fetched": len(changed), "requests": requests}
+
+    @staticmethod
+    def _merge_runs(indices: List[int]) -> List[tuple]:
+        """将有序块号合并为连续段 [(起始块, 结束块)]"""
+        runs = []
+        for i in indices:
+            if runs and runs[-1][1] == i - 1:
+                runs[-1][1] = i
+            else:
+                runs.append([i, i])
+        return [tuple(run) for run in runs]
+
+    def _create_sheet_table(self, sheet: str, start_column: int, n_columns: int) -> None:
+        """（重新）创建工作表对应的数据表"""
+        table = _quote(sheet)
+        columns = [column_number_to_letter(start_column + j) for j in range(n_columns)]
+        self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+        self.conn.execute(
+            f"CREATE TABLE {table} (row_number INTEGER PRIMARY KEY"
+            + "".join(f", {_quote(c)}" for c in columns) + ")")
+        self.conn.execute("DELETE FROM _replica_blocks WHERE sheet = ?", (sheet,))
+
+    def _drop_sheet(self, sheet: str) -> None:
+        """删除工作表的本地数据"""
+        self.conn.execute(f"DROP TABLE IF EXISTS {_quote(sheet)}")
+        self.conn.execute("DELETE FROM _replica_blocks WHERE sheet = ?", (sheet,))
+        self.conn.execute("DELETE FROM _replica_sheets WHERE name = ?", (sheet,))
+
+    # ==================== 读取 ====================
+
+    def sheets(self) -> List[str]:
+        """获取本地副本中的工作表名称列表"""
+        return [row[0] for row in self.conn.execute("SELECT name FROM _replica_sheets ORDER BY name")]
+
+    def read(self, sheet: str) -> List[List]:
+        """
+        读取工作表的全部数据（与 get_used_range_data 返回格式相同）
+
+        Args:
+            sheet: 工作表名称
+
+        Returns:
+            二维数组
+        """
+        if sheet not in self.sheets():
+            return []
+        cursor = self.conn.execute(f"SELECT * FROM {_quote(sheet)} ORDER BY row_number")
+        return [list(row[1:]) for row in cursor]
+
+    def sql(self, query: str, params: Any = ()) -> List[tuple]:
+        """
+        在本地副本上执行 SQL 查询
+
+        Args:
+            query: SQL 语句，工作表名作为表名（需要双引号），列名为列字母
+            params: 查询参数
+
+        Returns:
+            结果行列表
+        """
+        return self.conn.execute(query, params).fetchall()
+
+    def last_refreshed(self, sheet: str) -> Optional[float]:
+        """获取工作表最后一次刷新的时间戳，未同步过返回 None"""
+        row = self.conn.execute("SELECT refreshed_at FROM _replica_sheets WHERE name = ?", (sheet,)).fetchone()
+        return row[0] if row else None
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def replicate(client: WPSAirScriptClient, path: str, sheets: List[str] = None,
+              block_rows: int = 500) -> WorkbookReplica:
+    """
+    将工作簿镜像到本地 SQLite 并完成一次刷新
+
+    再次对同一路径调用时，只会下载发生变化的块。
+
+    Args:
+        client: API 客户端
+        path: SQLite 数据库文件路径
+        sheets: 要镜像的工作表名称列表，不指定则镜像所有工作表
+        block_rows: 指纹分块的行数，默认 500
+
+    Returns:
+        WorkbookReplica 实例
+
+    Example:
+        >>> replica = replicate(client, "workbook.db")
+        >>> rows = replica.read("Sheet1")
+    """
+    replica = WorkbookReplica(client, path, block_rows)
+    replica.refresh(sheets)
+    return replica
@@ -0,0 +1,406 @@
+"""
+WPS 智能表格数据导入导出
+按行窗口分块读写并流式处理文件，内存占用与工作表/文件大小无关
+"""
+
+import csv
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from python.wps_airscript_client import WPSAirScriptClient, _to_matrix, format_address, parse_address
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+EXPORT_FORMATS = ("csv", "parquet", "arrow")
+IMPORT_FORMATS = ("csv", "parquet")
+
+_INT_PATTERN = re.compile(r'^[-+]?\d{1,15}$')
+# 纯数字只在带指数时视为小数，超过 15 位的整数保持字符串
+_FLOAT_PATTERN = re.compile(r'^[-+]?(\d+\.\d*|\.\d+|\d+(?=[eE]))([eE][-+]?\d+)?$')
+
+
+# ==================== 文件写入器 ====================
+
+class _CSVWriter:
+    """CSV 写入器"""
+
+    def __init__(self, path: str, encoding: str):
+        self._file = open(path, "w", newline="", encoding=encoding)
+        self._writer = csv.writer(self._file)
+
+    def write(self, rows: List[List]) -> None:
+        self._writer.writerows(["" if v is None else v for v in row] for row in rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ArrowWriter:
+    """Parquet / Arrow IPC 写入器，列类型由第一个窗口推断"""
+
+    def __init__(self, path: str, format: str, column_names: List[str]):
+        if pyarrow is None:
+            raise ImportError(f"导出 {format} 需要安装 pyarrow: pip install pyarrow")
+        self._path = path
+        self._format = format
+        self._column_names = column_names
+        self._schema = None
+        self._writer = None
+
+    @staticmethod
+    def _infer_type(values: List[Any]):
+        """推断列类型：全部为布尔/整数/数字时使用对应类型，否则为字符串"""
+        present = [v for v in values if v is not None and v != ""]
+        if present and all(isinstance(v, bool) for v in present):
+            return pyarrow.bool_()
+        if present and all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+            return pyarrow.int64()
+        if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+            return pyarrow.float64()
+        return pyarrow.string()
+
+    def _column(self, values: List[Any], field) -> Any:
+        """将一列值转换为指定类型的 Arrow 数组"""
+        if pyarrow.types.is_string(field.type):
+            values = [None if v is None or v == "" else str(v) for v in values]
+        else:
+            values = [None if v is None or v == "" else v for v in values]
+        try:
+            return pyarrow.array(values, type=field.type)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError) as e:
+            raise ValueError(f"列 {field.name} 的值与推断的类型 {field.type} 不一致: {e}")
+
+    def _open(self, schema) -> None:
+        self._schema = schema
+        if self._format == "parquet":
+            self._writer = pyarrow.parquet.ParquetWriter(self._path, schema)
+        else:
+            self._writer = pyarrow.ipc.new_file(self._path, schema)
+
+    def write(self, rows: List[List]) -> None:
+        columns = [[row[j] if j < len(row) else None for row in rows] for j in range(len(self._column_names))]
+        if self._schema is None:
+            self._open(pyarrow.schema([
+                (name, self._infer_type(values)) for name, values in zip(self._column_names, columns)
+            ]))
+        arrays = [self._column(values, field) for values, field in zip(columns, self._schema)]
+        self._writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=self._schema))
+
+    def close(self) -> None:
+        if self._writer is None:
+            # 只有标题行时也生成带列名的空文件
+            self._open(pyarrow.schema([(name, pyarrow.string()) for name in self._column_names]))
+        self._writer.close()
+
+
+# ==================== 导出 ====================
+
+def export_sheet(client: WPSAirScriptClient, sheet_name: str, path: str, format: str = "csv",
+                 window_rows: int = 5000, has_header: bool = True, encoding: str = "utf-8",
+                 progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+    """
+    将工作表流式导出到文件
+
+    按 window_rows 行为一个窗口读取，写入当前窗口的同时预取下一个窗口，
+    内存中最多同时保留两个窗口的数据。空工作表也会生成文件（CSV 为空文件，
+    parquet/arrow 为没有行的文件）。
+
+    Args:
+        client: API 客户端
+        sheet_name: 工作表名称
+        path: 输出文件路径
+        format: 文件格式，"csv"、"parquet" 或 "arrow"（Arrow IPC 文件），
+            parquet/arrow 需要安装 pyarrow
+        window_rows: 每次读取的行数，默认 5000
+        has_header: 首行是否为标题行，parquet/arrow 使用它作为列名，默认 True
+        encoding: CSV 文件编码，默认 utf-8（Excel 打开可使用 utf-8-sig）
+        progress: 进度回调，参数为 (已导出数据行数, 数据总行数)
+
+    Returns:
+        统计字典 {"sheet", "path", "rows", "columns", "requests", "seconds", "rows_per_second"}，
+        rows 为导出的数据行数，has_header=True 时不含标题行
+
+    Example:
+        >>> stats = export_sheet(client, "Sheet1", "sheet1.csv")
+        >>> print(f"{stats['rows_per_second']:.0f} 行/秒")
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {format}，可用: {', '.join(EXPORT_FORMATS)}")
+
+    start = time.perf_counter()
+    info = client.get_used_range_info(sheet_name)
+    if not isinstance(info, dict) or not info.get("success"):
+        raise RuntimeError(f"获取工作表信息失败: {sheet_name}: {info}")
+
+    start_row, start_column = info["startRow"], info["startColumn"]
+    total_rows, total_columns = info["rows"], info["columns"]
+    header_rows = 1 if has_header and total_rows > 0 else 0
+    requests = 1
+
+    def fetch(offset: int) -> List[List]:
+        row1 = start_row + offset
+        row2 = start_row + min(offset + window_rows, total_rows) - 1
+        address = format_address(row1, start_column, row2, start_column + total_columns - 1)
+        return _to_matrix(client.get_range_values(address, sheet_name))
+
+    offsets = list(range(0, total_rows, window_rows))
+    writer = None
+    exported = 0
+    try:
+        with ThreadPoolExecutor(max_workers=1) as prefetcher:
+            future = prefetcher.submit(fetch, offsets[0]) if offsets else None
+            for i in range(len(offsets)):
+                rows = future.result()
+                requests += 1
+                if i + 1 < len(offsets):
+                    future = prefetcher.submit(fetch, offsets[i + 1])
+
+                if writer is None:
+                    if format == "csv":
+                        writer = _CSVWriter(path, encoding)
+                    else:
+                        if has_header:
+                            names = [str(v) if v not in (None, "") else f"column_{j + 1}"
+                                     for j, v in enumerate(rows[0])]
+                            rows = rows[1:]
+                        else:
+                            names = [f"column_{j + 1}" for j in range(total_columns)]
+                        writer = _ArrowWriter(path, format, names)
+                if rows:
+                    writer.write(rows)
+                exported = min(offsets[i] + window_rows, total_rows) - header_rows
+                if progress is not None:
+                    progress(exported, total_rows - header_rows)
+            if writer is None:
+                # 空工作表也生成文件
+                if format == "csv":
+                    writer = _CSVWriter(path, encoding)
+                else:
+                    writer = _ArrowWriter(path, format, [f"column_{j + 1}" for j in range(total_columns)])
+    finally:
+        if writer is not None:
+            writer.close()
+
+    seconds = time.perf_counter() - start
+    return {
+        "sheet": sheet_name,
+        "path": path,
+        "rows": exported,
+        "columns": total_columns,
+        "requests": requests,
+        "seconds": seconds,
+        "rows_per_second": exported / seconds if seconds > 0 else 0.0,
+    }
+
+
+def export_sheets(client: WPSAirScriptClient, directory: str, sheets: List[str] = None, format: str = "csv",
+                  max_workers: int = 4, **options) -> List[Dict[str, Any]]:
+    """
+    并行导出多个工作表，每个工作表一个文件（文件名为工作表名）
+
+    Args:
+        client: API 客户端
+        directory: 输出目录，不存在时自动创建
+        sheets: 工作表名称列表，不指定则导出所有工作表
+        format: 文件格式，"csv"、"parquet" 或 "arrow"
+        max_workers: 并行导出的工作表数量，默认 4
+        **options: 传给 export_sheet 的其他参数，如 window_rows
+
+    Returns:
+        每个工作表的统计字典列表，顺序与 sheets 一致
+
+    Example:
+        >>> for stats in export_sheets(client, "backup/2024-01-01", format="parquet"):
+        ...     print(stats["sheet"], stats["rows"], f"{stats['rows_per_second']:.0f} 行/秒")
+    """
+    if sheets is None:
+        sheets = client.get_workbook_sheets()
+    os.makedirs(directory, exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(export_sheet, client, sheet, os.path.join(directory, f"{sheet}.{format}"),
+                            format, **options)
+            for sheet in sheets
+        ]
+        return [future.result() for future in futures]
+
+
+# ==================== 导入 ====================
+
+def convert_value(text: str) -> Any:
+    """
+    将 CSV 文本转换为单元格值：整数、小数转换为数字，其他保持字符串
+
+    超过 15 位的整数（如身份证号、订单号）保持字符串，避免精度丢失和科学计数法显示。
+    以 0 开头的多位整数（如编号 "007"）保持字符串。
+    """
+    if not text:
+        return text
+    if _INT_PATTERN.match(text):
+        digits = text.lstrip("+-")
+        if len(digits) > 1 and digits[0] == "0":
+            return text
+        return int(text)
+    if _FLOAT_PATTERN.match(text):
+        return float(text)
+    return text
+
+
+def _read_csv_chunks(path: str, chunk_rows: int, encoding: str, convert_types: bool) -> Iterator[List[List]]:
+    """逐行流式读取 CSV，每 chunk_rows 行产出一块"""
+    with open(path, newline="", encoding=encoding) as f:
+        chunk = []
+        for row in csv.reader(f):
+            chunk.append([convert_value(v) for v in row] if convert_types else row)
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def _read_parquet_chunks(path: str, chunk_rows: int, has_header: bool) -> Iterator[List[List]]:
+    """按批读取 Parquet，has_header=True 时先产出列名作为标题行"""
+    if pyarrow is None:
+        raise ImportError("导入 parquet 需要安装 pyarrow: pip install pyarrow")
+    parquet_file = pyarrow.parquet.ParquetFile(path)
+    if has_header:
+        yield [list(parquet_file.schema_arrow.names)]
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+        columns = [column.to_pylist() for column in batch.columns]
+        yield [["" if v is None else v for v in row] for row in zip(*columns)]
+
+
+def import_file(client: WPSAirScriptClient, path: str, sheet_name: str = None, start_cell: str = "A1",
+                format: str = None, chunk_rows: int = 2000, has_header: bool = True,
+                convert_types: bool = True, encoding: str = "utf-8-sig", upload_workers: int = 1,
+                queue_size: int = 4, progress: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
+    """
+    将 CSV / Parquet 文件流式导入工作表
+
+    后台线程流式解析文件，同时已解析的块通过 set_range_values 分块上传（流水线并行）。
+    解析队列长度有限（queue_size），内存占用与文件大小无关。
+    文件中的空行保留为工作表中的空行，整块都是空行时不发送请求。
+
+    Args:
+        client: API 客户端
+        path: 文件路径
+        sheet_name: 工作表名称，可选
+        start_cell: 起始单元格，默认 "A1"
+        format: 文件格式，"csv" 或 "parquet"，不指定则按扩展名判断
+        chunk_rows: 每次上传的行数，默认 2000
+        has_header: Parquet 是否把列名写为标题行，默认 True（CSV 按文件内容原样导入）
+        convert_types: CSV 是否把数字文本转换为数字，默认 True
+        encoding: CSV 文件编码，默认 utf-8-sig（兼容带 BOM 的文件）
+        upload_workers: 并行上传的块数，默认 1
+        queue_size: 已解析待上传的最大块数，默认 4
+        progress: 进度回调，参数为已上传的行数
+
+    Returns:
+        统计字典 {"path", "rows", "cells", "requests", "seconds", "rows_per_second", "cells_per_minute"}
+
+    Example:
+        >>> stats = import_file(client, "data.csv", "Sheet1", "A1")
+        >>> print(f"{stats['cells_per_minute']:.0f} 单元格/分钟")
+    """
+    if format is None:
+        format = "parquet" if path.lower().endswith(".parquet") else "csv"
+    if format not in IMPORT_FORMATS:
+        raise ValueError(f"不支持的导入格式: {format}，可用: {', '.join(IMPORT_FORMATS)}")
+
+    start_row, start_column, _, _ = parse_address(start_cell)
+    if format == "csv":
+        chunks = _read_csv_chunks(path, chunk_rows, encoding, convert_types)
+    else:
+        chunks = _read_parquet_chunks(path, chunk_rows, has_header)
+
+    start = time.perf_counter()
+    parsed: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    done = object()
+
+    def parse() -> None:
+        """解析线程：按顺序产出 (起始行, 块)"""
+        row = start_row
+        try:
+            for chunk in chunks:
+                if stop.is_set():
+                    return
+                parsed.put((row, chunk))
+                row += len(chunk)
+        except Exception as e:
+            parsed.put(e)
+            return
+        parsed.put(done)
+
+    def upload(row: int, chunk: List[List]) -> tuple:
+        width = max(len(r) for r in chunk)
+        if width == 0:
+            return len(chunk), 0, 0
+        values = [r + [""] * (width - len(r)) if len(r) < width else r for r in chunk]
+        address = format_address(row, start_column, row + len(values) - 1, start_column + width - 1)
+        result = client.set_range_values(address, values, sheet_name)
+        if isinstance(result, dict) and result.get("success") is False:
+            raise RuntimeError(f"写入 {address} 失败: {result.get('error') or result.get('message')}")
+        return len(values), len(values) * width, 1
+
+    parser = threading.Thread(target=parse, name="wps-import-parser", daemon=True)
+    parser.start()
+
+    rows = cells = requests = 0
+    pending = []
+
+    def collect(future) -> None:
+        nonlocal rows, cells, requests
+        chunk_rows_written, chunk_cells, chunk_requests = future.result()
+        rows += chunk_rows_written
+        cells += chunk_cells
+        requests += chunk_requests
+        if progress is not None:
+            progress(rows)
+
+    try:
+        with ThreadPoolExecutor(max_workers=upload_workers) as uploader:
+            while True:
+                item = parsed.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                pending.append(uploader.submit(upload, *item))
+                # 控制同时在途的上传数量
+                while len(pending) >= upload_workers:
+                    collect(pending.pop(0))
+            while pending:
+                collect(pending.pop(0))
+    finally:
+        stop.set()
+        # 解析线程可能阻塞在已满的队列上，取出剩余项让其退出
+        while parser.is_alive():
+            try:
+                parsed.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    seconds = time.perf_counter() - start
+    return {
+        "path": path,
+        "rows": rows,
+        "cells": cells,
+        "requests": requests,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds > 0 else 0.0,
+        "cells_per_minute": cells / seconds * 60 if seconds > 0 else 0.0,
+    }
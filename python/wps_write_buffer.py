@@ -0,0 +1,339 @@
+"""
+WPS 智能表格写缓冲（write-behind）
+高频写入先进入内存队列，由后台线程合并后批量发送
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from python.wps_airscript_client import WPSAirScriptClient, format_address, parse_address
+
+
+class WriteBufferFull(Exception):
+    """写缓冲已满且等待超时"""
+
+
+def coalesce_cells(cells: Dict[tuple, Any]) -> List[tuple]:
+    """
+    将离散单元格合并为尽可能少的矩形区域
+
+    先把每一行的连续列合并为片段，再把相邻行中列范围相同的片段合并为矩形。
+
+    Args:
+        cells: {(行, 列): 值} 字典，行列从 1 开始
+
+    Returns:
+        [(地址, 二维数组), ...]
+
+    Example:
+        >>> coalesce_cells({(1, 1): "a", (1, 2): "b", (2, 1): "c", (2, 2): "d"})
+        [('A1:B2', [['a', 'b'], ['c', 'd']])]
+    """
+    rows: Dict[int, List[int]] = {}
+    for row, col in cells:
+        rows.setdefault(row, []).append(col)
+
+    blocks = []
+    # (起始列, 结束列) -> [起始行, 结束行, 二维数组]
+    open_blocks: Dict[tuple, list] = {}
+    for row in sorted(rows):
+        columns = sorted(rows[row])
+        runs = []
+        start = prev = columns[0]
+        for col in columns[1:]:
+            if col != prev + 1:
+                runs.append((start, prev))
+                start = col
+            prev = col
+        runs.append((start, prev))
+
+        extended = {}
+        for run in runs:
+            values = [cells[(row, col)] for col in range(run[0], run[1] + 1)]
+            block = open_blocks.pop(run, None)
+            if block is not None and block[1] == row - 1:
+                block[1] = row
+                block[2].append(values)
+            else:
+                if block is not None:
+                    blocks.append((run, block))
+                block = [row, row, [values]]
+            extended[run] = block
+
+        for run, block in open_blocks.items():
+            blocks.append((run, block))
+        open_blocks = extended
+
+    for run, block in open_blocks.items():
+        blocks.append((run, block))
+
+    return [(format_address(start_row, run[0], end_row, run[1]), values)
+            for run, (start_row, end_row, values) in blocks]
+
+
+class WriteBehindBuffer:
+    """
+    写缓冲：写入先进入内存队列，后台线程按工作表合并后批量发送
+
+    - 同一单元格多次写入只保留最后一次（last-write-wins）
+    - 达到 max_batch_cells 或每隔 flush_interval 秒触发一次发送
+    - 待发送和发送中的单元格达到 max_pending_cells 时写入方阻塞（背压），超时抛出 WriteBufferFull
+    - 发送失败的写入重新入队（不覆盖之后的新写入），最多重试 max_retries 次，
+      仍失败时调用 on_error(异常, 失败的写入项) 并记入 failed
+
+    Example:
+        >>> with WriteBehindBuffer(client, flush_interval=0.5) as buffer:
+        ...     for i, event in enumerate(events):
+        ...         buffer.set_cell_value(f"A{i + 2}", event, "事件")
+        ...     buffer.flush()
+    """
+
+    def __init__(self, client: WPSAirScriptClient, flush_interval: float = 1.0,
+                 max_batch_cells: int = 10000, max_pending_cells: int = 100000,
+                 put_timeout: Optional[float] = None,
+                 on_error: Optional[Callable[[Exception, List], None]] = None,
+                 bulk_mode: bool = False, max_retries: int = 3):
+        """
+        初始化写缓冲并启动后台发送线程
+
+        Args:
+            client: API 客户端
+            flush_interval: 定时发送间隔（秒），默认 1 秒
+            max_batch_cells: 待发送单元格达到该数量时立即发送，默认 10000
+            max_pending_cells: 待发送和发送中的单元格上限，达到后写入方阻塞，默认 100000
+            put_timeout: 写入方阻塞等待的最长时间（秒），默认一直等待
+            on_error: 放弃重试时的回调，参数为异常和失败的写入项列表
+            bulk_mode: 区域写入是否使用批量模式（见 set_range_values_batch），默认关闭
+            max_retries: 发送失败的写入重新入队的次数，默认 3
+        """
+        self.client = client
+        self.flush_interval = flush_interval
+        self.max_batch_cells = max_batch_cells
+        self.max_pending_cells = max_pending_cells
+        self.put_timeout = put_timeout
+        self.on_error = on_error
+        self.bulk_mode = bulk_mode
+        self.max_retries = max_retries
+
+        # 工作表名 -> {(行, 列): 值}
+        self._cells: Dict[Optional[str], Dict[tuple, Any]] = {}
+        # [(工作表名, 定位列, 行数据, 已失败次数)]
+        self._appends: List[tuple] = []
+        # (工作表名, 行, 列) -> 已失败次数，只记录重新入队的单元格
+        self._attempts: Dict[tuple, int] = {}
+        self._pending = 0
+        self._in_flight = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        # 放弃重试的写入项，格式与 on_error 的参数相同
+        self.failed: List = []
+        self.stats = {"flushes": 0, "cells_written": 0, "rows_appended": 0, "requests": 0, "errors": 0,
+                      "retries": 0, "dropped": 0}
+
+        self._thread = threading.Thread(target=self._run, name="wps-write-behind", daemon=True)
+        self._thread.start()
+
+    # ==================== 写入 ====================
+
+    def set_cell_value(self, address: str, value: Any, sheet_name: str = None) -> None:
+        """缓冲写入单元格值"""
+        row, col, _, _ = parse_address(address)
+        self._put(sheet_name, {(row, col): value}, 1)
+
+    def set_range_values(self, address: str, values: List[List], sheet_name: str = None) -> None:
+        """缓冲写入区域值，values 从地址左上角开始写入"""
+        row, col, _, _ = parse_address(address)
+        cells = {}
+        for i, row_values in enumerate(values):
+            for j, value in enumerate(row_values):
+                cells[(row + i, col + j)] = value
+        self._put(sheet_name, cells, len(cells))
+
+    def append_rows(self, rows: List[List], sheet_name: str = None, column: str = None) -> None:
+        """缓冲追加行，发送时按写入顺序合并为一次 append_rows 调用"""
+        if not rows:
+            return
+        cell_count = sum(len(row) for row in rows)
+        self._put(sheet_name, None, cell_count, (sheet_name, column, list(rows), 0))
+
+    def _put(self, sheet_name: Optional[str], cells: Optional[Dict], cell_count: int,
+             append: tuple = None) -> None:
+        """写入缓冲区，缓冲区已满时阻塞等待"""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("写缓冲已关闭")
+            deadline = None if self.put_timeout is None else time.monotonic() + self.put_timeout
+            while self._pending + self._in_flight >= self.max_pending_cells:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise WriteBufferFull(f"待发送单元格已达上限 {self.max_pending_cells}")
+                self._condition.notify_all()
+                self._condition.wait(remaining)
+
+            if cells:
+                sheet_cells = self._cells.setdefault(sheet_name, {})
+                before = len(sheet_cells)
+                sheet_cells.update(cells)
+                self._pending += len(sheet_cells) - before
+                if self._attempts:
+                    for row, col in cells:
+                        self._attempts.pop((sheet_name, row, col), None)
+            if append is not None:
+                self._appends.append(append)
+                self._pending += cell_count
+
+            if self._pending >= self.max_batch_cells:
+                self._condition.notify_all()
+
+    # ==================== 发送 ====================
+
+    def _run(self) -> None:
+        """后台线程：定时或达到批量阈值时发送"""
+        while True:
+            with self._condition:
+                if not self._closed and self._pending < self.max_batch_cells:
+                    self._condition.wait(self.flush_interval)
+                closed = self._closed
+            if closed:
+                while self._flush_once():
+                    pass
+                return
+            self._flush_once()
+
+    def _flush_once(self) -> bool:
+        """
+        取出当前所有待发送写入并发送
+
+        Returns:
+            是否有发送失败的写入重新入队
+        """
+        with self._flush_lock:
+            with self._condition:
+                cells, self._cells = self._cells, {}
+                appends, self._appends = self._appends, []
+                # 发送完成前仍计入背压，避免发送期间写入方继续堆积
+                self._in_flight, self._pending = self._pending, 0
+                self._condition.notify_all()
+
+            try:
+                if not cells and not appends:
+                    return False
+                self.stats["flushes"] += 1
+                requeued = False
+
+                items = []
+                for sheet_name, sheet_cells in cells.items():
+                    for address, values in coalesce_cells(sheet_cells):
+                        items.append({"address": address, "values": values, "sheet": sheet_name})
+                if items:
+                    error = self._send(lambda: self.client.set_range_values_batch(items, bulk_mode=self.bulk_mode),
+                                       "cells_written", sum(len(c) for c in cells.values()))
+                    if error is not None:
+                        requeued |= self._requeue_cells(error, cells)
+
+                # 追加行按 (工作表, 定位列) 合并，保持写入顺序
+                grouped: Dict[tuple, List[tuple]] = {}
+                for append in appends:
+                    grouped.setdefault((append[0], append[1]), []).append(append)
+                for (sheet_name, column), group in grouped.items():
+                    rows = [row for append in group for row in append[2]]
+                    error = self._send(lambda: self.client.append_rows(rows, sheet_name, column=column),
+                                       "rows_appended", len(rows))
+                    if error is not None:
+                        requeued |= self._requeue_appends(error, group)
+                return requeued
+            finally:
+                with self._condition:
+                    self._in_flight = 0
+                    self._condition.notify_all()
+
+    def _send(self, call: Callable, counter: str, count: int) -> Optional[Exception]:
+        """发送一批写入，返回失败时的异常"""
+        self.stats["requests"] += 1
+        try:
+            result = call()
+            if isinstance(result, dict) and result.get("success") is False:
+                raise RuntimeError(result.get("error") or result.get("message") or "写入失败")
+            self.stats[counter] += count
+            return None
+        except Exception as e:
+            self.stats["errors"] += 1
+            return e
+
+    def _requeue_cells(self, error: Exception, cells: Dict[Optional[str], Dict[tuple, Any]]) -> bool:
+        """发送失败的单元格重新入队，发送期间又被写入的单元格以新值为准"""
+        dropped: Dict[Optional[str], Dict[tuple, Any]] = {}
+        requeued = False
+        with self._condition:
+            for sheet_name, sheet_cells in cells.items():
+                queued = self._cells.setdefault(sheet_name, {})
+                for (row, col), value in sheet_cells.items():
+                    key = (sheet_name, row, col)
+                    if (row, col) in queued:
+                        continue
+                    attempts = self._attempts.pop(key, 0) + 1
+                    if attempts > self.max_retries:
+                        dropped.setdefault(sheet_name, {})[(row, col)] = value
+                        continue
+                    queued[(row, col)] = value
+                    self._attempts[key] = attempts
+                    self._pending += 1
+                    requeued = True
+                if not queued:
+                    del self._cells[sheet_name]
+        if requeued:
+            self.stats["retries"] += 1
+        if dropped:
+            self._drop(error, [{"address": address, "values": values, "sheet": sheet_name}
+                               for sheet_name, sheet_cells in dropped.items()
+                               for address, values in coalesce_cells(sheet_cells)])
+        return requeued
+
+    def _requeue_appends(self, error: Exception, group: List[tuple]) -> bool:
+        """发送失败的追加行重新放回队首，保持与之后追加的行的先后顺序"""
+        attempts = group[0][3] + 1
+        sheet_name, column = group[0][0], group[0][1]
+        if attempts > self.max_retries:
+            self._drop(error, [{"sheet": sheet_name, "column": column,
+                                "rows": [row for append in group for row in append[2]]}])
+            return False
+        with self._condition:
+            self._appends[:0] = [(sheet_name, column, rows, attempts) for _, _, rows, _ in group]
+            self._pending += sum(len(row) for append in group for row in append[2])
+        self.stats["retries"] += 1
+        return True
+
+    def _drop(self, error: Exception, items: List) -> None:
+        """放弃重试：记入 failed 并交给 on_error 处理"""
+        self.stats["dropped"] += len(items)
+        self.failed.extend(items)
+        if self.on_error is not None:
+            self.on_error(error, items)
+        else:
+            print(f"写缓冲发送失败: {error}")
+
+    def flush(self) -> None:
+        """
+        立即发送所有待发送写入，返回时调用前的写入均已发送
+
+        发送失败的写入会立即重试，超过 max_retries 次后放弃（见 failed）。
+        """
+        while self._flush_once():
+            pass
+
+    def close(self) -> None:
+        """发送剩余写入并停止后台线程"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -3,7 +3,22 @@ WPS 智能表格 API 测试用例
 每个 JS 函数都有对应的测试函数
 """
 
-from python.wps_airscript_client import WPSAirScriptClient
+import csv
+import importlib.util
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from python.wps_airscript_client import WPSAirScriptClient, measure_compression
+from python.wps_bundle import build_bundle
+from python.wps_disk_cache import DiskCache
+from python.wps_emulator import LocalAirScriptServer, LocalResponse, NodeAirScriptServer
+from python.wps_pool import ShardedAirScriptClient
+from python.wps_replica import replicate
+from python.wps_transfer import export_sheet, import_file
+from python.wps_write_buffer import WriteBehindBuffer, WriteBufferFull
 
 
 # ==================== 配置信息 ====================
@@ -38,6 +53,18 @@ def test_batch_write():
     return result
 
 
+def test_append_rows():
+    """测试末尾追加行"""
+    client = get_client()
+    rows = [
+        ["赵六", 26, "技术部", 8200],
+        ["钱七", 31, "市场部", 9100],
+    ]
+    result = client.append_rows(rows, SHEET_NAME, column="A")
+    print("追加行:", result)
+    return result
+
+
 # ==================== 单元格操作测试 ====================
 
 def test_get_cell_value():
@@ -64,6 +91,15 @@ def test_get_range_values():
     return result
 
 
+def test_get_range_values_grid():
+    """测试以紧凑 Grid 获取区域值"""
+    client = get_client()
+    grid = client.get_range_values("A1:D3", SHEET_NAME, as_grid=True)
+    print("Grid:", grid, grid.kinds)
+    print("Grid 转列表:", grid.tolist())
+    return grid
+
+
 def test_set_range_values():
     """测试设置区域值"""
     client = get_client()
@@ -73,6 +109,84 @@ def test_set_range_values():
     return result
 
 
+def test_set_range_values_batch():
+    """测试批量设置多个区域的值"""
+    client = get_client()
+    items = [
+        {"address": "F1:G1", "values": [["批量1", "批量2"]]},
+        {"address": "F3", "values": [["批量3"]]},
+    ]
+    result = client.set_range_values_batch(items, SHEET_NAME)
+    print("批量设置区域值:", result)
+    return result
+
+
+def test_run_batch():
+    """测试批量模式下一次执行多个操作"""
+    client = get_client()
+    operations = [
+        {"function": "setRangeValues", "address": "F5:G6", "values": [[1, 2], [3, 4]]},
+        {"function": "setCellFormula", "address": "H5", "formula": "=SUM(F5:G6)"},
+        {"function": "getCellValue", "address": "H5"},
+    ]
+    result = client.run_batch(operations, SHEET_NAME, bulk_mode=True)
+    print("批量执行结果:", result["results"])
+    print("批量执行耗时:", result["timings"])
+    return result
+
+
+def test_write_behind_buffer():
+    """测试写缓冲合并写入"""
+    client = get_client()
+    with WriteBehindBuffer(client, flush_interval=0.5) as buffer:
+        for i in range(1, 21):
+            buffer.set_cell_value(f"H{i}", i * 10, SHEET_NAME)
+        buffer.flush()
+    print("写缓冲统计:", buffer.stats)
+    return buffer.stats
+
+
+def test_write_behind_buffer_local():
+    """测试写缓冲的背压与发送失败重试（本地模拟服务）"""
+    server = LocalAirScriptServer(sheets=["Sheet1"])
+    client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server)
+    send_batch = client.set_range_values_batch
+    sending, release = threading.Event(), threading.Event()
+    failures = [2]
+
+    def flaky_batch(items, **kwargs):
+        sending.set()
+        release.wait(5)
+        if failures[0]:
+            failures[0] -= 1
+            raise ConnectionError("模拟网络错误")
+        return send_batch(items, **kwargs)
+
+    def broken_append(*args, **kwargs):
+        raise ConnectionError("模拟网络错误")
+
+    client.set_range_values_batch = flaky_batch
+    client.append_rows = broken_append
+    buffer = WriteBehindBuffer(client, flush_interval=0.05, max_pending_cells=10, put_timeout=0.2, max_retries=2)
+    buffer.set_range_values("A1", [[i] for i in range(1, 11)], "Sheet1")
+    assert sending.wait(5)
+    # 发送中的单元格仍计入背压
+    try:
+        buffer.set_cell_value("B1", "x", "Sheet1")
+        raise AssertionError("发送期间应阻塞")
+    except WriteBufferFull:
+        pass
+    release.set()
+    buffer.append_rows([["追加"]], "Sheet1")
+    buffer.close()
+
+    print("写缓冲统计:", buffer.stats, "放弃:", buffer.failed)
+    assert server.sheet_values("Sheet1") == [[i] for i in range(1, 11)]
+    assert buffer.stats["cells_written"] == 10 and buffer.stats["retries"] >= 2
+    assert buffer.failed == [{"sheet": "Sheet1", "column": None, "rows": [["追加"]]}]
+    return buffer.stats
+
+
 def test_clear_range():
     """测试清除区域内容"""
     client = get_client()
@@ -190,6 +304,82 @@ def test_replace_in_range():
     return result
 
 
+# ==================== 按键更新测试 ====================
+
+def test_upsert_rows():
+    """测试按键列更新或追加行"""
+    client = get_client()
+    rows = [
+        ["张三", 26, "技术部", 8800],
+        {"姓名": "孙八", "部门": "人事部"},
+    ]
+    result = client.upsert_rows(SHEET_NAME, "姓名", rows, cache_index=True)
+    print("按键更新:", result)
+    print("孙八所在行:", client.lookup_row(SHEET_NAME, "姓名", "孙八"))
+    return result
+
+
+def test_upsert_rows_script_local():
+    """测试按键更新：与 Object.prototype 同名的键（toString、constructor、__proto__）正常索引（node 运行脚本）"""
+    if shutil.which("node") is None:
+        print("未安装 node，跳过")
+        return None
+    with NodeAirScriptServer(sheets=["Sheet1"]) as server:
+        client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server)
+        client.set_range_values("A1:B4", [["键", "值"], ["toString", 1], ["constructor", 2], ["a", 3]], "Sheet1")
+        rows = [["toString", 10], ["constructor", 20], ["__proto__", 30], ["hasOwnProperty", 40]]
+        first = client.upsert_rows("Sheet1", "键", rows, cache_index=True)
+        second = client.upsert_rows("Sheet1", "键", rows)
+        client.invalidate_key_index("Sheet1")
+        rows_found = [client.lookup_row("Sheet1", "键", key) for key in ("toString", "constructor", "__proto__", "a")]
+        values = server.sheet_values("Sheet1")
+    print("按键更新:", first, second, rows_found)
+    assert first["updated"] == 2 and first["inserted"] == 2
+    assert second["updated"] == 4 and second["inserted"] == 0
+    assert values == [["键", "值"], ["toString", 10], ["constructor", 20], ["a", 3], ["__proto__", 30],
+                      ["hasOwnProperty", 40]]
+    assert rows_found == [2, 3, 5, 4]
+    return second
+
+
+# ==================== 查询下推测试 ====================
+
+def test_query():
+    """测试服务端查询（筛选 + 聚合）"""
+    client = get_client()
+    result = client.query(SHEET_NAME, where=("部门", "==", "技术部"), agg={"工资": "sum"})
+    print("技术部工资总和:", result)
+    result = client.query(SHEET_NAME, group_by="部门", agg=[("工资", "avg"), ("*", "count")])
+    print("各部门平均工资:", result)
+    return result
+
+
+def test_query_script_local():
+    """测试查询：avg 只按数字单元格求平均，参数错误时抛出 ValueError（node 运行脚本）"""
+    if shutil.which("node") is None:
+        print("未安装 node，跳过")
+        return None
+    with NodeAirScriptServer(sheets=["Sheet1"]) as server:
+        client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server)
+        client.set_range_values("A1:B6", [
+            ["部门", "工资"], ["技术部", 8000], ["技术部", "待定"], ["技术部", "9000"], ["市场部", ""], ["市场部", 6000],
+        ], "Sheet1")
+        result = client.query("Sheet1", group_by="部门", agg=[("工资", "avg"), ("工资", "count"), ("*", "count")])
+        print("各部门平均工资:", result)
+        assert result["rows"] == [["技术部", 8500, 3, 3], ["市场部", 6000, 1, 2]]
+        result = client.query("Sheet1", where=("部门", "in", ("市场部",)), select=["工资"])
+        assert result["rows"] == [[""], [6000]]
+
+    for kwargs in ({"where": ("部门", "in", "技术部")}, {"where": ("部门", "not_in", None)},
+                   {"select": ["部门"], "agg": {"工资": "sum"}}):
+        try:
+            client.query("Sheet1", **kwargs)
+            raise AssertionError(f"应拒绝: {kwargs}")
+        except ValueError as e:
+            print("参数错误:", e)
+    return result
+
+
 # ==================== 排序操作测试 ====================
 
 def test_sort_range():
@@ -205,6 +395,133 @@ def test_sort_range():
     return result
 
 
+def test_sort_range_by_keys_local():
+    """测试多键排序：稳定排序、空值排最后、自动识别标题行（本地模拟服务）"""
+    server = LocalAirScriptServer(sheets=["Sheet1"])
+    client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server)
+    data = [["姓名", "部门", "年龄"], ["b", "x", 3], ["a", "y", 1], ["c", "x", 2], ["d", "", 5], ["e", "y", 1],
+            ["F", "x", 3]]
+    client.set_range_values("A1:C7", data, "Sheet1")
+    result = client.sort_range_by_keys("A1:C7", ["B", (3, "desc")], sheet_name="Sheet1")
+    print("排序:", result)
+    assert result["header"] and result["rows"] == 6
+    assert [row[0] for row in server.sheet_values("Sheet1")] == ["姓名", "b", "F", "c", "a", "e", "d"]
+    return result
+
+
+def test_sort_range_by_keys_script_local():
+    """测试脚本的多键排序：原生排序、内存排序与模拟服务结果一致，公式随行移动后仍引用本行（node 运行脚本）"""
+    if shutil.which("node") is None:
+        print("未安装 node，跳过")
+        return None
+    data = [["姓名", "部门", "数量", "单价", "金额"], ["b", "x", 3, 2, ""], ["a", "y", 1, 5, ""], ["c", "x", 2, 1, ""],
+            ["d", "", 5, 2, ""], ["e", "y", 1, 3, ""], ["F", "x", 3, 4, ""]]
+    results = []
+    for method, keys in (("native", ["B", ("C", "desc")]), ("memory", ["B", ("C", "desc")]),
+                         ("auto", ["B", ("C", "desc"), "A", "D"])):
+        local = LocalAirScriptServer(sheets=["Sheet1"])
+        expected_client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=local)
+        expected_client.set_range_values("A1:E7", data, "Sheet1")
+        expected_client.sort_range_by_keys("A1:E7", keys, sheet_name="Sheet1")
+        expected = [row[:4] for row in local.sheet_values("Sheet1")]
+
+        with NodeAirScriptServer(sheets=["Sheet1"]) as server:
+            client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server)
+            client.set_range_values("A1:E7", data, "Sheet1")
+            client.fill_formula("E2:E7", "=RC[-2]*RC[-1]", "Sheet1")
+            result = client.sort_range_by_keys("A1:E7", keys, sheet_name="Sheet1", method=method)
+            values = server.sheet_values("Sheet1")
+            formulas = client.get_range_formulas("E2:E7", "Sheet1")
+        print("脚本排序:", result)
+        assert result["method"] == ("memory" if method == "auto" else method)
+        assert result["header"] and result["rows"] == 6
+        assert [row[:4] for row in values] == expected
+        assert formulas == [[f"=C{r}*D{r}"] for r in range(2, 8)]
+        assert all(row[4] == row[2] * row[3] for row in values[1:])
+        results.append(result)
+    return results
+
+
+def test_dedupe_and_normalize_local():
+    """测试服务端清理：规范化文本后按键列删除重复行（本地模拟服务）"""
+    server = LocalAirScriptServer(sheets=["Sheet1"])
+    client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server)
+    data = [["编号", "姓名", "数量"], [1, " Ann ", 2], [2, "bob", 3], [1, "ann", 4], [3, "  ", 5], [2, "Bob", 6],
+            [4, "x\u200b\u3000 y", "1,234.5"]]
+    client.set_range_values("A1:C7", data, "Sheet1")
+    normalized = client.normalize_range(
+        "A1:C7", ["remove_nonprinting", "trim", "collapse_whitespace", "empty_to_null", "to_number", "lower"],
+        "Sheet1")
+    deduped = client.dedupe_rows("A1:C7", ["A"], sheet_name="Sheet1")
+    print("清理:", normalized, deduped)
+    assert normalized["cellsChanged"] == 5
+    assert deduped["rowsRemoved"] == 2
+    assert server.sheet_values("Sheet1") == [["编号", "姓名", "数量"], [1, "ann", 2], [2, "bob", 3], [3, "", 5],
+                                             [4, "x y", 1234.5]]
+    return deduped
+
+
+def test_dedupe_and_normalize_script_local():
+    """测试脚本的删除重复行和批量清理：与模拟服务结果一致，公式上移后仍引用本行（node 运行脚本）"""
+    if shutil.which("node") is None:
+        print("未安装 node，跳过")
+        return None
+    data = [["编号", "姓名", "数量", "两倍"], [1, " Ann ", 2, ""], [2, "bob", 3, ""], [1, "ann", 4, ""],
+            [3, "  ", 5, ""], [2, "Bob", 6, ""], [4, "x\u200b\u3000 y", "1,234.5", ""]]
+    ops = ["remove_nonprinting", "trim", "collapse_whitespace", "empty_to_null", "to_number", "lower"]
+    local = LocalAirScriptServer(sheets=["Sheet1"])
+    expected_client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=local)
+    expected_client.set_range_values("A1:D7", data, "Sheet1")
+    expected_normalized = expected_client.normalize_range("A1:C7", ops, "Sheet1")
+    expected_deduped = expected_client.dedupe_rows("A1:D7", ["A"], sheet_name="Sheet1")
+    expected = [row[:3] for row in local.sheet_values("Sheet1")]
+
+    with NodeAirScriptServer(sheets=["Sheet1"]) as server:
+        client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server)
+        client.set_range_values("A1:D7", data, "Sheet1")
+        client.fill_formula("D2:D7", "=RC[-1]*2", "Sheet1")
+        normalized = client.normalize_range("A1:D7", ops, "Sheet1")
+        deduped = client.dedupe_rows("A1:D7", ["A"], sheet_name="Sheet1")
+        values = server.sheet_values("Sheet1")
+        formulas = client.get_range_formulas("D2:D5", "Sheet1")
+    print("脚本清理:", normalized, deduped)
+    assert normalized["cellsChanged"] == expected_normalized["cellsChanged"]
+    assert deduped == expected_deduped
+    assert [row[:3] for row in values] == expected
+    assert formulas == [[f"=C{r}*2"] for r in range(2, 6)]
+    assert [row[3] for row in values[1:]] == [row[2] * 2 for row in values[1:]]
+    return deduped
+
+
+def test_disk_cache_local():
+    """测试磁盘缓存：两个客户端共享缓存文件，内容未变化时不传输数据（本地模拟服务）"""
+    server = LocalAirScriptServer(sheets=["Sheet1"])
+    data = [[i, f"name{i}", i * 1.5] for i in range(500)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "ranges.db")
+        writer = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server, disk_cache=path)
+        writer.set_range_values("A1:C500", data, "Sheet1")
+        assert writer.get_range_values("A1:C500", "Sheet1") == data
+
+        # 另一个客户端（相当于另一个进程）打开同一缓存文件
+        reader = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server, disk_cache=DiskCache(path))
+        received = reader.get_compression_stats()["raw_bytes_received"]
+        assert reader.get_range_values("A1:C500", "Sheet1", as_grid=True).tolist() == data
+        cached_bytes = reader.get_compression_stats()["raw_bytes_received"] - received
+        assert reader.disk_cache.stats()["hits"] == 1
+
+        writer.set_cell_value("B2", "changed", "Sheet1")
+        assert reader.get_range_values("A1:C500", "Sheet1")[1][1] == "changed"
+        assert reader.get_used_range_data("Sheet1")[1][1] == "changed"
+        stats = reader.disk_cache.stats()
+        print("磁盘缓存:", stats, "命中时响应字节数:", cached_bytes)
+        assert cached_bytes < 200
+        assert stats["entries"] == 2
+        writer.disk_cache.close()
+        reader.disk_cache.close()
+    return stats
+
+
 # ==================== 复制粘贴测试 ====================
 
 def test_copy_paste_range():
@@ -215,6 +532,36 @@ def test_copy_paste_range():
     return result
 
 
+def test_copy_block():
+    """测试跨工作表复制区域（不经过剪贴板）"""
+    client = get_client()
+    result = client.copy_block(SHEET_NAME, "A1:D1", SHEET_NAME, "A22", mode="values")
+    print("复制区域结果:", result)
+    return result
+
+
+def test_copy_block_formats_script_local():
+    """测试仅复制格式：目标单元格的文本（如 "007"）保持不变（node 运行脚本）"""
+    if shutil.which("node") is None:
+        print("未安装 node，跳过")
+        return None
+    with NodeAirScriptServer(sheets=["Sheet1", "Sheet2"]) as server:
+        client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server)
+        client.set_range_values("A1:A2", [[1], [2]], "Sheet1")
+        client.set_font("A1:A2", {"bold": True}, "Sheet1")
+        client.set_number_format("D1:D2", "@", "Sheet2")
+        client.set_range_values("D1:D2", [["007"], ["1.50"]], "Sheet2")
+        assert client.get_range_values("D1:D2", "Sheet2") == [["007"], ["1.50"]]
+
+        result = client.copy_block("Sheet1", "A1:A2", "Sheet2", "D1", mode="formats")
+        print("复制格式:", result)
+        assert client.get_range_values("D1:D2", "Sheet2") == [["007"], ["1.50"]]
+        # 目标单元格已使用源单元格的常规格式，新写入的数字文本转换为数字
+        client.set_cell_value("D1", "008", "Sheet2")
+        assert client.get_range_values("D1", "Sheet2") == 8
+    return result
+
+
 # ==================== 工作簿/工作表信息测试 ====================
 
 def test_get_worksheet_count():
@@ -236,6 +583,16 @@ def test_get_workbook_sheets():
     return result
 
 
+def test_describe_workbook():
+    """测试一次获取工作簿概要"""
+    client = get_client()
+    workbook = client.describe_workbook()
+    for sheet in workbook["sheets"]:
+        print(f"{sheet['index']}. {sheet['name']}: {sheet['address']} "
+              f"{sheet['rows']}x{sheet['columns']} {sheet['fingerprint']}")
+    return workbook
+
+
 # ==================== 公式操作测试 ====================
 
 def test_get_cell_formula():
@@ -254,6 +611,31 @@ def test_set_cell_formula():
     return result
 
 
+def test_get_range_formulas():
+    """测试获取区域公式"""
+    client = get_client()
+    result = client.get_range_formulas("D2:D5", SHEET_NAME)
+    print("获取区域公式:", result)
+    return result
+
+
+def test_set_range_formulas():
+    """测试设置区域公式"""
+    client = get_client()
+    formulas = [["=B2*2"], ["=B3*2"], ["=B4*2"]]
+    result = client.set_range_formulas("E2:E4", formulas, SHEET_NAME)
+    print("设置区域公式:", result)
+    return result
+
+
+def test_fill_formula():
+    """测试 R1C1 公式填充"""
+    client = get_client()
+    result = client.fill_formula("F2:F4", "=RC[-4]+RC[-2]", SHEET_NAME)
+    print("填充公式:", result)
+    return result
+
+
 # ==================== 更多格式化测试 ====================
 
 def test_set_number_format():
@@ -306,6 +688,22 @@ def test_delete_columns():
     return result
 
 
+def test_delete_rows_many():
+    """测试批量删除多行"""
+    client = get_client()
+    result = client.delete_rows_many([40, 41, 42, 45, 50], SHEET_NAME)
+    print("批量删除行:", result)
+    return result
+
+
+def test_insert_rows_many():
+    """测试批量插入多行"""
+    client = get_client()
+    result = client.insert_rows_many([40, (45, 2)], sheet_name=SHEET_NAME)
+    print("批量插入行:", result)
+    return result
+
+
 # ==================== 更多查找测试 ====================
 
 def test_find_all_cells():
@@ -350,6 +748,321 @@ def test_get_used_range_data():
     return result
 
 
+def test_compression():
+    """测试压缩传输和压缩率统计"""
+    client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, compression="gzip", compress_threshold=1024)
+    data = client.get_used_range_data(SHEET_NAME)
+    for row in measure_compression(data):
+        print(f"  {row['encoding']}: 压缩率 {row['ratio']:.1f}x, 压缩耗时 {row['compress_ms']:.2f}ms")
+    result = client.get_compression_stats()
+    print("压缩统计:", result)
+    return result
+
+
+def test_call_function_result_local():
+    """测试结果解析：列表取第一项，标量和字典原样返回（本地模拟服务）"""
+    class RawResultServer(LocalAirScriptServer):
+        """按顺序返回给定的 data.result"""
+
+        def __init__(self, results):
+            super().__init__()
+            self.results = list(results)
+
+        def _run_sync(self, context):
+            return LocalResponse(self.codec.dumps({"data": {"result": self.results.pop(0)}, "error": ""}))
+
+    results = ["5", '{"success": true, "value": 1}', {"success": True, "value": 2},
+               '[{"success": true, "value": 3}]', [{"success": True, "value": 4}], "[]"]
+    client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=RawResultServer(results))
+    parsed = [client._call_function("setCellValue", "Sheet1", address="A1", value=i) for i in range(len(results))]
+    print("结果解析:", parsed)
+    assert parsed == [5, {"success": True, "value": 1}, {"success": True, "value": 2},
+                      {"success": True, "value": 3}, {"success": True, "value": 4}, None]
+    return parsed
+
+
+def test_compression_stats_local():
+    """测试并发请求下压缩统计计数准确（本地模拟服务）"""
+    server = LocalAirScriptServer(sheets=["Sheet1"])
+    client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server, compression="gzip", compress_threshold=0)
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(lambda i: client.set_cell_value(f"A{i}", i, "Sheet1"), range(1, 801)))
+    stats = client.get_compression_stats()
+    print("并发压缩统计:", stats)
+    assert stats["requests"] == stats["compressed_requests"] == server.requests == 800
+    assert stats["raw_bytes_received"] == stats["wire_bytes_received"] > 0
+    return stats
+
+
+def test_get_range_fingerprints():
+    """测试获取分块指纹"""
+    client = get_client()
+    result = client.get_range_fingerprints(100, SHEET_NAME)
+    print("分块指纹:", result)
+    return result
+
+
+def test_replicate():
+    """测试本地副本增量刷新"""
+    client = get_client()
+    replica = replicate(client, ":memory:", sheets=[SHEET_NAME], block_rows=100)
+    print(f"本地副本: {len(replica.read(SHEET_NAME))} 行")
+    result = replica.refresh([SHEET_NAME])
+    print("增量刷新:", result)
+    replica.close()
+    return result
+
+
+def test_export_sheet():
+    """测试流式导出工作表到 CSV"""
+    client = get_client()
+    print("已使用区域:", client.get_used_range_info(SHEET_NAME))
+    path = os.path.join(tempfile.mkdtemp(), "export_test.csv")
+    result = export_sheet(client, SHEET_NAME, path, window_rows=1000)
+    print("导出:", result)
+    return result
+
+
+def test_export_sheet_local():
+    """测试导出：rows 不含标题行，空工作表也生成文件（本地模拟服务）"""
+    server = LocalAirScriptServer(sheets=["Sheet1", "空表"])
+    client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server)
+    client.set_range_values("A1:B4", [["编号", "名称"], [1, "a"], [2, "b"], [3, "c"]], "Sheet1")
+    directory = tempfile.mkdtemp()
+    progress = []
+    result = export_sheet(client, "Sheet1", os.path.join(directory, "Sheet1.csv"), window_rows=2,
+                          progress=lambda done, total: progress.append((done, total)))
+    print("导出:", result)
+    assert result["rows"] == 3 and result["requests"] == 3
+    assert progress == [(1, 3), (3, 3)]
+    with open(result["path"], newline="", encoding="utf-8") as f:
+        assert len(list(csv.reader(f))) == 4
+
+    for format in ["csv", "parquet", "arrow"] if importlib.util.find_spec("pyarrow") else ["csv"]:
+        empty = export_sheet(client, "空表", os.path.join(directory, f"空表.{format}"), format=format)
+        assert empty["rows"] == 0 and os.path.exists(empty["path"]), empty
+    return result
+
+
+def test_import_file():
+    """测试从 CSV 导入到工作表"""
+    client = get_client()
+    path = os.path.join(tempfile.mkdtemp(), "import_test.csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["编号", "名称", "数量"])
+        for i in range(1, 101):
+            writer.writerow([i, f"商品{i}", i * 3])
+    result = import_file(client, path, SHEET_NAME, "J1", chunk_rows=50)
+    print("导入:", result)
+    return result
+
+
+def test_import_file_local():
+    """测试分块导入：请求数与分块一致，全为空行的块不发送请求（本地模拟服务）"""
+    server = LocalAirScriptServer(sheets=["Sheet1", "Sheet2"])
+    client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server)
+    path = os.path.join(tempfile.mkdtemp(), "import_local.csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([f"列{j}" for j in range(10)])
+        for i in range(20000):
+            writer.writerow([i, f"文本{i}", i * 0.5, "", i % 7, "技术部", i, i + 1, "007", True])
+    result = import_file(client, path, "Sheet1", "A1", chunk_rows=5000, upload_workers=2)
+    print(f"导入吞吐量: {result['cells_per_minute']:.0f} 单元格/分钟")
+    assert len(server.sheet_values("Sheet1")) == 20001
+    assert result["rows"] == 20001 and result["cells"] == 200010
+    assert result["requests"] == server.requests == 5
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write("编号,名称,身份证号\n1,a,110101199003071234\n\n\n\n\n2,b,1234567890123456\n")
+    result = import_file(client, path, "Sheet2", "B2", chunk_rows=2)
+    print("空行导入:", result)
+    assert result["rows"] == 7 and result["requests"] == 2
+    # 超过 15 位的数字（身份证号等）保持字符串
+    assert client.get_range_values("B8:D8", "Sheet2") == [[2, "b", "1234567890123456"]]
+    assert client.get_range_values("D3", "Sheet2") == "110101199003071234"
+    return result
+
+
+def test_coalesce_reads_local():
+    """测试并发相同读请求合并为一次请求（本地模拟服务）"""
+    server = LocalAirScriptServer(sheets=["Sheet1"], latency=0.2)
+    client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server)
+    client.set_range_values("A1:B2", [["指标", "值"], ["GMV", 100]], "Sheet1")
+    requests_before = server.requests
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        results = list(executor.map(lambda _: client.get_range_values("A1:B2", "Sheet1"), range(20)))
+    print(f"20 个并发读取，实际请求 {server.requests - requests_before} 次，合并 {client.coalesced_reads} 次")
+    assert server.requests - requests_before == 1
+    assert all(result == [["指标", "值"], ["GMV", 100]] for result in results)
+    return results
+
+
+def test_job_mode_local():
+    """测试任务模式：提交后轮询结果（本地模拟服务）"""
+    server = LocalAirScriptServer(sheets=["Sheet1"], job_duration=0.5)
+    client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server, job_mode=True)
+    client.set_range_values("A1:B2", [["Name", "Age"], ["Alice", 25]], "Sheet1")
+    result = client.get_range_values("A1:B2", "Sheet1")
+    print(f"任务数: {len(server.jobs)}，轮询次数: {server.polls}")
+    assert result == [["Name", "Age"], ["Alice", 25]]
+    assert len(server.jobs) == 2 and server.polls >= 2
+    return result
+
+
+def test_sharded_client_local():
+    """测试多脚本并发分发（本地模拟服务，同一脚本串行执行）"""
+    server = LocalAirScriptServer(sheets=["Sheet1"], latency=0.05, serialize_scripts=True)
+    client = ShardedAirScriptClient(FILE_ID, [(TOKEN, f"script{i}") for i in range(4)], session=server)
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(lambda i: client.set_cell_value(f"A{i}", i, "Sheet1"), range(1, 41)))
+    stats = client.get_shard_stats()
+    for shard in stats["shards"]:
+        print(f"{shard['script_id']}: {shard['requests']} 次请求，平均 {shard['avg_seconds'] * 1000:.0f}ms")
+    print(f"总吞吐量: {stats['requests_per_second']:.1f} 次/秒")
+    assert all(shard["requests"] == 10 for shard in stats["shards"])
+    assert server.sheet_values("Sheet1") == [[i] for i in range(1, 41)]
+    return stats
+
+
+def test_sharded_client_ordering_local():
+    """测试多脚本调用顺序：跨工作表复制等待源区域的写入，不相关的写入不受阻塞（本地模拟服务）"""
+    class GatedServer(LocalAirScriptServer):
+        """写入 Sheet1!A1 时阻塞，直到 gate 被设置"""
+
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.entered, self.gate = threading.Event(), threading.Event()
+
+        def execute(self, argv, sheet_name):
+            if argv.get("function") == "setCellValue" and sheet_name == "Sheet1" and argv.get("address") == "A1":
+                self.entered.set()
+                self.gate.wait(5)
+            return super().execute(argv, sheet_name)
+
+    server = GatedServer(sheets=["Sheet1", "Sheet2"])
+    client = ShardedAirScriptClient(FILE_ID, [(TOKEN, f"script{i}") for i in range(4)], session=server)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        write = executor.submit(client.set_cell_value, "A1", "源数据", "Sheet1")
+        assert server.entered.wait(5)
+        copy = executor.submit(client.copy_block, "Sheet1", "A1:A1", "Sheet2", "B1")
+        batch = executor.submit(client.set_range_values_batch, [{"address": "A1", "values": [["批量"]]}], "Sheet1")
+        # 不相关的写入不等待被阻塞的调用；无法分析的调用（worksheet_exists）等待之前的所有写入
+        client.set_cell_value("C5", 1, "Sheet2")
+        exists = executor.submit(client.worksheet_exists, "Sheet2")
+        assert not (copy.done() or batch.done() or exists.done())
+        server.gate.set()
+        write.result(), copy.result(), batch.result(), exists.result()
+    print("多脚本调用顺序:", server.sheet_values("Sheet1"), server.sheet_values("Sheet2"))
+    assert server.sheet_values("Sheet1") == [["批量"]]
+    assert client.get_range_values("B1", "Sheet2") == "源数据"
+
+    targets = ShardedAirScriptClient._operation_targets({"function": "runBatch", "operations": [
+        {"function": "setRangeValues", "address": "A1:B2"},
+        {"function": "copyBlock", "sourceSheet": "Sheet2", "sourceAddress": "A1:B3", "targetCell": "D4"},
+    ]}, "Sheet1")
+    assert targets == [("Sheet1", (1, 1, 2, 2)), ("Sheet2", (1, 1, 3, 2)), ("Sheet1", (4, 4, 6, 5))]
+    assert ShardedAirScriptClient._operation_targets({"function": "addWorksheet", "sheetName": "新表"}, None) is None
+    return targets
+
+
+def test_update_range_local():
+    """测试并发读-改-写（本地模拟服务，多个线程同时递增同一单元格）"""
+    server = LocalAirScriptServer(sheets=["Sheet1"], latency=0.01)
+    client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server)
+    client.set_cell_value("A1", 0, "Sheet1")
+
+    def increment(values):
+        values[0][0] += 1
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: client.update_range("A1", increment, "Sheet1", max_retries=50),
+                                    range(20)))
+    conflicts = sum(result["attempts"] - 1 for result in results)
+    print(f"20 次递增完成，冲突重试 {conflicts} 次，最终值: {server.sheet_values('Sheet1')[0][0]}")
+    assert server.sheet_values("Sheet1") == [[20]]
+    return results
+
+
+def test_changes_since_local():
+    """测试变更订阅：只返回游标之后新增、修改和删除的行（本地模拟服务）"""
+    server = LocalAirScriptServer(sheets=["Sheet1"])
+    client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server)
+    client.set_range_values("A1:B3", [["键", "值"], [1, 2], [3, 4]], "Sheet1")
+    first = client.changes_since("Sheet1")
+    assert [item["row"] for item in first["inserted"]] == [1, 2, 3]
+
+    client.set_range_values("A3:B4", [[3, 40], [5, 6]], "Sheet1")
+    client.clear_range("A2:B2", "Sheet1")
+    changes = client.changes_since("Sheet1", first["cursor"])
+    print("变更:", changes)
+    assert changes["inserted"] == [{"row": 4, "values": [5, 6]}]
+    assert changes["updated"] == [{"row": 3, "values": [3, 40]}]
+    assert changes["deleted"] == [2]
+    assert client.changes_since("Sheet1", changes["cursor"])["cursor"] == changes["cursor"]
+    return changes
+
+
+def test_changes_since_sheet_list_local():
+    """测试变更订阅的隐藏工作表不出现在工作表列表、数量、概要和模糊匹配中（模拟服务和 node 运行脚本）"""
+    servers = [LocalAirScriptServer(sheets=["Sheet1", "日志"])]
+    if shutil.which("node") is not None:
+        servers.append(NodeAirScriptServer(sheets=["Sheet1", "日志"]))
+    for server in servers:
+        client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server)
+        client.set_range_values("A1:B2", [["键", "值"], [1, 2]], "Sheet1")
+        client.changes_since("Sheet1")
+        sheets = client.get_workbook_sheets()
+        description = client.describe_workbook()
+        print(type(server).__name__, "工作表:", sheets)
+        assert sheets == ["Sheet1", "日志"]
+        assert [sheet["name"] for sheet in description["sheets"]] == sheets
+        assert [sheet["index"] for sheet in description["sheets"]] == [1, 2]
+        assert description["count"] == client.get_worksheet_count() == 2
+        assert not client.worksheet_exists("change_log")
+        assert client.changes_since("Sheet1", 1)["cursor"] == 1
+        if isinstance(server, NodeAirScriptServer):
+            server.close()
+    return sheets
+
+
+def test_profiler_local():
+    """测试调用分析：识别逐单元格循环、写入后读取和重复读取（本地模拟服务）"""
+    server = LocalAirScriptServer(sheets=["Sheet1"])
+    client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server, profile=True)
+    for i in range(1, 11):
+        client.set_cell_value(f"A{i}", i, "Sheet1")
+    client.get_range_values("A1:A10", "Sheet1")
+    client.get_range_values("A1:A10", "Sheet1")
+    print(client.profiler.report())
+    summary = client.profiler.summary()
+    patterns = {finding["pattern"]: finding["round_trips_saved"] for finding in summary["findings"]}
+    assert patterns == {"cell_loop": 9, "read_after_write": 1, "repeated_read": 1}
+    assert summary["round_trips_saved"] == 11
+    return summary
+
+
+def test_build_bundle_local():
+    """测试按工作负载生成精简脚本包（本地模拟服务记录调用的函数）"""
+    server = LocalAirScriptServer(sheets=["Sheet1"])
+    client = WPSAirScriptClient(FILE_ID, TOKEN, SCRIPT_ID, session=server)
+    client.set_cell_value("A1", 1, "Sheet1")
+    client.run_batch([{"function": "getCellValue", "address": "A1"}], "Sheet1")
+    bundle = build_bundle(server.calls)
+    with open(os.path.join(os.path.dirname(__file__), "..", "javascript", "wps-airsheet-api.js"),
+              encoding="utf-8") as f:
+        full = f.read()
+    print(f"精简包包含 {sorted(server.calls)}: {len(bundle.encode('utf-8'))} 字节"
+          f"（完整脚本 {len(full.encode('utf-8'))} 字节）")
+    assert "    getCellValue: function (params, sheetName) {" in bundle
+    assert "function runBatch(" in bundle
+    assert "function queryRange(" not in bundle
+    # 入口代码不再序列化整个结果用于日志
+    assert "JSON.stringify(globalResult)" not in full
+    return bundle
+
+
 # ==================== 工作表管理测试 ====================
 
 def test_add_worksheet():
@@ -437,12 +1150,18 @@ def main():
     
     # 批量写入测试
     # test_batch_write() # test success
+    # test_append_rows()
     #
     # # 单元格操作测试
     # test_get_cell_value() # test success
     # test_set_cell_value() # test success
     # test_get_range_values() # test success
+    # test_get_range_values_grid()
     # test_set_range_values() # test success
+    # test_set_range_values_batch()
+    # test_run_batch()
+    # test_write_behind_buffer()
+    # test_write_behind_buffer_local()
     # test_clear_range() # test success
     #
     # # 格式化操作测试
@@ -462,19 +1181,38 @@ def main():
     # test_find_cell() # test success
     # test_replace_in_range() # test success
     #
+    # # 按键更新测试
+    # test_upsert_rows()
+    # test_upsert_rows_script_local()
+    #
+    # # 查询下推测试
+    # test_query()
+    # test_query_script_local()
+    #
     # # 排序测试
     # test_sort_range() # test success
+    # test_sort_range_by_keys_local()
+    # test_sort_range_by_keys_script_local()
+    # test_dedupe_and_normalize_local()
+    # test_dedupe_and_normalize_script_local()
+    # test_disk_cache_local()
     #
     # # 复制粘贴测试
     # test_copy_paste_range() # test success
+    # test_copy_block()
+    # test_copy_block_formats_script_local()
     #
     # # 工作簿/工作表信息测试
     # test_get_worksheet_count() # test success
     # test_get_workbook_sheets() # test success
+    # test_describe_workbook()
     #
     # # 公式操作测试
     # test_get_cell_formula() # test success
     # test_set_cell_formula() # test success
+    # test_get_range_formulas()
+    # test_set_range_formulas()
+    # test_fill_formula()
     #
     # # 更多格式化测试
     # test_set_number_format() # test success
@@ -485,6 +1223,8 @@ def main():
     # test_delete_rows() # test success
     # test_insert_columns() # test success
     # test_delete_columns() # test success
+    # test_delete_rows_many()
+    # test_insert_rows_many()
     #
     # # 更多查找测试
     # test_find_all_cells() # test success
@@ -495,6 +1235,24 @@ def main():
     #
     # # 数据读取测试
     # test_get_used_range_data() # test success
+    # test_compression()
+    # test_call_function_result_local()
+    # test_compression_stats_local()
+    # test_get_range_fingerprints()
+    # test_replicate()
+    # test_export_sheet()
+    # test_export_sheet_local()
+    # test_import_file()
+    # test_import_file_local()
+    # test_coalesce_reads_local()
+    # test_job_mode_local()
+    # test_sharded_client_local()
+    # test_sharded_client_ordering_local()
+    # test_update_range_local()
+    # test_changes_since_local()
+    # test_changes_since_sheet_list_local()
+    # test_profiler_local()
+    # test_build_bundle_local()
     #
     # # 工作表管理测试
     # test_add_worksheet() # test success